@@ -0,0 +1,240 @@
+"""
+Benchmarks of the valuation hot paths on synthetic portfolios.
+
+Every benchmark times the batch implementation on the whole portfolio and the scalar implementation on a sample of
+bonds, checks the batch results against the scalar ones on that sample and stores everything in a JSON file:
+
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 1000000 --output bench.json
+    python -m benchmarks.run_benchmarks compare before.json after.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import time
+from typing import Callable, Dict, List, NamedTuple
+import numpy as np
+
+from fi_utils.abor_utils import compute_linear_amortization_schedule
+from fi_utils.amortization import compute_linear_amortization_schedules
+from fi_utils.bond_valuation import (
+    calc_accrued_interest,
+    calc_pv_of_vanilla_bond,
+    calc_ytm_of_bond,
+    calculate_pv_from_ytm,
+    find_next_coupon_date,
+)
+from fi_utils.curve import Curve
+from fi_utils.portfolio import BondPortfolio
+from fi_utils.ytm_solver import get_coupon_layout
+from test.helpers import make_synthetic_portfolio
+
+ADATE = datetime.date(2025, 4, 17)
+CURVE = {0.25: 3.9, 0.5: 3.95, 1: 4.0, 2: 3.8, 3: 3.75, 5: 3.8, 7: 3.9, 10: 4.05, 20: 4.4, 30: 4.5}
+
+
+class SyntheticBook(NamedTuple):
+    portfolio: BondPortfolio
+    ytms: np.ndarray
+    prices: np.ndarray
+    book_prices: np.ndarray
+    purchase_dates: np.ndarray
+
+
+def make_synthetic_book(size: int, seed: int = 0) -> SyntheticBook:
+    """
+    Bonds maturing within 30 years with random coupons and frequencies, priced from random yields
+    """
+    rng = np.random.default_rng(seed)
+    portfolio = make_synthetic_portfolio(rng, size, ADATE, 1)
+    ytms = rng.uniform(0.5, 8.0, size)
+    return SyntheticBook(
+        portfolio,
+        ytms,
+        portfolio.pv_from_ytm(ytms, ADATE),
+        rng.uniform(90.0, 110.0, size),
+        np.datetime64(ADATE) - rng.integers(183, 5 * 365, size),
+    )
+
+
+def _best_time(func: Callable, repeat: int):
+    best, result = np.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _bond(book: SyntheticBook, i: int) -> Dict:
+    portfolio = book.portfolio
+    return {
+        "maturity": portfolio.maturities[i].item(),
+        "coupon": float(portfolio.coupons[i]),
+        "freq": int(portfolio.freq[i]),
+    }
+
+
+def get_benchmarks(book: SyntheticBook) -> Dict[str, tuple]:
+    """
+    Benchmark name to (batch function, scalar function of a bond index, tolerance of the batch results)
+    """
+    portfolio = book.portfolio
+    curve = Curve.from_dict(CURVE)
+
+    def next_coupon_dates():
+        time_to_next_cpn, _ = get_coupon_layout(ADATE, portfolio.maturities, portfolio.freq)
+        return time_to_next_cpn
+
+    def scalar_next_coupon_date(i):
+        bond = _bond(book, i)
+        return (find_next_coupon_date(ADATE, bond["maturity"], bond["freq"]) - ADATE).days / 365
+
+    def linear_amortization():
+        # the scalar function returns (total_periods, change_per_period) only, so no book value columns are filled
+        schedules = compute_linear_amortization_schedules(
+            book.book_prices, portfolio.maturities, book.purchase_dates, 0.5, horizon_periods=0
+        )
+        return np.column_stack((schedules.total_periods, schedules.change_per_period))
+
+    return {
+        "coupon_date_lookup": (
+            next_coupon_dates,
+            scalar_next_coupon_date,
+            1e-12,
+        ),
+        "pv_from_ytm": (
+            lambda: portfolio.pv_from_ytm(book.ytms, ADATE),
+            lambda i: calculate_pv_from_ytm(
+                book.ytms[i], _bond(book, i)["coupon"], ADATE, _bond(book, i)["maturity"],
+                freq=_bond(book, i)["freq"],
+            ),
+            1e-9,
+        ),
+        "ytm": (
+            lambda: portfolio.ytm(book.prices, ADATE)[0],
+            lambda i: calc_ytm_of_bond(
+                book.prices[i], _bond(book, i)["coupon"], ADATE, _bond(book, i)["maturity"],
+                freq=_bond(book, i)["freq"],
+            ),
+            1e-8,
+        ),
+        "accrued_interest": (
+            lambda: portfolio.accrued_interest(ADATE),
+            lambda i: calc_accrued_interest(
+                ADATE, _bond(book, i)["maturity"], _bond(book, i)["coupon"], _bond(book, i)["freq"]
+            ),
+            1e-12,
+        ),
+        "curve_pv": (
+            lambda: portfolio.pv(ADATE, curve),
+            lambda i: calc_pv_of_vanilla_bond(
+                ADATE, _bond(book, i)["maturity"], _bond(book, i)["coupon"], CURVE, _bond(book, i)["freq"]
+            ),
+            1e-10,
+        ),
+        "linear_amortization": (
+            linear_amortization,
+            lambda i: compute_linear_amortization_schedule(
+                book.book_prices[i], portfolio.maturities[i].item(), book.purchase_dates[i].item(), 0.5
+            ),
+            1e-12,
+        ),
+    }
+
+
+def run_benchmarks(
+        sizes: List[int], scalar_sample: int = 1000, repeat: int = 3, seed: int = 0
+) -> List[Dict]:
+    results = []
+    for size in sizes:
+        book = make_synthetic_book(size, seed)
+        sample = np.random.default_rng(seed).choice(size, min(size, scalar_sample), replace=False)
+        for name, (batch, scalar, tolerance) in get_benchmarks(book).items():
+            batch_seconds, batch_values = _best_time(batch, repeat)
+            scalar_seconds, scalar_values = _best_time(
+                lambda: np.array([scalar(i) for i in sample]), 1
+            )
+            max_abs_error = float(np.max(np.abs(batch_values[sample] - scalar_values)))
+            results.append(
+                {
+                    "name": name,
+                    "size": size,
+                    "batch_seconds": batch_seconds,
+                    "batch_bonds_per_second": size / batch_seconds,
+                    "scalar_sample": int(sample.size),
+                    "scalar_seconds_per_bond": scalar_seconds / sample.size,
+                    "speedup": scalar_seconds / sample.size * size / batch_seconds,
+                    "max_abs_error": max_abs_error,
+                    "accurate": max_abs_error <= tolerance,
+                }
+            )
+            print(
+                f"{name:>20} {size:>9} bonds: batch {batch_seconds:9.4f}s, "
+                f"{results[-1]['speedup']:8.1f}x scalar, max abs error {max_abs_error:.2e}"
+            )
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(before_path: str, after_path: str):
+    """
+    Print batch timings of two result files side by side
+    """
+    with open(before_path) as f:
+        before = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    for result in after:
+        key = (result["name"], result["size"])
+        if key in before:
+            ratio = result["batch_seconds"] / before[key]["batch_seconds"]
+            print(
+                f"{result['name']:>20} {result['size']:>9} bonds: {before[key]['batch_seconds']:9.4f}s -> "
+                f"{result['batch_seconds']:9.4f}s ({ratio:5.2f}x)"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command")
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--scalar-sample", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        compare(args.before, args.after)
+        return
+    results = run_benchmarks(args.sizes, args.scalar_sample, args.repeat, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "commit": _git_commit(),
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "seed": args.seed,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import os
+from typing import NamedTuple, Optional, Union
+import numpy as np
+
+from fi_utils.ytm_solver import (
+    DateArray,
+    calc_ytm_from_coupon_layout,
+    get_coupon_layout,
+    to_datetime64_array,
+)
+
+# number of book values computed at once, bounds temporary memory when filling large schedules
+BLOCK_ELEMENTS = 1 << 22
+
+
+class AmortizationSchedule(NamedTuple):
+    """
+    Book values of many positions per period. book_values[i, k] is the book price of position i at the end of
+    period k, column 0 holds initial book prices and periods after the maturity of a position are NaN.
+    """
+
+    book_values: np.ndarray
+    total_periods: np.ndarray
+    change_per_period: np.ndarray
+
+
+class EffectiveInterestSchedule(NamedTuple):
+    """
+    Constant yield book values and interest income of many lots per coupon period. book_values[i, 0] is the
+    purchase price of lot i and book_values[i, k] its book value right after the k-th coupon following purchase,
+    income[i, k - 1] is the interest income earned over that period. The last coupon period ends at maturity,
+    where the book value is the principal amount, and periods after maturity are NaN.
+    """
+
+    book_values: np.ndarray
+    income: np.ndarray
+    purchase_yields: np.ndarray
+    converged: np.ndarray
+    time_to_next_cpn: np.ndarray
+    no_of_coupons: np.ndarray
+
+
+class AmortizationTotals(NamedTuple):
+    book_value: np.ndarray
+    live_positions: np.ndarray
+
+
+def _block_rows(no_of_columns: int) -> int:
+    return max(1, BLOCK_ELEMENTS // max(no_of_columns, 1))
+
+
+def _allocate(shape, dtype, memmap_path: Optional[str]) -> np.ndarray:
+    if memmap_path is None:
+        return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(memmap_path, mode="w+", dtype=dtype, shape=shape)
+
+
+def compute_linear_amortization_schedules(
+        initial_book_prices: np.ndarray,
+        maturities: DateArray,
+        purchase_dates: DateArray,
+        period_length_years: float,
+        par: Union[float, np.ndarray] = 100.0,
+        horizon_periods: Optional[int] = None,
+        memmap_path: Optional[str] = None,
+        dtype=np.float64,
+) -> AmortizationSchedule:
+    """
+    Linear amortization schedules of many positions, see compute_linear_amortization_schedule for one position.
+    Book values are rolled forward for all positions at once, in blocks of rows to bound temporary memory
+    :param initial_book_prices: book prices at purchase time
+    :param maturities:
+    :param purchase_dates: purchase dates or stress test starting dates, a single date is broadcast
+    :param period_length_years: length of one period (e.g., 0.5 for semiannual)
+    :param par: par value, scalar or per position
+    :param horizon_periods: number of periods in the schedule, the longest position by default
+    :param memmap_path: write book values to a .npy file opened as a memory map instead of memory,
+    it can be reopened later with np.load(memmap_path, mmap_mode="r")
+    :param dtype: dtype of book values
+    :return: AmortizationSchedule
+    """
+    initial_book_prices, maturities, purchase_dates, par = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(initial_book_prices, dtype=np.float64)),
+        to_datetime64_array(maturities),
+        to_datetime64_array(purchase_dates),
+        np.asarray(par, dtype=np.float64),
+    )
+    total_years = (maturities - purchase_dates).astype(np.int64) / 365.0
+    total_periods = np.trunc(total_years / period_length_years).astype(np.int64)
+    if (total_periods <= 0).any():
+        raise ValueError(
+            f"{np.count_nonzero(total_periods <= 0)} positions are at or past maturity or "
+            f"period_length_years is too large."
+        )
+    change_per_period = (par - initial_book_prices) / total_periods
+    if horizon_periods is None:
+        horizon_periods = int(total_periods.max(initial=0))
+    book_values = _allocate((total_periods.size, horizon_periods + 1), dtype, memmap_path)
+    period = np.arange(horizon_periods + 1)
+    block_rows = _block_rows(horizon_periods + 1)
+    for start in range(0, total_periods.size, block_rows):
+        rows = slice(start, start + block_rows)
+        block = initial_book_prices[rows, None] + period * change_per_period[rows, None]
+        # book values reach par exactly at maturity
+        at_maturity = period == total_periods[rows, None]
+        block[at_maturity] = np.broadcast_to(par[rows, None], block.shape)[at_maturity]
+        block[period > total_periods[rows, None]] = np.nan
+        book_values[rows] = block
+    if isinstance(book_values, np.memmap):
+        book_values.flush()
+    return AmortizationSchedule(book_values, total_periods, change_per_period)
+
+
+def aggregate_book_values(
+        book_values: np.ndarray, quantities: Optional[np.ndarray] = None
+) -> AmortizationTotals:
+    """
+    Total book value and number of live positions per period across positions. Rows are read in blocks,
+    so book values can be a memory map larger than memory
+    :param book_values: book values per position and period, NaN after maturity
+    :param quantities: number of bonds held per position, one of each by default
+    :return: AmortizationTotals
+    """
+    no_of_positions, no_of_periods = book_values.shape
+    if quantities is not None:
+        quantities = np.broadcast_to(np.asarray(quantities, dtype=np.float64), (no_of_positions,))
+    totals = np.zeros(no_of_periods)
+    live_positions = np.zeros(no_of_periods, dtype=np.int64)
+    block_rows = _block_rows(no_of_periods)
+    for start in range(0, no_of_positions, block_rows):
+        block = np.asarray(book_values[start: start + block_rows], dtype=np.float64)
+        live = ~np.isnan(block)
+        live_positions += live.sum(axis=0)
+        if quantities is not None:
+            block = block * quantities[start: start + block_rows, None]
+        totals += np.nansum(block, axis=0)
+    return AmortizationTotals(totals, live_positions)
+
+
+def compute_effective_interest_schedules(
+        purchase_prices: np.ndarray,
+        coupon_rates: np.ndarray,
+        purchase_dates: DateArray,
+        maturities: DateArray,
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+        horizon_periods: Optional[int] = None,
+        memmap_dir: Optional[str] = None,
+        dtype=np.float64,
+) -> EffectiveInterestSchedule:
+    """
+    Effective interest (constant yield) amortization of many lots. Purchase yields are solved for all lots at once
+    from dirty purchase prices with the vectorized YTM solver, then book values are rolled forward coupon by coupon
+    at the purchase yield: BV_k = BV_{k - 1} * (1 + ytm / 100) ** period_k - coupon, where period_k is the time to
+    the first coupon for k = 1 and 1 / freq afterwards. Interest income of a period is BV_{k - 1} * ((1 + ytm / 100)
+    ** period_k - 1), so that it is the coupon plus the amortization of the premium or accretion of the discount.
+    Lots whose purchase yield does not converge get NaN rows
+    :param purchase_prices: dirty purchase prices
+    :param coupon_rates: coupon rates in percentages
+    :param purchase_dates: a single date is broadcast to all lots
+    :param maturities:
+    :param freq: coupon frequency, scalar or per lot
+    :param days_per_year: scalar or per lot
+    :param principal_amount: scalar or per lot
+    :param horizon_periods: number of coupon periods in the schedule, the longest lot by default
+    :param memmap_dir: write book values and income to book_values.npy and income.npy memory maps in this
+    directory instead of memory
+    :param dtype: dtype of book values and income
+    :return: EffectiveInterestSchedule
+    """
+    time_to_next_cpn, no_of_periods = get_coupon_layout(purchase_dates, maturities, freq, days_per_year)
+    purchase_yields, converged = calc_ytm_from_coupon_layout(
+        purchase_prices, coupon_rates, time_to_next_cpn, no_of_periods, freq, principal_amount
+    )
+    purchase_prices, coupons, freq, time_to_next_cpn, no_of_periods = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(purchase_prices, dtype=np.float64)),
+        np.asarray(coupon_rates, dtype=np.float64) / freq,
+        np.asarray(freq, dtype=np.int64),
+        time_to_next_cpn,
+        no_of_periods,
+    )
+    no_of_coupons = no_of_periods + 1
+    if horizon_periods is None:
+        horizon_periods = int(no_of_coupons.max(initial=0))
+    shape = (no_of_coupons.size, horizon_periods + 1)
+    book_values = _allocate(shape, dtype, memmap_dir and os.path.join(memmap_dir, "book_values.npy"))
+    income = _allocate(
+        (shape[0], horizon_periods), dtype, memmap_dir and os.path.join(memmap_dir, "income.npy")
+    )
+    log_yields = np.where(converged, np.log1p(purchase_yields / 100), np.nan)
+    block_rows = _block_rows(horizon_periods + 1)
+    for start in range(0, no_of_coupons.size, block_rows):
+        rows = slice(start, start + block_rows)
+        book_value = np.where(converged[rows], purchase_prices[rows], np.nan)
+        first_growth = np.expm1(log_yields[rows] * time_to_next_cpn[rows])
+        growth = np.expm1(log_yields[rows] / freq[rows])
+        book_values[rows, 0] = book_value
+        for k in range(1, horizon_periods + 1):
+            live = k <= no_of_coupons[rows]
+            period_income = np.where(live, book_value * (first_growth if k == 1 else growth), np.nan)
+            book_value = book_value + period_income - coupons[rows]
+            income[rows, k - 1] = period_income
+            book_values[rows, k] = book_value
+    for values in (book_values, income):
+        if isinstance(values, np.memmap):
+            values.flush()
+    return EffectiveInterestSchedule(
+        book_values, income, purchase_yields, converged, time_to_next_cpn, no_of_coupons
+    )
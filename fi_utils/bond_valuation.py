@@ -1,9 +1,13 @@
 import datetime
-from scipy.optimize import fsolve
 import logging
+import math
 import calendar
+import time
 from typing import List
-import numpy as np
+
+from fi_utils.coupon_schedule import get_coupon_schedule
+from fi_utils.instrumentation import instrumented, is_enabled, record_call, record_solver
+from fi_utils.ytm_scalar import _pv_and_dpv_from_log_yield_scalar, solve_ytm
 
 
 def fix_february_date(thedate: datetime.date):
@@ -122,25 +126,21 @@ def find_next_coupon_date(
         days_per_year: int = 365,
 ) -> datetime.date:
     """
-    Find next coupon date given as of date, maturity date
+    Find next coupon date given as of date, maturity date.
+    Coupon dates are looked up by bisection in the cached coupon schedule of the bond
     :param adate:
     :param maturity:
     :param freq:
     :param days_per_year:
     :return:
     """
-    next_coupon_dates_in_the_year = get_next_coupon_dates_in_the_year(
-        adate, maturity, freq, days_per_year
-    )
-    # next coupon date is the first item in the next coupon dates list
-    if len(next_coupon_dates_in_the_year) == 0:
-        # this means all coupon dates of this year has already passed
-        # adate comes after all coupon dates within this year
-        # so we need to search next coupon date within next year
-        next_coupon_dates_in_the_year = get_next_coupon_dates_in_the_year(
-            datetime.date(adate.year + 1, 1, 1), maturity, freq, days_per_year
-        )
-    return next_coupon_dates_in_the_year[0]
+    # the flag is checked inline, an instrumented wrapper costs a quarter of this lookup while disabled
+    if not is_enabled():
+        return get_coupon_schedule(maturity, freq, days_per_year).next_coupon_date(adate)
+    start = time.perf_counter()
+    coupon_date = get_coupon_schedule(maturity, freq, days_per_year).next_coupon_date(adate)
+    record_call("coupon_dates", time.perf_counter() - start)
+    return coupon_date
 
 
 def find_prev_coupon_date(
@@ -150,28 +150,20 @@ def find_prev_coupon_date(
         days_per_year: int = 365,
 ) -> datetime.date:
     """
-    Find previous coupon date given as of date and maturity
+    Find previous coupon date given as of date and maturity.
+    Coupon dates are looked up by bisection in the cached coupon schedule of the bond
     :param adate:
     :param maturity:
     :param freq:
     :param days_per_year:
     :return:
     """
-    years_in_scope = [adate.year, adate.year - 1]
-    possible_coupon_dates_in_the_year = get_possible_coupon_dates_in_specified_years(
-        maturity, years_in_scope, freq=freq, days_per_year=days_per_year
-    )
-    possible_coupon_dates_adate_diff_list = [
-        (thedate - adate).days for thedate in possible_coupon_dates_in_the_year
-    ]
-
-    # previous coupon dates from as of date are those where possible coupon date minus adate is non-positive
-    prev_coupon_dates_in_the_year = [
-        thedate
-        for idx, thedate in enumerate(possible_coupon_dates_in_the_year)
-        if possible_coupon_dates_adate_diff_list[idx] <= 0
-    ]
-    return prev_coupon_dates_in_the_year[-1]
+    if not is_enabled():
+        return get_coupon_schedule(maturity, freq, days_per_year).prev_coupon_date(adate)
+    start = time.perf_counter()
+    coupon_date = get_coupon_schedule(maturity, freq, days_per_year).prev_coupon_date(adate)
+    record_call("coupon_dates", time.perf_counter() - start)
+    return coupon_date
 
 
 def get_no_of_cf_periods(
@@ -180,9 +172,23 @@ def get_no_of_cf_periods(
         freq: int = 2,
         days_per_year: int = 365,
 ) -> int:
-    return int((ending_date - beginning_date).days / days_per_year * freq) + 1
+    """
+    Number of coupon dates from a coupon date through maturity, counted in months of the coupon schedule,
+    see fi_utils.daycount.calc_no_of_coupon_periods. Periods used to be counted by truncating
+    days / days_per_year * freq, which dropped a coupon whenever the remaining coupon dates were less than
+    1 / freq years apart in total, like the 182 days from 2029-11-30 to 2030-05-31 of a quarterly bond.
+    days_per_year no longer changes the count and is kept for existing callers
+    :param beginning_date: coupon date
+    :param ending_date: maturity
+    :param freq:
+    :param days_per_year:
+    :return:
+    """
+    months = (ending_date.year - beginning_date.year) * 12 + ending_date.month - beginning_date.month
+    return months // (12 // freq) + 1
 
 
+@instrumented("cashflows")
 def get_vanilla_bond_cf_and_time_to_cf(
         adate: datetime.date,
         maturity: datetime.date,
@@ -212,6 +218,7 @@ def get_vanilla_bond_cf_and_time_to_cf(
     return time_to_cashflows
 
 
+@instrumented("pv_from_ytm")
 def calculate_pv_from_ytm(
         ytm: float,
         coupon_rate: float,
@@ -222,7 +229,8 @@ def calculate_pv_from_ytm(
         principal_amount: float = 100.0,
 ) -> float:
     """
-    Calculate present value given yield to maturity, coupon rate, as of date, maturity and coupon frequency
+    Calculate present value given yield to maturity, coupon rate, as of date, maturity and coupon frequency.
+    Coupons are summed with the annuity closed form, see calc_pv_from_ytms for the array version
     :param ytm: yield to maturity in percentages
     :param coupon_rate: coupon rate in percentages
     :param adate: as of date
@@ -233,19 +241,20 @@ def calculate_pv_from_ytm(
     :return:
     """
     next_cpn_date = find_next_coupon_date(adate, maturity, freq, days_per_year)
-    no_of_periods = int((maturity - next_cpn_date).days / days_per_year * freq)
+    no_of_periods = get_no_of_cf_periods(next_cpn_date, maturity, freq, days_per_year) - 1
     time_to_next_cpn_date = (next_cpn_date - adate).days / days_per_year
-    pv = (coupon_rate / freq) / (1 + ytm / 100) ** time_to_next_cpn_date
-    for period in range(1, no_of_periods + 1):
-        pv += (coupon_rate / 2) / (1 + ytm / 100) ** (
-                time_to_next_cpn_date + period / freq
-        )
-    pv += principal_amount / (1 + ytm / 100) ** (
-            time_to_next_cpn_date + no_of_periods / freq
+    pv, _ = _pv_and_dpv_from_log_yield_scalar(
+        math.log1p(ytm / 100),
+        coupon_rate / freq,
+        time_to_next_cpn_date,
+        no_of_periods,
+        1.0 / freq,
+        principal_amount,
     )
     return pv
 
 
+@instrumented("ytm")
 def calc_ytm_of_bond(
         price: float,
         coupon_rate: float,
@@ -254,21 +263,53 @@ def calc_ytm_of_bond(
         days_per_year: int = 365,
         freq: int = 2,
         principal_amount: float = 100,
-):
-    def objective_func(ytm: np.ndarray):
-        ytm = float(ytm)
-        pv = calculate_pv_from_ytm(
-            ytm, coupon_rate, adate, maturity, days_per_year, freq, principal_amount
+        tol: float = 1e-10,
+        max_iter: int = 100,
+) -> float:
+    """
+    Calculate yield to maturity given dirty price, coupon rate, as of date and maturity.
+    The root of price - PV is found by safeguarded Newton with the analytic derivative of PV, see solve_ytm
+    :param price: dirty price
+    :param coupon_rate: coupon rate in percentages
+    :param adate: as of date
+    :param maturity:
+    :param days_per_year:
+    :param freq: coupon frequency
+    :param principal_amount:
+    :param tol: convergence tolerance on yield to maturity in percentages
+    :param max_iter: maximum number of PV evaluations, see solve_ytm
+    :return: yield to maturity in percentages
+    """
+    next_cpn_date = find_next_coupon_date(adate, maturity, freq, days_per_year)
+    no_of_periods = get_no_of_cf_periods(next_cpn_date, maturity, freq, days_per_year) - 1
+    time_to_next_cpn_date = (next_cpn_date - adate).days / days_per_year
+    solution = solve_ytm(
+        price,
+        coupon_rate,
+        time_to_next_cpn_date,
+        no_of_periods,
+        freq,
+        principal_amount,
+        tol,
+        max_iter,
+    )
+    if is_enabled():
+        record_solver(
+            "ytm",
+            1,
+            solution.pv_evaluations,
+            int(not solution.converged),
+            {"price": price, "coupon_rate": coupon_rate, "adate": adate.isoformat(), "maturity": maturity.isoformat()},
         )
-        if isinstance(pv, complex):
-            raise ValueError(
-                f"calc_pv_from_ytm returned complex number for ytm : {ytm}, adate {adate},coupon_rate {coupon_rate}, maturity {maturity} -> {pv}")
-        return (price - pv) ** 2
-
-    solved_ytm = fsolve(objective_func, np.array(1))
-    return float(solved_ytm[0])
+    if not solution.converged:
+        raise ValueError(
+            f"failed to solve ytm for price {price}, adate {adate}, coupon_rate {coupon_rate}, maturity {maturity} "
+            f"after {solution.pv_evaluations} PV evaluations"
+        )
+    return solution.ytm
 
 
+@instrumented("accrued_interest")
 def calc_accrued_interest(
         adate: datetime.date,
         maturity: datetime.date,
@@ -291,7 +332,10 @@ def calc_accrued_interest(
     return coupon * time_since_prev_coupon_date
 
 
-from typing import Dict
+from typing import Dict, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from fi_utils.curve import Curve
 
 
 def find_matching_interval_in_curve(time_to_cf: float, curve: Dict[float, float]):
@@ -342,31 +386,29 @@ def calc_discount_factor_given_ir_and_time_to_cf(ir: float, time_to_cf: float) -
     return 1 / (1 + ir / 100) ** time_to_cf
 
 
+@instrumented("curve_pv")
 def calc_pv_of_vanilla_bond(
         adate: datetime.date,
         maturity: datetime.date,
         coupon: float,
-        curve: Dict[float, float],
+        curve: Union[Dict[float, float], "Curve"],
         freq: int = 2,
         days_per_year: int = 365,
 ) -> float:
     """
-    Calculate PV of vanilla bond
+    Calculate PV of vanilla bond. Discount factors of all cashflows are interpolated in one call on the curve
     :param adate: analysis date
     :param maturity: bond maturity
     :param coupon: vanilla bond annual coupon rate
-    :param curve: interest rate curve, this is a dictionary that maps interest rates to time
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
     :param freq: coupon frequency
     :param days_per_year: days per year
     :return:
     """
+    from fi_utils.curve import as_curve
+
     bond_cf = get_vanilla_bond_cf_and_time_to_cf(
         adate, maturity, coupon, freq, days_per_year
     )
-    pv = 0
-    for time_to_cf, cf in bond_cf.items():
-        matching_interval = find_matching_interval_in_curve(time_to_cf, curve)
-        ir = calc_interpolated_rate_from_interval_curve(matching_interval, time_to_cf)
-        dfactor = calc_discount_factor_given_ir_and_time_to_cf(ir, time_to_cf)
-        pv += cf * dfactor
-    return pv
+    discount_factors = as_curve(curve).discount_factor(list(bond_cf))
+    return float(sum(cf * dfactor for cf, dfactor in zip(bond_cf.values(), discount_factors)))
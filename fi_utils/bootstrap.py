@@ -0,0 +1,86 @@
+import functools
+from typing import Dict, Tuple
+import numpy as np
+
+from fi_utils.curve import Curve
+from fi_utils.instrumentation import register_cache
+
+BOOTSTRAP_CACHE_SIZE = 256
+
+
+def bootstrap_discount_factors(
+        tenors: np.ndarray, par_rates: np.ndarray, freq: int = 2
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bootstrap discount factors from par swap rates in one sweep over the fixed leg payment dates.
+    Quotes shorter than a fixed leg period are deposits with a single payment, DF = 1 / (1 + rate * tenor).
+    Swap par rates are interpolated linearly onto payment times k / freq, flat before the first swap tenor, and
+    discount factors follow from the par condition rate / freq * (DF_1 + ... + DF_k) + DF_k = 1, carrying the
+    annuity from one payment time to the next. Leading dimensions of par_rates are independent market snapshots
+    bootstrapped at once.
+    :param tenors: quote tenors in years
+    :param par_rates: par rates in percentages, quotes along the last axis
+    :param freq: fixed leg payment frequency
+    :return: (times in years, discount factors with times along the last axis)
+    """
+    tenors = np.asarray(tenors, dtype=np.float64)
+    par_rates = np.asarray(par_rates, dtype=np.float64) / 100
+    order = np.argsort(tenors, kind="stable")
+    tenors, par_rates = tenors[order], par_rates[..., order]
+    if tenors.size == 0 or (np.diff(tenors) == 0).any() or tenors[0] <= 0:
+        raise ValueError("par rates need unique positive tenors")
+    period = 1.0 / freq
+    deposits = tenors < period - 1e-12
+    swap_tenors = tenors[~deposits]
+    times = tenors[deposits]
+    discount_factors = [1 / (1 + par_rates[..., deposits] * times)]
+    if swap_tenors.size:
+        payment_times = np.arange(1, int(round(swap_tenors[-1] * freq)) + 1) * period
+        swap_rates = par_rates[..., ~deposits]
+        right = np.clip(np.searchsorted(swap_tenors, payment_times), 0, swap_tenors.size - 1)
+        left = np.maximum(right - 1, 0)
+        span = swap_tenors[right] - swap_tenors[left]
+        weight = np.clip(
+            np.divide(payment_times - swap_tenors[left], span, out=np.zeros_like(span), where=span > 0), 0, 1
+        )
+        grid_rates = swap_rates[..., left] * (1 - weight) + swap_rates[..., right] * weight
+        swap_discount_factors = np.empty_like(grid_rates)
+        annuity = np.zeros(grid_rates.shape[:-1])
+        for k in range(payment_times.size):
+            coupon = grid_rates[..., k] * period
+            swap_discount_factors[..., k] = (1 - coupon * annuity) / (1 + coupon)
+            annuity += swap_discount_factors[..., k]
+        times = np.concatenate([times, payment_times])
+        discount_factors.append(swap_discount_factors)
+    return times, np.concatenate(discount_factors, axis=-1)
+
+
+@functools.lru_cache(maxsize=BOOTSTRAP_CACHE_SIZE)
+def _bootstrap_curve(quotes: Tuple[Tuple[float, float], ...], freq: int) -> Curve:
+    tenors, par_rates = np.array(quotes, dtype=np.float64).T
+    times, discount_factors = bootstrap_discount_factors(tenors, par_rates, freq)
+    return Curve(times, np.expm1(-np.log(discount_factors) / times) * 100)
+
+
+def bootstrap_curve(par_rates: Dict[float, float], freq: int = 2) -> Curve:
+    """
+    Zero curve of annually compounded rates in percentages bootstrapped from par swap rates, see
+    bootstrap_discount_factors. Curves are cached by the quotes, so every pricing call sharing a market snapshot
+    reuses one bootstrapped curve. Curves are read-only and safe to share
+    :param par_rates: dictionary that maps tenors in years to par swap rates in percentages
+    :param freq: fixed leg payment frequency
+    :return: Curve
+    """
+    quotes = tuple(sorted((float(tenor), float(rate)) for tenor, rate in par_rates.items()))
+    return _bootstrap_curve(quotes, int(freq))
+
+
+def clear_bootstrap_cache():
+    _bootstrap_curve.cache_clear()
+
+
+def bootstrap_cache_info():
+    return _bootstrap_curve.cache_info()
+
+
+register_cache("bootstrap", bootstrap_cache_info)
@@ -0,0 +1,265 @@
+import contextlib
+import datetime
+import errno
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import numpy as np
+
+from fi_utils.curve_pricing import CashflowLayout
+from fi_utils.daycount import calc_coupon_schedules, to_datetime64_array
+from fi_utils.portfolio import BondPortfolio
+
+META_FILE = "meta.json"
+LOCK_FILE = "append.lock"
+
+# append-only column files of the security master and of the cashflows in CSR order
+SECURITY_COLUMNS = {
+    "maturities": "datetime64[D]",
+    "coupons": "float64",
+    "freq": "int8",
+    "days_per_year": "int16",
+    "principal_amount": "float64",
+}
+CASHFLOW_COLUMNS = {
+    "cashflow_dates": "datetime64[D]",
+    "cashflow_amounts": "float64",
+    "security_index": "int64",
+}
+
+
+def _column_path(path: str, name: str) -> str:
+    return os.path.join(path, f"{name}.bin")
+
+
+def _write_meta(path: str, meta: Dict):
+    tmp_path = os.path.join(path, f"{META_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _open_column(path: str, name: str, dtype: str, size: int) -> np.ndarray:
+    if size == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(_column_path(path, name), dtype=dtype, mode="r", shape=(size,))
+
+
+@contextlib.contextmanager
+def _exclusive_lock(path: str) -> Iterator[None]:
+    """
+    Hold an exclusive lock on the file at path within the block, with flock on POSIX and msvcrt.locking on Windows.
+    The platform modules are imported here so that the store imports everywhere
+    :param path: lock file, created if missing
+    """
+    with open(path, "a+b") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            return
+        try:
+            import msvcrt
+        except ImportError:
+            raise NotImplementedError(f"no file locking to append to the cashflow store on {os.name}") from None
+        # msvcrt locks bytes from the current position and LK_LOCK gives up with EDEADLOCK after 10 attempts a
+        # second apart, so waiting on another writer retries it without spinning while other errors are raised
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError as error:
+                if error.errno not in (errno.EDEADLK, errno.EACCES):
+                    raise
+        try:
+            yield
+        finally:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CashflowStore:
+    """
+    Coupon dates and cashflow amounts of a security master precomputed into append-only binary column files,
+    opened read-only as memory maps so that any process shares the pages of one copy without reading the files.
+    Cashflows are stored in CSR form, cashflows of security i are cashflow_dates[offsets[i]:offsets[i + 1]] and
+    cashflow_amounts[offsets[i]:offsets[i + 1]], and security_index maps each cashflow back to its security.
+    Securities are indexed in the order they were appended. Every append creates a new version recorded in
+    meta.json, and a version is a prefix of the columns, so a store opened at a version never changes while
+    new issues are appended.
+    """
+
+    def __init__(self, path: str, version: Optional[int] = None):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if version is None:
+            version = meta["version"]
+        versions = {v["version"]: v for v in meta["versions"]}
+        if version not in versions:
+            raise ValueError(f"cashflow store {path} has no version {version}")
+        self.path = path
+        self.version = version
+        self.start_date: datetime.date = datetime.date.fromisoformat(meta["start_date"])
+        no_of_securities = versions[version]["securities"]
+        no_of_cashflows = versions[version]["cashflows"]
+        self.securities = BondPortfolio._from_arrays(
+            *(_open_column(path, name, dtype, no_of_securities) for name, dtype in SECURITY_COLUMNS.items())
+        )
+        self.offsets = _open_column(path, "offsets", "int64", no_of_securities + 1)
+        for name, dtype in CASHFLOW_COLUMNS.items():
+            setattr(self, name, _open_column(path, name, dtype, no_of_cashflows))
+
+    @classmethod
+    def create(cls, path: str, start_date: datetime.date) -> "CashflowStore":
+        """
+        Create an empty store in a new directory
+        :param path: directory of the store
+        :param start_date: cashflows on or after start date are stored
+        :return:
+        """
+        os.makedirs(path)
+        with open(_column_path(path, "offsets"), "wb") as f:
+            f.write(np.zeros(1, dtype=np.int64).tobytes())
+        for name in (*SECURITY_COLUMNS, *CASHFLOW_COLUMNS):
+            open(_column_path(path, name), "wb").close()
+        _write_meta(
+            path,
+            {
+                "start_date": start_date.isoformat(),
+                "version": 0,
+                "versions": [
+                    {"version": 0, "securities": 0, "cashflows": 0, "created": datetime.datetime.now().isoformat()}
+                ],
+            },
+        )
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.securities)
+
+    @property
+    def no_of_cashflows(self) -> int:
+        return int(self.offsets[-1])
+
+    def append(self, portfolio: BondPortfolio) -> "CashflowStore":
+        """
+        Generate coupon dates and cashflows of new securities once and append them to the store as a new version.
+        Securities get the indices len(store) to len(store) + len(portfolio) - 1. Column files are appended and
+        synced before meta.json is replaced, so readers never see a partial version, and data written by an
+        interrupted append is dropped by the next one. Appends hold an exclusive lock on the lock file of the
+        store, so concurrent writers, threads or processes, append one after another
+        :param portfolio: new securities
+        :return: the store opened at the new version
+        """
+        with _exclusive_lock(os.path.join(self.path, LOCK_FILE)):
+            return self._append(portfolio)
+
+    def _append(self, portfolio: BondPortfolio) -> "CashflowStore":
+        with open(os.path.join(self.path, META_FILE)) as f:
+            meta = json.load(f)
+        latest = meta["versions"][-1]
+        offsets, coupon_dates = calc_coupon_schedules(self.start_date, portfolio.maturities, portfolio.freq)
+        no_of_coupons = np.diff(offsets)
+        bond_index = np.repeat(np.arange(len(portfolio)), no_of_coupons)
+        amounts = (portfolio.coupons / portfolio.freq)[bond_index]
+        amounts[offsets[1:][no_of_coupons > 0] - 1] += portfolio.principal_amount[no_of_coupons > 0]
+        columns = {
+            **{name: getattr(portfolio, name) for name in SECURITY_COLUMNS},
+            "offsets": offsets[1:] + latest["cashflows"],
+            "cashflow_dates": coupon_dates,
+            "cashflow_amounts": amounts,
+            "security_index": bond_index + latest["securities"],
+        }
+        sizes = {
+            **{name: latest["securities"] for name in SECURITY_COLUMNS},
+            "offsets": latest["securities"] + 1,
+            **{name: latest["cashflows"] for name in CASHFLOW_COLUMNS},
+        }
+        dtypes = {**SECURITY_COLUMNS, "offsets": "int64", **CASHFLOW_COLUMNS}
+        for name, column in columns.items():
+            dtype = np.dtype(dtypes[name])
+            with open(_column_path(self.path, name), "r+b") as f:
+                f.truncate(sizes[name] * dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        meta["version"] = latest["version"] + 1
+        meta["versions"].append(
+            {
+                "version": meta["version"],
+                "securities": latest["securities"] + len(portfolio),
+                "cashflows": latest["cashflows"] + int(offsets[-1]),
+                "created": datetime.datetime.now().isoformat(),
+            }
+        )
+        _write_meta(self.path, meta)
+        return CashflowStore(self.path, meta["version"])
+
+    def versions(self) -> List[Dict]:
+        with open(os.path.join(self.path, META_FILE)) as f:
+            return json.load(f)["versions"]
+
+    def cashflow_layout(
+            self,
+            adate: Union[datetime.date, np.datetime64],
+            securities: Optional[Union[Sequence[int], np.ndarray]] = None,
+            days_per_year: Optional[Union[int, np.ndarray]] = None,
+    ) -> CashflowLayout:
+        """
+        Cashflows paid on or after the as of date of stored securities without generating coupon schedules.
+        Times to cashflows are laid out like get_cashflow_layout, the time to the next coupon date in actual
+        days / days_per_year plus k / freq for the k-th cashflow after it
+        :param adate: as of date, on or after the start date of the store
+        :param securities: security indices, all securities by default
+        :param days_per_year: scalar or per security, the stored days_per_year of securities by default
+        :return: CashflowLayout of the securities in the given order
+        """
+        adate = to_datetime64_array(adate)[0]
+        if adate < np.datetime64(self.start_date):
+            raise ValueError(f"as of date {adate} is before the start date {self.start_date} of the store")
+        securities = np.arange(len(self)) if securities is None else np.asarray(securities, dtype=np.int64)
+        starts, ends = self.offsets[securities], self.offsets[securities + 1]
+        starts = self._first_unpaid_cashflows(starts, ends, adate)
+        no_of_cashflows = ends - starts
+        if (no_of_cashflows <= 0).any():
+            raise ValueError(f"{np.count_nonzero(no_of_cashflows <= 0)} securities have matured by {adate}")
+        offsets = np.zeros(securities.size + 1, dtype=np.int64)
+        np.cumsum(no_of_cashflows, out=offsets[1:])
+        cashflow_index = np.repeat(starts - offsets[:-1], no_of_cashflows) + np.arange(offsets[-1])
+        if days_per_year is None:
+            days_per_year = self.securities.days_per_year[securities]
+        days_per_year = np.broadcast_to(np.asarray(days_per_year, dtype=np.float64), securities.shape)
+        time_to_next_cpn = (self.cashflow_dates[starts] - adate).astype(np.int64) / days_per_year
+        period = np.arange(offsets[-1]) - np.repeat(offsets[:-1], no_of_cashflows)
+        time_to_cf = np.repeat(time_to_next_cpn, no_of_cashflows) + period / np.repeat(
+            self.securities.freq[securities].astype(np.int64), no_of_cashflows
+        )
+        unique_times, time_index = np.unique(time_to_cf, return_inverse=True)
+        return CashflowLayout(
+            offsets,
+            time_to_cf,
+            np.asarray(self.cashflow_amounts[cashflow_index]),
+            unique_times,
+            time_index.reshape(-1),
+        )
+
+    def _first_unpaid_cashflows(self, starts: np.ndarray, ends: np.ndarray, adate: np.datetime64) -> np.ndarray:
+        # cashflow dates are sorted within each security, so the first cashflow on or after the as of date
+        # comes after all cashflows paid before it
+        lengths = ends - starts
+        offsets = np.zeros(lengths.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        cashflow_index = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        paid = np.zeros(offsets[-1] + 1, dtype=np.int64)
+        np.cumsum(self.cashflow_dates[cashflow_index] < adate, out=paid[1:])
+        return starts + paid[offsets[1:]] - paid[offsets[:-1]]
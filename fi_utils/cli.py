@@ -0,0 +1,106 @@
+import argparse
+import datetime
+import json
+import logging
+import sys
+from typing import List, Optional
+
+# NumPy and the batch valuation modules are imported inside the commands that need them, so that
+# the coupon date and accrued interest commands start without them
+
+
+def _date(value: str) -> datetime.date:
+    return datetime.date.fromisoformat(value)
+
+
+def _read_curve(path: str) -> dict:
+    """
+    Read a JSON object that maps years to interest rates in percentages
+    """
+    with open(path) as f:
+        return {float(tenor): float(rate) for tenor, rate in json.load(f).items()}
+
+
+def price(args: argparse.Namespace):
+    from fi_utils.pipeline import value_positions_file
+
+    stats = value_positions_file(
+        args.input,
+        args.output,
+        adate=args.adate,
+        curve=_read_curve(args.curve) if args.curve else None,
+        chunk_size=args.chunk_size,
+        resume=not args.no_resume,
+    )
+    print(
+        f"valued {stats.rows} positions ({stats.resumed_rows} resumed) in {stats.chunks} chunks, "
+        f"{stats.seconds:.2f}s, {stats.rows_per_second:.0f} rows per second"
+    )
+
+
+def accrued(args: argparse.Namespace):
+    from fi_utils.bond_valuation import calc_accrued_interest, find_next_coupon_date, find_prev_coupon_date
+
+    print(
+        json.dumps(
+            {
+                "prev_coupon_date": find_prev_coupon_date(
+                    args.adate, args.maturity, args.freq, args.days_per_year
+                ).isoformat(),
+                "next_coupon_date": find_next_coupon_date(
+                    args.adate, args.maturity, args.freq, args.days_per_year
+                ).isoformat(),
+                "accrued_interest": calc_accrued_interest(
+                    args.adate, args.maturity, args.coupon, args.freq, args.days_per_year
+                ),
+            }
+        )
+    )
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="fi-utils", description="Fixed Income Analytics calculation utilities")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    price_parser = subparsers.add_parser(
+        "price",
+        help="value a positions CSV",
+        description="Value a positions CSV with maturity, coupon and price (dirty price) columns and optional "
+                    "adate, freq, days_per_year and principal_amount columns. Results are appended to the input "
+                    "columns as ytm, ytm_converged, accrued_interest and, given a curve, pv.",
+    )
+    price_parser.add_argument("input", help="positions CSV")
+    price_parser.add_argument("output", help="results CSV")
+    price_parser.add_argument("--adate", type=_date, help="as of date of positions without an adate column")
+    price_parser.add_argument("--curve", help="JSON file that maps years to interest rates for PV")
+    price_parser.add_argument("--chunk-size", type=int, default=100_000)
+    price_parser.add_argument("--no-resume", action="store_true", help="ignore the checkpoint of a previous run")
+    price_parser.set_defaults(func=price)
+
+    accrued_parser = subparsers.add_parser(
+        "accrued", help="coupon dates and accrued interest of a bond"
+    )
+    accrued_parser.add_argument("--adate", type=_date, required=True)
+    accrued_parser.add_argument("--maturity", type=_date, required=True)
+    accrued_parser.add_argument("--coupon", type=float, required=True)
+    accrued_parser.add_argument("--freq", type=int, default=2)
+    accrued_parser.add_argument("--days-per-year", type=int, default=365)
+    accrued_parser.set_defaults(func=accrued)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = get_parser().parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+    try:
+        args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"fi-utils: error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import bisect
+import calendar
+import datetime
+import functools
+import threading
+from typing import List
+
+from fi_utils.instrumentation import register_cache
+
+COUPON_SCHEDULE_CACHE_SIZE = 65536
+
+# number of coupon periods generated at once when a schedule is extended back in time
+_EXTENSION_PERIODS = 24
+
+
+class CouponSchedule:
+    """
+    Coupon dates of a bond stored as a sorted list of date ordinals.
+    Coupon dates are stepped back from maturity by 12 / freq months, keeping the day of maturity and falling
+    back to the last day of shorter months. The schedule is generated lazily back in time, so a lookup only
+    pays for the periods between maturity and the as of date once. Schedules are shared by the registry and
+    safe to look up from several threads.
+    """
+
+    def __init__(self, maturity: datetime.date, freq: int = 2, days_per_year: int = 365):
+        if freq <= 0 or 12 % freq != 0:
+            raise ValueError(f"coupon frequency {freq} does not divide the year into whole months")
+        self.maturity = maturity
+        self.freq = freq
+        self.days_per_year = days_per_year
+        self._months_per_period = 12 // freq
+        self._ordinals: List[int] = [maturity.toordinal()]
+        self._periods_generated = 1
+        self._lock = threading.Lock()
+
+    def _coupon_date_before_maturity(self, no_of_periods: int) -> datetime.date:
+        months = self.maturity.year * 12 + self.maturity.month - 1 - no_of_periods * self._months_per_period
+        year, month = divmod(months, 12)
+        _, max_day = calendar.monthrange(year, month + 1)
+        return datetime.date(year, month + 1, min(self.maturity.day, max_day))
+
+    def _extend_to(self, ordinal: int) -> List[int]:
+        """
+        Prepend earlier coupon dates until the first coupon date is on or before the ordinal.
+        Extensions are serialized by the lock of the schedule and publish a new list, so a published list is
+        never modified and lookups bisect the list returned here without holding the lock
+        :return: coupon date ordinals
+        """
+        ordinals = self._ordinals
+        if ordinals[0] <= ordinal:
+            return ordinals
+        with self._lock:
+            ordinals = self._ordinals
+            periods_generated = self._periods_generated
+            while ordinals[0] > ordinal:
+                earlier = [
+                    self._coupon_date_before_maturity(period).toordinal()
+                    for period in range(
+                        periods_generated + _EXTENSION_PERIODS - 1,
+                        periods_generated - 1,
+                        -1,
+                    )
+                ]
+                ordinals = earlier + ordinals
+                periods_generated += _EXTENSION_PERIODS
+            self._periods_generated = periods_generated
+            self._ordinals = ordinals
+        return ordinals
+
+    def next_coupon_date(self, adate: datetime.date) -> datetime.date:
+        """
+        First coupon date on or after as of date
+        :param adate: as of date
+        :return:
+        """
+        ordinal = adate.toordinal()
+        if ordinal > self._ordinals[-1]:
+            raise ValueError(f"as of date {adate} is after maturity {self.maturity}")
+        ordinals = self._extend_to(ordinal)
+        return datetime.date.fromordinal(ordinals[bisect.bisect_left(ordinals, ordinal)])
+
+    def prev_coupon_date(self, adate: datetime.date) -> datetime.date:
+        """
+        Last coupon date on or before as of date
+        :param adate: as of date
+        :return:
+        """
+        ordinal = adate.toordinal()
+        ordinals = self._extend_to(ordinal)
+        return datetime.date.fromordinal(ordinals[bisect.bisect_right(ordinals, ordinal) - 1])
+
+    def coupon_dates_between(
+            self, beginning_date: datetime.date, ending_date: datetime.date
+    ) -> List[datetime.date]:
+        """
+        Coupon dates falling within beginning date and ending date, both inclusive
+        :param beginning_date:
+        :param ending_date:
+        :return:
+        """
+        beginning, ending = beginning_date.toordinal(), ending_date.toordinal()
+        ordinals = self._extend_to(beginning)
+        return [
+            datetime.date.fromordinal(ordinal)
+            for ordinal in ordinals[bisect.bisect_left(ordinals, beginning): bisect.bisect_right(ordinals, ending)]
+        ]
+
+
+@functools.lru_cache(maxsize=COUPON_SCHEDULE_CACHE_SIZE)
+def _get_coupon_schedule(maturity: datetime.date, freq: int, days_per_year: int) -> CouponSchedule:
+    return CouponSchedule(maturity, freq, days_per_year)
+
+
+def get_coupon_schedule(
+        maturity: datetime.date, freq: int = 2, days_per_year: int = 365
+) -> CouponSchedule:
+    """
+    Get the coupon schedule of (maturity, freq, days_per_year) from a bounded LRU registry shared by all
+    valuation functions
+    :param maturity:
+    :param freq: coupon frequency
+    :param days_per_year:
+    :return:
+    """
+    return _get_coupon_schedule(maturity, int(freq), int(days_per_year))
+
+
+def clear_coupon_schedule_cache():
+    _get_coupon_schedule.cache_clear()
+
+
+def coupon_schedule_cache_info():
+    return _get_coupon_schedule.cache_info()
+
+
+register_cache("coupon_schedule", coupon_schedule_cache_info)
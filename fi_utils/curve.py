@@ -0,0 +1,93 @@
+from typing import Dict, Tuple, Union
+import numpy as np
+
+from fi_utils.instrumentation import instrumented
+
+
+class Curve:
+    """
+    Interest rate curve with tenors in years and annual interest rates in percentages frozen into contiguous
+    read-only arrays. Rates are interpolated linearly between tenors and extrapolated flat beyond the first
+    and the last tenor, the same way as find_matching_interval_in_curve and
+    calc_interpolated_rate_from_interval_curve do for a curve dictionary.
+    """
+
+    def __init__(self, tenors: np.ndarray, rates: np.ndarray):
+        tenors = np.asarray(tenors, dtype=np.float64).reshape(-1)
+        rates = np.asarray(rates, dtype=np.float64).reshape(-1)
+        if tenors.size == 0 or tenors.shape != rates.shape:
+            raise ValueError("curve needs the same non-zero number of tenors and rates")
+        order = np.argsort(tenors, kind="stable")
+        tenors, rates = np.ascontiguousarray(tenors[order]), np.ascontiguousarray(rates[order])
+        if (np.diff(tenors) == 0).any():
+            raise ValueError("curve tenors must be unique")
+        tenors.setflags(write=False)
+        rates.setflags(write=False)
+        self.tenors = tenors
+        self.rates = rates
+
+    @classmethod
+    def from_dict(cls, curve: Dict[float, float]) -> "Curve":
+        """
+        Compile a curve dictionary that maps years to their corresponding interest rates
+        :param curve:
+        :return:
+        """
+        return cls(np.fromiter(curve.keys(), dtype=np.float64), np.fromiter(curve.values(), dtype=np.float64))
+
+    def to_dict(self) -> Dict[float, float]:
+        return dict(zip(self.tenors.tolist(), self.rates.tolist()))
+
+    def __len__(self) -> int:
+        return self.tenors.size
+
+    def __repr__(self) -> str:
+        return f"Curve({self.to_dict()})"
+
+    def interpolation_weights(self, time_to_cf: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the tenors bracketing each time to cashflow. The interpolated rate is
+        rates[left] * (1 - weight) + rates[right] * weight
+        :param time_to_cf: times to cashflows in years
+        :return: (left tenor indices, right tenor indices, weights of the right tenors)
+        """
+        time_to_cf = np.asarray(time_to_cf, dtype=np.float64)
+        last = self.tenors.size - 1
+        right = np.clip(np.searchsorted(self.tenors, time_to_cf, side="left"), 0, last)
+        left = np.maximum(right - 1, 0)
+        span = self.tenors[right] - self.tenors[left]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(span > 0, (time_to_cf - self.tenors[left]) / span, 0.0)
+        # flat extrapolation before the first tenor
+        weight = np.clip(weight, 0.0, 1.0)
+        return left, right, weight
+
+    @instrumented("curve_interpolation")
+    def rate(self, time_to_cf: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Interpolated annual interest rates in percentages
+        :param time_to_cf: times to cashflows in years
+        :return:
+        """
+        left, right, weight = self.interpolation_weights(time_to_cf)
+        return self.rates[left] * (1 - weight) + self.rates[right] * weight
+
+    def discount_factor(self, time_to_cf: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Discount factors 1 / (1 + rate / 100) ** time_to_cf at interpolated rates
+        :param time_to_cf: times to cashflows in years
+        :return:
+        """
+        time_to_cf = np.asarray(time_to_cf, dtype=np.float64)
+        return (1 + self.rate(time_to_cf) / 100) ** -time_to_cf
+
+
+def as_curve(curve: Union[Dict[float, float], Curve]) -> Curve:
+    """
+    Compile a curve dictionary into a Curve, a Curve is returned as is
+    :param curve:
+    :return:
+    """
+    if isinstance(curve, Curve):
+        return curve
+    return Curve.from_dict(curve)
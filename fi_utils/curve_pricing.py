@@ -0,0 +1,139 @@
+from typing import Dict, NamedTuple, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.instrumentation import instrumented
+from fi_utils.ytm_solver import DateArray, get_coupon_layout
+
+
+class CashflowLayout(NamedTuple):
+    """
+    Cashflows of many bonds in CSR form. Cashflows of bond i are time_to_cf[offsets[i]:offsets[i + 1]] and
+    cashflows[offsets[i]:offsets[i + 1]]. time_index maps every cashflow to its time in unique_times, so that
+    curve lookups are done once per distinct cashflow time across the whole portfolio.
+    """
+
+    offsets: np.ndarray
+    time_to_cf: np.ndarray
+    cashflows: np.ndarray
+    unique_times: np.ndarray
+    time_index: np.ndarray
+
+    @property
+    def no_of_bonds(self) -> int:
+        return self.offsets.size - 1
+
+    @property
+    def bond_index(self) -> np.ndarray:
+        return np.repeat(np.arange(self.no_of_bonds), np.diff(self.offsets))
+
+    def reduce(self, values: np.ndarray) -> np.ndarray:
+        """
+        Sum per cashflow values into per bond values along the last axis
+        :param values: array with cashflows along the last axis
+        :return:
+        """
+        return np.add.reduceat(values, self.offsets[:-1], axis=-1)
+
+
+@instrumented("cashflow_layout")
+def get_cashflow_layout(
+        adates: DateArray,
+        maturities: DateArray,
+        coupons: np.ndarray,
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+) -> CashflowLayout:
+    """
+    Lay out the cashflows of vanilla bonds the same way as get_vanilla_bond_cf_and_time_to_cf does for one bond:
+    coupons of coupon / freq from the next coupon date till maturity and the principal with the last coupon
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param coupons: annual coupon rates
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :param principal_amount: scalar or per bond
+    :return: CashflowLayout
+    """
+    time_to_next_cpn, no_of_periods = get_coupon_layout(
+        adates, maturities, freq, days_per_year
+    )
+    return get_cashflow_layout_from_coupon_layout(
+        time_to_next_cpn, no_of_periods, coupons, freq, principal_amount
+    )
+
+
+def get_cashflow_layout_from_coupon_layout(
+        time_to_next_cpn: np.ndarray,
+        no_of_periods: np.ndarray,
+        coupons: np.ndarray,
+        freq: Union[int, np.ndarray] = 2,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+) -> CashflowLayout:
+    """
+    Lay out the cashflows of vanilla bonds given their coupon layout, see get_cashflow_layout
+    :param time_to_next_cpn: times to next coupon dates in years, see get_coupon_layout
+    :param no_of_periods: numbers of coupon periods after next coupon dates, see get_coupon_layout
+    :param coupons: annual coupon rates
+    :param freq: coupon frequency, scalar or per bond
+    :param principal_amount: scalar or per bond
+    :return: CashflowLayout
+    """
+    time_to_next_cpn, no_of_periods, coupons, freq, principal_amount = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(time_to_next_cpn, dtype=np.float64)),
+        np.asarray(no_of_periods, dtype=np.int64),
+        np.asarray(coupons, dtype=np.float64),
+        np.asarray(freq, dtype=np.int64),
+        np.asarray(principal_amount, dtype=np.float64),
+    )
+    no_of_cashflows = no_of_periods + 1
+    offsets = np.zeros(no_of_cashflows.size + 1, dtype=np.int64)
+    np.cumsum(no_of_cashflows, out=offsets[1:])
+    bond_index = np.repeat(np.arange(no_of_cashflows.size), no_of_cashflows)
+    period = np.arange(offsets[-1]) - offsets[bond_index]
+    time_to_cf = time_to_next_cpn[bond_index] + period / freq[bond_index]
+    cashflows = (coupons / freq)[bond_index]
+    cashflows[offsets[1:] - 1] += principal_amount
+    unique_times, time_index = np.unique(time_to_cf, return_inverse=True)
+    return CashflowLayout(offsets, time_to_cf, cashflows, unique_times, time_index.reshape(-1))
+
+
+@instrumented("curve_pv_batch")
+def calc_pv_from_cashflow_layout(
+        layout: CashflowLayout, curve: Union[Dict[float, float], Curve]
+) -> np.ndarray:
+    """
+    Discount the unique cashflow times of the layout once and sum discounted cashflows per bond
+    :param layout:
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :return: PV per bond
+    """
+    discount_factors = as_curve(curve).discount_factor(layout.unique_times)
+    return layout.reduce(layout.cashflows * discount_factors[layout.time_index])
+
+
+def calc_pv_of_vanilla_bonds(
+        adates: DateArray,
+        maturities: DateArray,
+        coupons: np.ndarray,
+        curve: Union[Dict[float, float], Curve],
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+) -> np.ndarray:
+    """
+    Calculate PV of a portfolio of vanilla bonds against one curve, see calc_pv_of_vanilla_bond for a single bond
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param coupons: annual coupon rates
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :param principal_amount: scalar or per bond
+    :return: PV per bond
+    """
+    layout = get_cashflow_layout(
+        adates, maturities, coupons, freq, days_per_year, principal_amount
+    )
+    return calc_pv_from_cashflow_layout(layout, curve)
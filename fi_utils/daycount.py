@@ -0,0 +1,235 @@
+import datetime
+from typing import NamedTuple, Sequence, Tuple, Union
+import numpy as np
+
+DAY_COUNT_CONVENTIONS = ("ACT/365", "ACT/360", "30/360", "ACT/ACT")
+
+DateArray = Union[np.ndarray, Sequence[datetime.date], datetime.date]
+
+
+def to_datetime64_array(dates: DateArray) -> np.ndarray:
+    """
+    Convert a date, a sequence of dates or a datetime64 array to a datetime64[D] array
+    :param dates:
+    :return:
+    """
+    return np.atleast_1d(np.asarray(dates, dtype="datetime64[D]"))
+
+
+class CouponPeriods(NamedTuple):
+    """
+    Coupon dates around as of dates. prev_cpn_dates are the last coupon dates on or before as of dates and
+    period_end_dates the coupon dates following them, next_cpn_dates are the first coupon dates on or after
+    as of dates, NaT after maturity.
+    """
+
+    prev_cpn_dates: np.ndarray
+    next_cpn_dates: np.ndarray
+    period_end_dates: np.ndarray
+
+
+# days in months of a common year, February gets a day more in leap years
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int32)
+
+
+def _months_per_period(freq: np.ndarray) -> np.ndarray:
+    if (freq <= 0).any() or (12 % np.where(freq > 0, freq, 1) != 0).any():
+        raise ValueError(f"coupon frequencies {np.unique(freq)} do not divide the year into whole months")
+    return 12 // freq
+
+
+def _days_from_civil(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    Days since 1970-01-01 of proleptic Gregorian dates in integer arithmetic, which is several times faster than
+    converting between datetime64 units
+    """
+    years = years - (months <= 2)
+    eras = years // 400
+    year_of_era = years - eras * 400
+    day_of_year = (153 * ((months + 9) % 12) + 2) // 5 + days - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return eras * 146097 + day_of_era - 719468
+
+
+def _civil_from_days(day_numbers: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Inverse of _days_from_civil
+    """
+    day_numbers = day_numbers + 719468
+    eras = day_numbers // 146097
+    day_of_era = day_numbers - eras * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_months = (5 * day_of_year + 2) // 153
+    days = day_of_year - (153 * shifted_months + 2) // 5 + 1
+    months = np.where(shifted_months < 10, shifted_months + 3, shifted_months - 9)
+    return year_of_era + eras * 400 + (months <= 2), months, days
+
+
+def _days_in_month(years: np.ndarray, months: np.ndarray) -> np.ndarray:
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    return _DAYS_IN_MONTH[months - 1] + (leap & (months == 2))
+
+
+def _day_numbers(dates: DateArray) -> np.ndarray:
+    return to_datetime64_array(dates).view(np.int64).astype(np.int32)
+
+
+def split_dates(dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split a datetime64[D] array into years, months (1 to 12) and days of month (1 to 31)
+    :param dates:
+    :return: (years, months, days)
+    """
+    return _civil_from_days(_day_numbers(dates))
+
+
+def _coupon_dates(maturity_months: np.ndarray, maturity_days: np.ndarray, months_before_maturity: np.ndarray):
+    """
+    Day numbers of coupon dates months_before_maturity months before maturity, maturity_months counts months
+    since January of year 0
+    """
+    years, months = np.divmod(maturity_months - months_before_maturity, 12)
+    months = months + 1
+    days = np.minimum(maturity_days, _days_in_month(years, months))
+    return _days_from_civil(years, months, days)
+
+
+def calc_coupon_periods(
+        adates: DateArray, maturities: DateArray, freq: Union[int, np.ndarray] = 2
+) -> CouponPeriods:
+    """
+    Coupon dates around as of dates for arrays of bonds with integer calendar arithmetic. Coupon dates are stepped
+    back from maturity by 12 / freq months keeping the day of maturity, falling back to the last day of shorter
+    months, the same schedule as fi_utils.coupon_schedule.CouponSchedule
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param freq: coupon frequency, scalar or per bond
+    :return: CouponPeriods
+    """
+    # calendar arithmetic runs on int32 day numbers before broadcasting, a single as of date is split once
+    adates, maturities = _day_numbers(adates), _day_numbers(maturities)
+    freq = np.asarray(freq, dtype=np.int32)
+    months_per_period = _months_per_period(freq)
+    maturity_years, maturity_months, maturity_days = _civil_from_days(maturities)
+    maturity_months = maturity_years * 12 + maturity_months - 1
+    adate_years, adate_months, _ = _civil_from_days(adates)
+    adate_months = adate_years * 12 + adate_months - 1
+    adates, maturities, maturity_months, maturity_days, adate_months, months_per_period = np.broadcast_arrays(
+        adates, maturities, maturity_months, maturity_days, adate_months, months_per_period
+    )
+    # smallest number of periods before maturity landing in the month of the as of date or earlier
+    periods = np.maximum(-((adate_months - maturity_months) // months_per_period), 0)
+    coupon_dates = _coupon_dates(maturity_months, maturity_days, periods * months_per_period)
+    periods = np.where(coupon_dates <= adates, periods, periods + 1)
+    prev_cpn_dates = _coupon_dates(maturity_months, maturity_days, periods * months_per_period)
+    period_end_dates = _coupon_dates(maturity_months, maturity_days, (periods - 1) * months_per_period)
+    next_cpn_dates = np.where(prev_cpn_dates == adates, prev_cpn_dates, period_end_dates).astype("datetime64[D]")
+    next_cpn_dates[adates > maturities] = np.datetime64("NaT", "D")
+    return CouponPeriods(
+        prev_cpn_dates.astype("datetime64[D]"), next_cpn_dates, period_end_dates.astype("datetime64[D]")
+    )
+
+
+def calc_no_of_coupon_periods(
+        next_cpn_dates: DateArray, maturities: DateArray, freq: Union[int, np.ndarray] = 2
+) -> np.ndarray:
+    """
+    Number of coupon periods from next coupon dates to maturities counted in months of the coupon schedule.
+    Counting days / days_per_year * freq instead truncates periods shorter than 1 / freq years, such as a
+    181 day half year, and drops a coupon
+    :param next_cpn_dates: coupon dates of the schedules
+    :param maturities:
+    :param freq: coupon frequency, scalar or per bond
+    :return: number of coupon periods after next coupon dates
+    """
+    next_years, next_months, _ = _civil_from_days(_day_numbers(next_cpn_dates))
+    maturity_years, maturity_months, _ = _civil_from_days(_day_numbers(maturities))
+    months = (maturity_years - next_years) * 12 + maturity_months - next_months
+    return (months // _months_per_period(np.asarray(freq, dtype=np.int32))).astype(np.int64)
+
+
+def calc_coupon_schedules(
+        start_dates: DateArray, maturities: DateArray, freq: Union[int, np.ndarray] = 2
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All coupon dates from start dates through maturities of many bonds in CSR form, coupon dates of bond i are
+    coupon_dates[offsets[i]:offsets[i + 1]], see calc_coupon_periods for the schedule
+    :param start_dates: first dates of the schedules, a single date is broadcast to all bonds
+    :param maturities:
+    :param freq: coupon frequency, scalar or per bond
+    :return: (offsets, coupon_dates)
+    """
+    next_cpn_dates = calc_coupon_periods(start_dates, maturities, freq).next_cpn_dates
+    maturities, freq = np.broadcast_arrays(_day_numbers(maturities), np.asarray(freq, dtype=np.int32))
+    months_per_period = _months_per_period(freq)
+    maturity_years, maturity_months, maturity_days = _civil_from_days(maturities)
+    maturity_months = maturity_years * 12 + maturity_months - 1
+    next_years, next_months, _ = _civil_from_days(_day_numbers(next_cpn_dates))
+    no_of_coupons = np.where(
+        np.isnat(next_cpn_dates),
+        0,
+        (maturity_months - (next_years * 12 + next_months - 1)) // months_per_period + 1,
+    )
+    offsets = np.zeros(no_of_coupons.size + 1, dtype=np.int64)
+    np.cumsum(no_of_coupons, out=offsets[1:])
+    bond_index = np.repeat(np.arange(no_of_coupons.size), no_of_coupons)
+    periods_before_maturity = offsets[bond_index + 1] - 1 - np.arange(offsets[-1])
+    coupon_dates = _coupon_dates(
+        maturity_months[bond_index],
+        maturity_days[bond_index],
+        periods_before_maturity * months_per_period[bond_index],
+    ).astype("datetime64[D]")
+    return offsets, coupon_dates
+
+
+def calc_year_fractions(
+        start_dates: DateArray, end_dates: DateArray, day_count: str = "ACT/365"
+) -> np.ndarray:
+    """
+    Year fractions between dates. ACT/365 and ACT/360 divide actual days by 365 and 360, 30/360 is the bond basis
+    that counts months as 30 days, with start days of 31 moved to 30 and end days of 31 moved to 30 when the start
+    day is 30 or 31. ACT/ACT depends on the coupon period, see calc_accrual_fractions
+    :param start_dates:
+    :param end_dates:
+    :param day_count: one of ACT/365, ACT/360 and 30/360
+    :return:
+    """
+    start_dates, end_dates = np.broadcast_arrays(to_datetime64_array(start_dates), to_datetime64_array(end_dates))
+    if day_count == "ACT/365":
+        return (end_dates - start_dates).astype(np.int64) / 365
+    if day_count == "ACT/360":
+        return (end_dates - start_dates).astype(np.int64) / 360
+    if day_count == "30/360":
+        start_years, start_months, start_days = split_dates(start_dates)
+        end_years, end_months, end_days = split_dates(end_dates)
+        start_days = np.minimum(start_days, 30)
+        end_days = np.where(start_days == 30, np.minimum(end_days, 30), end_days)
+        return (
+                360 * (end_years - start_years) + 30 * (end_months - start_months) + (end_days - start_days)
+        ) / 360
+    raise ValueError(f"day count convention {day_count} is not one of ACT/365, ACT/360 and 30/360")
+
+
+def calc_accrual_fractions(
+        adates: DateArray,
+        maturities: DateArray,
+        freq: Union[int, np.ndarray] = 2,
+        day_count: str = "ACT/365",
+) -> np.ndarray:
+    """
+    Fraction of the annual coupon accrued since previous coupon dates. ACT/ACT is the ICMA convention, where the
+    accrued days are divided by the actual days of the coupon period times freq
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param freq: coupon frequency, scalar or per bond
+    :param day_count: one of DAY_COUNT_CONVENTIONS
+    :return:
+    """
+    periods = calc_coupon_periods(adates, maturities, freq)
+    adates = np.broadcast_to(to_datetime64_array(adates), periods.prev_cpn_dates.shape)
+    if day_count == "ACT/ACT":
+        accrued_days = (adates - periods.prev_cpn_dates).astype(np.int64)
+        period_days = (periods.period_end_dates - periods.prev_cpn_dates).astype(np.int64)
+        return accrued_days / (period_days * np.asarray(freq))
+    return calc_year_fractions(periods.prev_cpn_dates, adates, day_count)
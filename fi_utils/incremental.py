@@ -0,0 +1,154 @@
+import datetime
+from typing import Dict, NamedTuple, Optional, Union
+import numpy as np
+
+from fi_utils.curve import Curve
+from fi_utils.curve_pricing import calc_pv_from_cashflow_layout, get_cashflow_layout_from_coupon_layout
+from fi_utils.portfolio import BondPortfolio
+from fi_utils.ytm_solver import calc_ytm_from_coupon_layout, get_coupon_layout
+
+
+class RevaluationResult(NamedTuple):
+    ytm: np.ndarray
+    converged: np.ndarray
+    pv: Optional[np.ndarray]
+    recomputed_layouts: int
+    solved: int
+
+
+class IncrementalRevaluer:
+    """
+    Revalue the same portfolio day over day keeping the coupon layout of every bond between as of dates.
+    When the as of date rolls forward, times to next coupon dates are shifted, and only bonds that paid a coupon
+    since the previous as of date or whose terms changed are laid out again from their coupon schedules.
+    Yields are solved only for bonds whose price, layout or as of date changed, starting from the previous yields.
+    Bonds that matured before the as of date are left out of the layout and get NaN results.
+    """
+
+    def __init__(self, portfolio: BondPortfolio, tol: float = 1e-10, max_iter: int = 50):
+        self.tol = tol
+        self.max_iter = max_iter
+        self.adate: Optional[np.datetime64] = None
+        self._reset(portfolio)
+
+    def _reset(self, portfolio: BondPortfolio):
+        self.portfolio = portfolio[np.arange(len(portfolio))]
+        self._next_cpn_dates = np.full(len(portfolio), np.datetime64("NaT", "D"), dtype="datetime64[D]")
+        self._no_of_periods = np.zeros(len(portfolio), dtype=np.int64)
+        self._prices = np.full(len(portfolio), np.nan)
+        self._ytms = np.full(len(portfolio), np.nan)
+        self._converged = np.zeros(len(portfolio), dtype=bool)
+
+    def _changed_bonds(self, portfolio: BondPortfolio) -> np.ndarray:
+        changed = np.zeros(len(portfolio), dtype=bool)
+        for name, column in portfolio.to_columns().items():
+            changed |= column != getattr(self.portfolio, name)
+        return changed
+
+    def update_portfolio(self, portfolio: BondPortfolio) -> np.ndarray:
+        """
+        Replace the terms of the portfolio, bonds whose terms changed are laid out and solved again on the
+        next revaluation. A portfolio of a different size starts over
+        :param portfolio:
+        :return: changed flags per bond
+        """
+        if len(portfolio) != len(self.portfolio):
+            self._reset(portfolio)
+            return np.ones(len(portfolio), dtype=bool)
+        changed = self._changed_bonds(portfolio)
+        if changed.any():
+            self.portfolio = portfolio[np.arange(len(portfolio))]
+            self._next_cpn_dates[changed] = np.datetime64("NaT", "D")
+            self._ytms[changed] = np.nan
+            self._prices[changed] = np.nan
+        return changed
+
+    def roll(self, adate: Union[datetime.date, np.datetime64]) -> int:
+        """
+        Move the coupon layout to the as of date. Bonds with their next coupon date on or after the as of date
+        keep their layout, the others are laid out again, dropping the coupons paid in between.
+        Bonds that matured before the as of date are left without a layout
+        :param adate: as of date
+        :return: number of bonds laid out again
+        """
+        adate = np.datetime64(adate, "D")
+        matured = self.portfolio.maturities < adate
+        self._next_cpn_dates[matured] = np.datetime64("NaT", "D")
+        self._no_of_periods[matured] = 0
+        stale = np.isnat(self._next_cpn_dates) | (self._next_cpn_dates < adate)
+        if self.adate is not None and adate < self.adate:
+            # coupons paid after an earlier as of date are not kept
+            stale[:] = True
+        index = np.flatnonzero(stale & ~matured)
+        if index.size:
+            portfolio = self.portfolio[index]
+            time_to_next_cpn, no_of_periods = get_coupon_layout(
+                adate, portfolio.maturities, portfolio.freq, portfolio.days_per_year
+            )
+            self._next_cpn_dates[index] = adate + np.rint(
+                time_to_next_cpn * portfolio.days_per_year
+            ).astype(np.int64)
+            self._no_of_periods[index] = no_of_periods
+        self.adate = adate
+        return index.size
+
+    def time_to_next_cpn(self) -> np.ndarray:
+        time_to_next_cpn = (self._next_cpn_dates - self.adate).astype(np.int64) / self.portfolio.days_per_year
+        # matured bonds have no next coupon date
+        time_to_next_cpn[np.isnat(self._next_cpn_dates)] = np.nan
+        return time_to_next_cpn
+
+    def revalue(
+            self,
+            adate: Union[datetime.date, np.datetime64],
+            prices: np.ndarray,
+            curve: Optional[Union[Dict[float, float], Curve]] = None,
+    ) -> RevaluationResult:
+        """
+        Yields to maturity and optionally curve PVs as of the date, NaN and not converged for matured bonds
+        :param adate: as of date
+        :param prices: dirty prices
+        :param curve: interest rate curve for PV, PV is not calculated without a curve
+        :return: RevaluationResult
+        """
+        previous_adate = self.adate
+        recomputed_layouts = self.roll(adate)
+        prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), self._prices.shape)
+        time_to_next_cpn = self.time_to_next_cpn()
+        alive = ~np.isnat(self._next_cpn_dates)
+        self._ytms[~alive] = np.nan
+        self._converged[~alive] = False
+        self._prices[~alive] = np.nan
+        stale = ~(prices == self._prices) | ~self._converged
+        if previous_adate != self.adate:
+            stale[:] = True
+        index = np.flatnonzero(stale & alive)
+        if index.size:
+            portfolio = self.portfolio[index]
+            ytms, converged = calc_ytm_from_coupon_layout(
+                prices[index],
+                portfolio.coupons,
+                time_to_next_cpn[index],
+                self._no_of_periods[index],
+                portfolio.freq,
+                portfolio.principal_amount,
+                self.tol,
+                self.max_iter,
+                initial_ytms=self._ytms[index],
+            )
+            self._ytms[index] = ytms
+            self._converged[index] = converged
+            self._prices[index] = prices[index]
+        pv = None
+        if curve is not None:
+            portfolio = self.portfolio[alive] if not alive.all() else self.portfolio
+            layout = get_cashflow_layout_from_coupon_layout(
+                time_to_next_cpn[alive],
+                self._no_of_periods[alive],
+                portfolio.coupons,
+                portfolio.freq,
+                portfolio.principal_amount,
+            )
+            pv = np.full(alive.shape, np.nan)
+            pv[alive] = calc_pv_from_cashflow_layout(layout, curve)
+        return RevaluationResult(self._ytms.copy(), self._converged.copy(), pv, recomputed_layouts, index.size)
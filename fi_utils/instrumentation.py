@@ -0,0 +1,244 @@
+import collections
+import contextlib
+import functools
+import inspect
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+MAX_RECORDED_FAILURES = 100
+MAX_RECORDED_INDICES = 20
+
+# cache name to a reference to a function returning functools.lru_cache style info with hits and misses,
+# the reference returns None once the cache is garbage collected
+_CACHES: Dict[str, Callable[[], Optional[Callable]]] = {}
+
+
+def register_cache(name: str, cache_info: Callable):
+    """
+    Report hit rates of a cache, cache_info returns an object with hits and misses like functools.lru_cache does.
+    Bound methods are referenced weakly, so registering a cache instance does not keep it alive, and the cache
+    is dropped from the reports once the instance is garbage collected
+    :param name: unique among live caches
+    :param cache_info:
+    :return:
+    """
+    if name in _registered_caches():
+        raise ValueError(f"a cache named {name} is already registered")
+    _CACHES[name] = weakref.WeakMethod(cache_info) if inspect.ismethod(cache_info) else lambda: cache_info
+
+
+def unregister_cache(name: str):
+    """
+    Stop reporting a cache
+    :param name:
+    :return:
+    """
+    _CACHES.pop(name, None)
+
+
+def _registered_caches() -> Dict[str, Callable]:
+    caches = {}
+    for name, ref in list(_CACHES.items()):
+        cache_info = ref()
+        if cache_info is None:
+            _CACHES.pop(name, None)
+        else:
+            caches[name] = cache_info
+    return caches
+
+
+class Telemetry:
+    """
+    Counters collected by instrumented functions while instrumentation is enabled. Stage times are inclusive,
+    so the time of a stage contains the time of the stages it calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = collections.Counter()
+            self.seconds = collections.Counter()
+            self.solver_bonds = collections.Counter()
+            self.solver_iterations = collections.Counter()
+            self.solver_failures = collections.Counter()
+            self.failures = collections.deque(maxlen=MAX_RECORDED_FAILURES)
+            self._cache_baseline = {name: cache_info() for name, cache_info in _registered_caches().items()}
+
+    def record_call(self, stage: str, seconds: float):
+        with self._lock:
+            self.calls[stage] += 1
+            self.seconds[stage] += seconds
+
+    def record_solver(self, stage: str, bonds: int, iterations: int, failures: int, details: Optional[Dict] = None):
+        with self._lock:
+            self.solver_bonds[stage] += bonds
+            self.solver_iterations[stage] += iterations
+            self.solver_failures[stage] += failures
+            if failures and details is not None:
+                self.failures.append({"stage": stage, **details})
+
+    def _cache_stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for name, cache_info in _registered_caches().items():
+            info = cache_info()
+            baseline = self._cache_baseline.get(name)
+            if baseline is not None and info.hits + info.misses < baseline.hits + baseline.misses:
+                # the cache was cleared after the reset
+                baseline = None
+            hits = info.hits - (baseline.hits if baseline else 0)
+            misses = info.misses - (baseline.misses if baseline else 0)
+            stats[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+        return stats
+
+    def snapshot(self) -> Dict:
+        """
+        Counters as a dictionary with keys stages, solvers, caches and failures
+        :return:
+        """
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"calls": self.calls[stage], "seconds": self.seconds[stage]}
+                    for stage in sorted(self.calls)
+                },
+                "solvers": {
+                    stage: {
+                        "bonds": self.solver_bonds[stage],
+                        "iterations": self.solver_iterations[stage],
+                        "failures": self.solver_failures[stage],
+                        "iterations_per_bond": (
+                            self.solver_iterations[stage] / self.solver_bonds[stage]
+                            if self.solver_bonds[stage] else 0.0
+                        ),
+                    }
+                    for stage in sorted(self.solver_bonds)
+                },
+                "caches": self._cache_stats(),
+                "failures": list(self.failures),
+            }
+
+    def to_prometheus(self, prefix: str = "fi_utils") -> str:
+        """
+        Counters in the Prometheus text exposition format
+        :param prefix: metric name prefix
+        :return:
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def add(name: str, label: str, values: Dict[str, float]):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.extend(f'{prefix}_{name}{{{label}="{key}"}} {value}' for key, value in values.items())
+
+        add("stage_calls_total", "stage", {k: v["calls"] for k, v in snapshot["stages"].items()})
+        add("stage_seconds_total", "stage", {k: v["seconds"] for k, v in snapshot["stages"].items()})
+        add("solver_bonds_total", "stage", {k: v["bonds"] for k, v in snapshot["solvers"].items()})
+        add("solver_iterations_total", "stage", {k: v["iterations"] for k, v in snapshot["solvers"].items()})
+        add("solver_failures_total", "stage", {k: v["failures"] for k, v in snapshot["solvers"].items()})
+        add("cache_hits_total", "cache", {k: v["hits"] for k, v in snapshot["caches"].items()})
+        add("cache_misses_total", "cache", {k: v["misses"] for k, v in snapshot["caches"].items()})
+        return "\n".join(lines) + "\n"
+
+
+telemetry = Telemetry()
+_enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+@contextlib.contextmanager
+def collect(reset: bool = True) -> Iterator[Telemetry]:
+    """
+    Enable instrumentation within the block
+    :param reset: start from zero counters
+    :return: the global Telemetry
+    """
+    global _enabled
+    previous = _enabled
+    if reset:
+        telemetry.reset()
+    _enabled = True
+    try:
+        yield telemetry
+    finally:
+        _enabled = previous
+
+
+def instrumented(stage: str) -> Callable:
+    """
+    Count calls and time of the decorated function under stage while instrumentation is enabled.
+    When disabled the wrapper only checks a module flag before calling through.
+    :param stage:
+    :return:
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                telemetry.record_call(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def record_call(stage: str, seconds: float):
+    """
+    Record one call of a stage timed by the caller while instrumentation is enabled, for hot paths that check
+    is_enabled inline instead of paying for the instrumented wrapper
+    :param stage:
+    :param seconds:
+    :return:
+    """
+    if _enabled:
+        telemetry.record_call(stage, seconds)
+
+
+def record_solver(stage: str, bonds: int, iterations: int, failures: int, details: Optional[Dict] = None):
+    """
+    Record solver iterations and failures while instrumentation is enabled
+    :param stage:
+    :param bonds: number of bonds solved
+    :param iterations: iterations or PV evaluations summed over bonds
+    :param failures: number of bonds that did not converge
+    :param details: inputs of a failed solve kept among the last MAX_RECORDED_FAILURES failures
+    :return:
+    """
+    if _enabled:
+        telemetry.record_solver(stage, bonds, iterations, failures, details)
+
+
+def failed_index_details(failed: Sequence[int]) -> Dict:
+    """
+    Details of a failed batch solve of bounded size, however many bonds of the batch failed
+    :param failed: indices of the bonds that did not converge
+    :return: number of failed bonds and the first MAX_RECORDED_INDICES of their indices
+    """
+    return {"count": len(failed), "indices": [int(i) for i in failed[:MAX_RECORDED_INDICES]]}
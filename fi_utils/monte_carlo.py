@@ -0,0 +1,376 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.curve_pricing import CashflowLayout
+from fi_utils.instrumentation import instrumented
+from fi_utils.scenarios import DEFAULT_MAX_MEMORY_BYTES
+
+DEFAULT_STEPS_PER_YEAR = 52
+HISTOGRAM_BINS = 1 << 14
+
+
+class ShortRateModel(NamedTuple):
+    """
+    One factor Gaussian short rate r(t_i) = x(t_i) + shift[i] on the grid t_i = i * dt, where x is an
+    Ornstein-Uhlenbeck process dx = -mean_reversion * x dt + volatility dW started at 0. Vasicek and Hull-White
+    models only differ in the deterministic shift. Rates are continuously compounded decimals.
+    """
+
+    times: np.ndarray
+    shift: np.ndarray
+    mean_reversion: float
+    volatility: float
+
+    @property
+    def dt(self) -> float:
+        return float(self.times[1] - self.times[0])
+
+    @property
+    def horizon(self) -> float:
+        return float(self.times[-1])
+
+
+def _time_grid(horizon: float, steps_per_year: int) -> np.ndarray:
+    return np.arange(max(1, math.ceil(horizon * steps_per_year - 1e-9)) + 1) / steps_per_year
+
+
+def _ou_variance(mean_reversion: float, volatility: float, times: np.ndarray) -> np.ndarray:
+    if mean_reversion == 0:
+        return volatility ** 2 * times
+    return volatility ** 2 * -np.expm1(-2 * mean_reversion * times) / (2 * mean_reversion)
+
+
+def vasicek_model(
+        short_rate: float,
+        mean_reversion: float,
+        long_term_rate: float,
+        volatility: float,
+        horizon: float,
+        steps_per_year: int = DEFAULT_STEPS_PER_YEAR,
+) -> ShortRateModel:
+    """
+    Vasicek model dr = mean_reversion * (long_term_rate - r) dt + volatility dW
+    :param short_rate: initial short rate in percentages
+    :param mean_reversion: speed of mean reversion per year
+    :param long_term_rate: long term mean of the short rate in percentages
+    :param volatility: volatility of the short rate in percentages per square root of a year
+    :param horizon: simulated years, at least the longest cashflow time of the portfolio
+    :param steps_per_year: time steps per year
+    :return: ShortRateModel
+    """
+    times = _time_grid(horizon, steps_per_year)
+    decay = np.exp(-mean_reversion * times[:-1])
+    shift = (long_term_rate + (short_rate - long_term_rate) * decay) / 100
+    return ShortRateModel(times, shift, float(mean_reversion), volatility / 100)
+
+
+def hull_white_model(
+        curve: Union[Dict[float, float], Curve],
+        mean_reversion: float,
+        volatility: float,
+        horizon: float,
+        steps_per_year: int = DEFAULT_STEPS_PER_YEAR,
+) -> ShortRateModel:
+    """
+    Hull-White model dr = (theta(t) - mean_reversion * r) dt + volatility dW fitted to an initial curve on the
+    simulation grid. The shift makes the expected simulated discount factor at every grid time equal to the
+    discount factor of the curve, E[exp(-sum r(t_i) dt)] = exp(-sum shift[i] dt + Var(sum x(t_i) dt) / 2)
+    :param curve: initial curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :param mean_reversion: speed of mean reversion per year
+    :param volatility: volatility of the short rate in percentages per square root of a year
+    :param horizon: simulated years, at least the longest cashflow time of the portfolio
+    :param steps_per_year: time steps per year
+    :return: ShortRateModel
+    """
+    times = _time_grid(horizon, steps_per_year)
+    dt = times[1]
+    volatility = volatility / 100
+    decay = math.exp(-mean_reversion * dt)
+    x_variance = _ou_variance(mean_reversion, volatility, times)
+    # variance of the integrated process sum_{i<k} x(t_i) dt, with the covariance of the integral and x(t_k)
+    # carried from one step to the next
+    integral_variance = np.zeros(times.size)
+    covariance = 0.0
+    for k in range(times.size - 1):
+        integral_variance[k + 1] = integral_variance[k] + 2 * dt * covariance + dt ** 2 * x_variance[k]
+        covariance = decay * (covariance + dt * x_variance[k])
+    log_discount_factors = np.log(as_curve(curve).discount_factor(times))
+    shift = np.diff(-log_discount_factors + integral_variance / 2) / dt
+    return ShortRateModel(times, shift, float(mean_reversion), volatility)
+
+
+def simulate_discount_factors(model: ShortRateModel, n_paths: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Simulate short rate paths with the exact Ornstein-Uhlenbeck transition and discount along them,
+    DF(t_k) = exp(-sum_{i<k} r(t_i) dt)
+    :param model: ShortRateModel
+    :param n_paths: number of paths
+    :param rng: NumPy random generator
+    :return: discount factors of shape (n_paths, n_times) on the time grid of the model
+    """
+    dt = model.dt
+    decay = math.exp(-model.mean_reversion * dt)
+    step_std = math.sqrt(_ou_variance(model.mean_reversion, model.volatility, np.array(dt)))
+    no_of_steps = model.shift.size
+    # time along the first axis keeps the step of all paths contiguous
+    rates = rng.standard_normal((no_of_steps, n_paths))
+    rates *= step_std
+    x = np.zeros(n_paths)
+    for i in range(no_of_steps):
+        x, rates[i] = decay * x + rates[i], x
+    rates += model.shift[:, None]
+    log_discount_factors = np.zeros((no_of_steps + 1, n_paths))
+    np.cumsum(rates, axis=0, out=log_discount_factors[1:])
+    log_discount_factors *= -dt
+    return np.exp(log_discount_factors, out=log_discount_factors).T
+
+
+def _tail_count(count: int, confidence: float) -> int:
+    # rounded before the ceiling so that 1 - 0.99 does not count one path more
+    return max(math.ceil(round(count * (1 - confidence), 9)), 1)
+
+
+class PVStatistics:
+    """
+    Streaming statistics of simulated portfolio PVs. Mean and standard deviation are merged chunk by chunk,
+    the tail_size lowest PVs are kept exactly for VaR and expected shortfall, and quantiles are read from a
+    histogram of a fixed number of bins. Its range is set by the first chunk and doubled, merging pairs of bins,
+    whenever a later chunk falls outside of it, so memory does not grow with the number of paths.
+    Quantiles outside of the exact tail are accurate to one histogram bin.
+    """
+
+    def __init__(self, tail_size: int, bins: int = HISTOGRAM_BINS):
+        if bins < 2 or bins % 2:
+            raise ValueError(f"bins must be an even number of at least 2, got {bins}")
+        self.tail_size = max(int(tail_size), 1)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._tail = np.empty(0)
+        self._bins = bins
+        self._low: Optional[float] = None
+        self._width = 0.0
+        self._histogram = np.zeros(bins, dtype=np.int64)
+
+    def _widen(self, low: float, high: float):
+        # each doubling merges pairs of bins into the half of the histogram on the side of the old range
+        half = self._bins // 2
+        while low < self._low or high >= self._low + self._bins * self._width:
+            merged = self._histogram.reshape(half, 2).sum(axis=1)
+            self._histogram[:] = 0
+            if low < self._low:
+                self._histogram[half:] = merged
+                self._low -= self._bins * self._width
+            else:
+                self._histogram[:half] = merged
+            self._width *= 2
+
+    def update(self, pvs: np.ndarray):
+        pvs = np.asarray(pvs, dtype=np.float64).reshape(-1)
+        if pvs.size == 0:
+            return
+        # Chan et al. merge of count, mean and sum of squared deviations
+        count = self.count + pvs.size
+        chunk_mean = pvs.mean()
+        delta = chunk_mean - self.mean
+        self._m2 += ((pvs - chunk_mean) ** 2).sum() + delta ** 2 * self.count * pvs.size / count
+        self.mean += delta * pvs.size / count
+        self.count = count
+        tail = np.concatenate([self._tail, pvs])
+        if tail.size > self.tail_size:
+            tail = np.partition(tail, self.tail_size - 1)[: self.tail_size]
+        self._tail = tail
+        low, high = float(pvs.min()), float(pvs.max())
+        if self._low is None:
+            margin = max(high - low, abs(high) * 1e-9, 1e-12)
+            self._low = low - margin
+            self._width = (high - low + 2 * margin) / self._bins
+        else:
+            self._widen(low, high)
+        bins = ((pvs - self._low) / self._width).astype(np.int64)
+        self._histogram += np.bincount(np.clip(bins, 0, self._bins - 1), minlength=self._bins)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def quantile(self, levels: Union[float, Sequence[float]]) -> np.ndarray:
+        """
+        Quantiles of simulated PVs
+        :param levels: probabilities between 0 and 1
+        :return:
+        """
+        levels = np.atleast_1d(np.asarray(levels, dtype=np.float64))
+        tail = np.sort(self._tail)
+        cumulative = np.concatenate([[0], np.cumsum(self._histogram)])
+        quantiles = np.empty(levels.size)
+        for i, rank in enumerate(levels * (self.count - 1)):
+            if rank <= tail.size - 1:
+                lower = int(math.floor(rank))
+                upper = min(lower + 1, tail.size - 1)
+                quantiles[i] = tail[lower] + (tail[upper] - tail[lower]) * (rank - lower)
+            else:
+                # linear interpolation of the empirical distribution within the bin holding the rank
+                bin_index = min(np.searchsorted(cumulative, rank, side="right") - 1, self._bins - 1)
+                share = (rank + 0.5 - cumulative[bin_index]) / max(self._histogram[bin_index], 1)
+                quantiles[i] = self._low + self._width * (bin_index + min(max(share, 0.0), 1.0))
+        return quantiles
+
+    def value_at_risk(self, confidence: float = 0.99) -> float:
+        """
+        Loss of PV against the mean PV exceeded with probability 1 - confidence
+        :param confidence:
+        :return:
+        """
+        return self.mean - float(self.quantile(1 - confidence)[0])
+
+    def expected_shortfall(self, confidence: float = 0.99) -> float:
+        """
+        Mean loss of PV against the mean PV over the worst 1 - confidence share of paths
+        :param confidence:
+        :return:
+        """
+        no_of_worst = _tail_count(self.count, confidence)
+        if no_of_worst > self._tail.size:
+            raise ValueError(f"expected shortfall at {confidence} needs the {no_of_worst} lowest PVs but "
+                             f"{self._tail.size} are kept")
+        return self.mean - float(np.sort(self._tail)[:no_of_worst].mean())
+
+
+class MonteCarloResult(NamedTuple):
+    """
+    Simulated PV distribution of a portfolio, mean_pv holds the mean PV of each bond and statistics the
+    streaming statistics of the portfolio PV
+    """
+
+    mean_pv: np.ndarray
+    statistics: PVStatistics
+
+
+def _log_discount_interpolation(model: ShortRateModel, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    right = np.clip(np.searchsorted(model.times, times), 1, model.times.size - 1)
+    weight = np.clip((times - model.times[right - 1]) / model.dt, 0.0, 1.0)
+    return right, weight
+
+
+def _simulate_pvs_chunk(
+        layout: CashflowLayout,
+        model: ShortRateModel,
+        quantities: np.ndarray,
+        interpolation: Tuple[np.ndarray, np.ndarray],
+        seed: np.random.SeedSequence,
+        n_paths: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    discount_factors = simulate_discount_factors(model, n_paths, np.random.default_rng(seed))
+    right, weight = interpolation
+    # log discount factors are interpolated linearly between grid times
+    log_discount_factors = np.log(discount_factors[:, right - 1]) * (1 - weight) + np.log(
+        discount_factors[:, right]
+    ) * weight
+    pvs = layout.reduce(np.exp(log_discount_factors)[:, layout.time_index] * layout.cashflows)
+    return pvs.sum(axis=0), pvs @ quantities
+
+
+_worker_state = {}
+
+
+def _init_worker(layout: CashflowLayout, model: ShortRateModel, quantities: np.ndarray):
+    _worker_state["layout"] = layout
+    _worker_state["model"] = model
+    _worker_state["quantities"] = quantities
+    _worker_state["interpolation"] = _log_discount_interpolation(model, layout.unique_times)
+
+
+def _run_worker_chunk(seed: np.random.SeedSequence, n_paths: int) -> Tuple[np.ndarray, np.ndarray]:
+    return _simulate_pvs_chunk(
+        _worker_state["layout"],
+        _worker_state["model"],
+        _worker_state["quantities"],
+        _worker_state["interpolation"],
+        seed,
+        n_paths,
+    )
+
+
+def get_path_chunk_size(
+        layout: CashflowLayout, model: ShortRateModel, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES
+) -> int:
+    """
+    Number of paths whose temporaries (short rates and discount factors on the time grid, discount factors per
+    unique time, discounted cashflows and PV per bond) fit into max_memory_bytes
+    :param layout:
+    :param model:
+    :param max_memory_bytes:
+    :return:
+    """
+    bytes_per_path = 8 * (
+            3 * model.times.size + 3 * layout.unique_times.size + 2 * layout.cashflows.size + layout.no_of_bonds
+    )
+    return max(1, max_memory_bytes // bytes_per_path)
+
+
+@instrumented("monte_carlo")
+def simulate_portfolio_pvs(
+        layout: CashflowLayout,
+        model: ShortRateModel,
+        n_paths: int,
+        quantities: Optional[np.ndarray] = None,
+        seed: Optional[int] = None,
+        confidence: float = 0.99,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        n_jobs: int = 1,
+) -> MonteCarloResult:
+    """
+    PV distribution of a portfolio under simulated short rate paths. Paths are generated in chunks, each chunk
+    from its own child of one SeedSequence, so results depend on the seed and the memory budget but not on the
+    number of processes. Path discount factors are interpolated onto the unique cashflow times of the layout and
+    chunks are reduced into streaming statistics of the portfolio PV without keeping the paths
+    :param layout: cashflow layout of the portfolio, see get_cashflow_layout
+    :param model: ShortRateModel, see vasicek_model and hull_white_model
+    :param n_paths: number of paths
+    :param quantities: position sizes per bond, one unit of each bond by default
+    :param seed: seed of the NumPy random generator
+    :param confidence: highest confidence level of expected shortfall, sizes the exact lower tail kept
+    :param max_memory_bytes: memory budget for temporaries of one chunk
+    :param n_jobs: number of worker processes, chunks are simulated in the calling process if 1
+    :return: MonteCarloResult
+    """
+    if layout.unique_times.size and layout.unique_times[-1] > model.horizon + 1e-9:
+        raise ValueError(
+            f"cashflows up to {layout.unique_times[-1]} years are beyond the model horizon of {model.horizon}"
+        )
+    quantities = np.broadcast_to(
+        np.asarray(1.0 if quantities is None else quantities, dtype=np.float64), (layout.no_of_bonds,)
+    )
+    chunk_size = get_path_chunk_size(layout, model, max_memory_bytes)
+    chunks = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    statistics = PVStatistics(_tail_count(n_paths, confidence) + 1)
+    pv_sums = np.zeros(layout.no_of_bonds)
+    if n_jobs == 1 or len(chunks) == 1:
+        interpolation = _log_discount_interpolation(model, layout.unique_times)
+        for chunk_seed, chunk_paths in zip(seeds, chunks):
+            chunk_pv_sums, portfolio_pvs = _simulate_pvs_chunk(
+                layout, model, quantities, interpolation, chunk_seed, chunk_paths
+            )
+            pv_sums += chunk_pv_sums
+            statistics.update(portfolio_pvs)
+        return MonteCarloResult(pv_sums / n_paths, statistics)
+    with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(layout, model, quantities),
+    ) as executor:
+        futures = [
+            executor.submit(_run_worker_chunk, chunk_seed, chunk_paths)
+            for chunk_seed, chunk_paths in zip(seeds, chunks)
+        ]
+        # chunks are reduced in submission order, so statistics match the single process run
+        for future in futures:
+            chunk_pv_sums, portfolio_pvs = future.result()
+            pv_sums += chunk_pv_sums
+            statistics.update(portfolio_pvs)
+    return MonteCarloResult(pv_sums / n_paths, statistics)
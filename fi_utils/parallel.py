@@ -0,0 +1,260 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.curve_pricing import calc_pv_of_vanilla_bonds
+from fi_utils.portfolio import BondPortfolio
+from fi_utils.ytm_solver import (
+    DateArray,
+    calc_accrued_interest_of_bonds,
+    calc_ytm_of_bonds,
+    to_datetime64_array,
+)
+
+DEFAULT_TASK_SIZE = 8192
+
+# shared memory block name, shape and dtype of an array
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+
+def _ytm_kernel(columns: Dict[str, np.ndarray], tol: float, max_iter: int) -> Dict[str, np.ndarray]:
+    ytms, converged = calc_ytm_of_bonds(
+        columns["prices"],
+        columns["coupons"],
+        columns["adates"],
+        columns["maturities"],
+        columns["days_per_year"],
+        columns["freq"],
+        columns["principal_amount"],
+        tol,
+        max_iter,
+    )
+    return {"ytms": ytms, "converged": converged}
+
+
+def _pv_kernel(columns: Dict[str, np.ndarray], tenors: np.ndarray, rates: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "pvs": calc_pv_of_vanilla_bonds(
+            columns["adates"],
+            columns["maturities"],
+            columns["coupons"],
+            Curve(tenors, rates),
+            columns["freq"],
+            columns["days_per_year"],
+            columns["principal_amount"],
+        )
+    }
+
+
+def _accrued_interest_kernel(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {
+        "accrued_interest": calc_accrued_interest_of_bonds(
+            columns["adates"],
+            columns["maturities"],
+            columns["coupons"],
+            columns["freq"],
+            columns["days_per_year"],
+        )
+    }
+
+
+_KERNELS: Dict[str, Callable[..., Dict[str, np.ndarray]]] = {
+    "ytm": _ytm_kernel,
+    "pv": _pv_kernel,
+    "accrued_interest": _accrued_interest_kernel,
+}
+
+
+def _attach(specs: Dict[str, ArraySpec]) -> Tuple[List[shared_memory.SharedMemory], Dict[str, np.ndarray]]:
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def _run_task(
+        kernel_name: str,
+        input_specs: Dict[str, ArraySpec],
+        output_specs: Dict[str, ArraySpec],
+        start: int,
+        stop: int,
+        args: tuple,
+) -> int:
+    """
+    Run a kernel on rows start:stop of the shared input arrays and write into the shared output arrays
+    """
+    blocks, inputs = _attach(input_specs)
+    output_blocks, outputs = _attach(output_specs)
+    try:
+        results = _KERNELS[kernel_name](
+            {name: array[start:stop] for name, array in inputs.items()}, *args
+        )
+        for name, values in results.items():
+            outputs[name][start:stop] = values
+        # drop views on the buffers before closing them
+        del inputs, outputs, results
+    finally:
+        for block in blocks + output_blocks:
+            block.close()
+    return stop - start
+
+
+class ParallelValuationExecutor:
+    """
+    Value portfolios across worker processes. Inputs and results live in shared memory blocks that workers
+    attach to by name, so only block names and row ranges are pickled per task. The portfolio is split into
+    tasks of task_size bonds that idle workers pick up as they finish, which balances the load when some
+    bonds take more solver iterations than others.
+    """
+
+    def __init__(self, n_workers: Optional[int] = None, task_size: int = DEFAULT_TASK_SIZE):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.task_size = task_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParallelValuationExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # workers are started on first use and reused across runs until shutdown
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers)
+        return self._executor
+
+    def run(
+            self,
+            kernel_name: str,
+            inputs: Dict[str, np.ndarray],
+            outputs: Dict[str, np.dtype],
+            args: tuple = (),
+    ) -> Dict[str, np.ndarray]:
+        """
+        Run a registered kernel over equally long input columns in parallel
+        :param kernel_name: one of ytm, pv and accrued_interest
+        :param inputs: column name to 1-d array, all of the same length
+        :param outputs: result name to dtype
+        :param args: extra arguments of the kernel, pickled once per task
+        :return: result name to array
+        """
+        size = len(next(iter(inputs.values())))
+        blocks, input_specs, output_specs, output_arrays = [], {}, {}, {}
+        try:
+            for name, values in inputs.items():
+                block, input_specs[name] = self._create_block(values.shape, values.dtype)
+                blocks.append(block)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            for name, dtype in outputs.items():
+                block, output_specs[name] = self._create_block((size,), np.dtype(dtype))
+                blocks.append(block)
+                output_arrays[name] = np.ndarray((size,), dtype=dtype, buffer=block.buf)
+            futures = [
+                self.executor.submit(
+                    _run_task,
+                    kernel_name,
+                    input_specs,
+                    output_specs,
+                    start,
+                    min(start + self.task_size, size),
+                    args,
+                )
+                for start in range(0, size, self.task_size)
+            ]
+            wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                future.cancel()
+            for future in futures:
+                if not future.cancelled():
+                    future.result()
+            return {name: array.copy() for name, array in output_arrays.items()}
+        finally:
+            # views have to be released before the blocks are closed
+            output_arrays.clear()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    @staticmethod
+    def _create_block(shape: Tuple[int, ...], dtype: np.dtype):
+        block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        return block, (block.name, shape, dtype.str)
+
+    @staticmethod
+    def _portfolio_inputs(portfolio: BondPortfolio, adates: DateArray) -> Dict[str, np.ndarray]:
+        inputs = portfolio.to_columns()
+        inputs["adates"] = np.broadcast_to(to_datetime64_array(adates), (len(portfolio),))
+        return inputs
+
+    def ytm(
+            self,
+            portfolio: BondPortfolio,
+            prices: np.ndarray,
+            adates: DateArray,
+            tol: float = 1e-10,
+            max_iter: int = 50,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Yields to maturity from dirty prices, see calc_ytm_of_bonds
+        :param portfolio:
+        :param prices: dirty prices, one per bond of the portfolio
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param tol:
+        :param max_iter:
+        :return: (ytms in percentages, converged flags)
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.shape != (len(portfolio),):
+            raise ValueError(f"prices of shape {prices.shape} given for {len(portfolio)} bonds")
+        inputs = self._portfolio_inputs(portfolio, adates)
+        inputs["prices"] = prices
+        results = self.run(
+            "ytm", inputs, {"ytms": np.float64, "converged": np.bool_}, (tol, max_iter)
+        )
+        return results["ytms"], results["converged"]
+
+    def pv(
+            self,
+            portfolio: BondPortfolio,
+            adates: DateArray,
+            curve: Union[Dict[float, float], Curve],
+    ) -> np.ndarray:
+        """
+        Present values against a curve, see calc_pv_of_vanilla_bonds
+        :param portfolio:
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+        :return:
+        """
+        curve = as_curve(curve)
+        return self.run(
+            "pv",
+            self._portfolio_inputs(portfolio, adates),
+            {"pvs": np.float64},
+            (curve.tenors, curve.rates),
+        )["pvs"]
+
+    def accrued_interest(self, portfolio: BondPortfolio, adates: DateArray) -> np.ndarray:
+        """
+        Accrued interest, see calc_accrued_interest_of_bonds
+        :param portfolio:
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :return:
+        """
+        return self.run(
+            "accrued_interest",
+            self._portfolio_inputs(portfolio, adates),
+            {"accrued_interest": np.float64},
+        )["accrued_interest"]
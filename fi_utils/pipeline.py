@@ -0,0 +1,236 @@
+import csv
+import datetime
+import io
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.portfolio import BondPortfolio
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+RESULT_COLUMNS = ("ytm", "ytm_converged", "accrued_interest", "pv")
+
+
+class PipelineStats(NamedTuple):
+    rows: int
+    chunks: int
+    resumed_rows: int
+    seconds: float
+    rows_per_second: float
+
+
+def _checkpoint_path(output_path: str) -> str:
+    return f"{output_path}.checkpoint"
+
+
+def _read_checkpoint(output_path: str) -> Optional[Dict]:
+    try:
+        with open(_checkpoint_path(output_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(output_path: str, checkpoint: Dict):
+    tmp_path = f"{_checkpoint_path(output_path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _checkpoint_path(output_path))
+
+
+def _can_resume(checkpoint: Dict, input_path: str, output_path: str, parameters: Dict) -> bool:
+    """
+    Whether a checkpoint belongs to the same input and valuation parameters and its output is still intact
+    """
+    if checkpoint["input_path"] != os.path.abspath(input_path):
+        return False
+    if checkpoint.get("parameters") != parameters:
+        logging.warning(f"valuation parameters changed since the checkpoint of {output_path}, starting over")
+        return False
+    try:
+        output_bytes = os.path.getsize(output_path)
+    except FileNotFoundError:
+        output_bytes = -1
+    if output_bytes < checkpoint["output_bytes"]:
+        logging.warning(
+            f"{output_path} is shorter than the {checkpoint['output_bytes']} bytes of its checkpoint, starting over"
+        )
+        return False
+    return True
+
+
+def _read_positions(reader, input_path: str, no_of_columns: int) -> Iterator[List[str]]:
+    """
+    Rows of a positions CSV without blank lines, a row whose number of fields differs from the header raises
+    ValueError before it reaches a chunk
+    """
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != no_of_columns:
+            raise ValueError(
+                f"{input_path} line {reader.line_num} has {len(row)} fields but the header has {no_of_columns}"
+            )
+        yield row
+
+
+def value_positions_chunk(
+        columns: Dict[str, List[str]],
+        adate: Optional[datetime.date] = None,
+        curve: Optional[Curve] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Value one chunk of positions given as CSV string columns. Required columns are maturity, coupon and price
+    (dirty price), freq, days_per_year and principal_amount are optional, and an adate column overrides adate.
+    Positions valued after maturity get NaN results and ytm_converged False
+    :param columns: column name to list of strings
+    :param adate: as of date of positions without an adate column
+    :param curve: compiled curve for PV, PV is not calculated without a curve
+    :return: result column name to array
+    """
+    portfolio = BondPortfolio.from_columns(
+        {
+            "maturities": np.array(columns["maturity"], dtype="datetime64[D]"),
+            "coupons": np.array(columns["coupon"], dtype=np.float64),
+            **{
+                name: np.array(columns[name], dtype=np.float64).astype(dtype)
+                for name, dtype in (
+                    ("freq", np.int64),
+                    ("days_per_year", np.int64),
+                    ("principal_amount", np.float64),
+                )
+                if name in columns
+            },
+        }
+    )
+    adates = np.array(columns["adate"], dtype="datetime64[D]") if "adate" in columns else adate
+    if adates is None:
+        raise ValueError("positions need an adate column or an as of date")
+    adates = np.broadcast_to(np.asarray(adates, dtype="datetime64[D]"), portfolio.maturities.shape)
+    prices = np.array(columns["price"], dtype=np.float64)
+    # positions valued after maturity get NaN results instead of failing the whole chunk
+    alive = adates <= portfolio.maturities
+    if not alive.all():
+        portfolio, adates, prices = portfolio.filter(alive), adates[alive], prices[alive]
+    ytms, converged = portfolio.ytm(prices, adates)
+    results = {
+        "ytm": ytms,
+        "ytm_converged": converged,
+        "accrued_interest": portfolio.accrued_interest(adates),
+    }
+    if curve is not None:
+        results["pv"] = portfolio.pv(adates, curve)
+    if alive.all():
+        return results
+    for name, values in results.items():
+        results[name] = np.full(alive.shape, False if values.dtype == bool else np.nan, dtype=values.dtype)
+        results[name][alive] = values
+    return results
+
+
+def value_positions_file(
+        input_path: str,
+        output_path: str,
+        adate: Optional[datetime.date] = None,
+        curve: Optional[Union[Dict[float, float], Curve]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        resume: bool = True,
+) -> PipelineStats:
+    """
+    Stream a positions CSV through YTM, accrued interest and curve PV chunk by chunk, appending results to the
+    output CSV after every chunk so that memory stays bounded by the chunk size. Progress is checkpointed next to
+    the output file after each chunk, and a rerun with resume continues after the last completed chunk, so
+    rerunning a completed run only reads the input. A run starts over instead of resuming when the as of date,
+    the curve or the result columns differ from the checkpoint, or when the output is shorter than checkpointed.
+    See value_positions_chunk for the input columns, output rows are the input rows followed by result columns.
+    Blank lines are skipped, and a row with more or fewer fields than the header raises ValueError
+    :param input_path: positions CSV with a header row
+    :param output_path: results CSV
+    :param adate: as of date of positions without an adate column
+    :param curve: interest rate curve for PV, either a dictionary that maps time to interest rates or a
+    compiled Curve, PV is not calculated without a curve
+    :param chunk_size: number of positions valued at once
+    :param resume: resume from the checkpoint of a previous run instead of starting over
+    :return: PipelineStats
+    """
+    if curve is not None:
+        curve = as_curve(curve)
+    result_columns = [name for name in RESULT_COLUMNS if name != "pv" or curve is not None]
+    # valuation parameters in their JSON form, so that they compare equal to the ones read from a checkpoint
+    parameters = json.loads(
+        json.dumps(
+            {
+                "adate": adate.isoformat() if adate is not None else None,
+                "curve": list(zip(curve.tenors.tolist(), curve.rates.tolist())) if curve is not None else None,
+                "result_columns": result_columns,
+            }
+        )
+    )
+    checkpoint = _read_checkpoint(output_path) if resume else None
+    if checkpoint is not None and not _can_resume(checkpoint, input_path, output_path, parameters):
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = {
+            "input_path": os.path.abspath(input_path),
+            "parameters": parameters,
+            "rows": 0,
+            "chunks": 0,
+            "output_bytes": 0,
+        }
+    resumed_rows = checkpoint["rows"]
+    start = time.perf_counter()
+    with open(input_path, newline="") as input_file, open(output_path, "a+b") as output_file:
+        # drop output written after the last checkpoint by an interrupted run
+        output_file.truncate(checkpoint["output_bytes"])
+        reader = csv.reader(input_file)
+        header = next(reader)
+        if checkpoint["output_bytes"] == 0:
+            output_file.write(_to_csv_bytes([header + result_columns]))
+        rows = itertools.islice(_read_positions(reader, input_path, len(header)), checkpoint["rows"], None)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            results = value_positions_chunk(dict(zip(header, zip(*chunk))), adate, curve)
+            output_file.write(
+                _to_csv_bytes(
+                    row + list(values)
+                    for row, values in zip(
+                        chunk, zip(*(results[name].tolist() for name in result_columns))
+                    )
+                )
+            )
+            output_file.flush()
+            os.fsync(output_file.fileno())
+            checkpoint["rows"] += len(chunk)
+            checkpoint["chunks"] += 1
+            checkpoint["output_bytes"] = output_file.tell()
+            _write_checkpoint(output_path, checkpoint)
+            seconds = time.perf_counter() - start
+            logging.info(
+                f"valued {checkpoint['rows']} positions in {checkpoint['chunks']} chunks, "
+                f"{(checkpoint['rows'] - resumed_rows) / seconds:.0f} rows per second"
+            )
+    seconds = time.perf_counter() - start
+    rows = checkpoint["rows"] - resumed_rows
+    return PipelineStats(
+        checkpoint["rows"],
+        checkpoint["chunks"],
+        resumed_rows,
+        seconds,
+        rows / seconds if seconds > 0 else 0.0,
+    )
+
+
+def _to_csv_bytes(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
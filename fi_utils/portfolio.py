@@ -0,0 +1,244 @@
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from fi_utils.curve import Curve
+from fi_utils.curve_pricing import (
+    CashflowLayout,
+    calc_pv_from_cashflow_layout,
+    get_cashflow_layout,
+)
+from fi_utils.risk import (
+    CurveRisk,
+    YieldRisk,
+    calc_curve_risk_from_cashflow_layout,
+    calc_yield_risk_from_cashflow_layout,
+)
+from fi_utils.spread import calc_z_spreads_from_cashflow_layout
+from fi_utils.timeseries import TimeSeriesValuation, calc_time_series
+from fi_utils.ytm_solver import (
+    DateArray,
+    calc_accrued_interest_of_bonds,
+    calc_pv_from_ytms,
+    calc_ytm_of_bonds,
+    to_datetime64_array,
+)
+
+# datetime64[D] maturity, float64 coupon, int8 freq, int16 days_per_year and float64 principal amount
+BYTES_PER_BOND = 8 + 8 + 1 + 2 + 8
+
+_COLUMNS = ("maturities", "coupons", "freq", "days_per_year", "principal_amount")
+
+
+class BondPortfolio:
+    """
+    Vanilla bonds stored column-wise in typed NumPy arrays, BYTES_PER_BOND = 27 bytes per bond.
+    Slicing with a slice returns a portfolio of views on the same arrays, indexing with a boolean mask or
+    an index array copies the selected bonds.
+    """
+
+    def __init__(
+            self,
+            maturities: DateArray,
+            coupons: Union[float, Sequence[float], np.ndarray],
+            freq: Union[int, Sequence[int], np.ndarray] = 2,
+            days_per_year: Union[int, Sequence[int], np.ndarray] = 365,
+            principal_amount: Union[float, Sequence[float], np.ndarray] = 100.0,
+    ):
+        maturities = np.array(to_datetime64_array(maturities).reshape(-1))
+        shape = maturities.shape
+        self.maturities = maturities
+        self.coupons = np.broadcast_to(np.asarray(coupons, dtype=np.float64), shape).copy()
+        self.freq = np.broadcast_to(np.asarray(freq, dtype=np.int8), shape).copy()
+        self.days_per_year = np.broadcast_to(np.asarray(days_per_year, dtype=np.int16), shape).copy()
+        self.principal_amount = np.broadcast_to(
+            np.asarray(principal_amount, dtype=np.float64), shape
+        ).copy()
+
+    @classmethod
+    def _from_arrays(cls, *columns: np.ndarray) -> "BondPortfolio":
+        portfolio = cls.__new__(cls)
+        for name, column in zip(_COLUMNS, columns):
+            setattr(portfolio, name, column)
+        return portfolio
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence]) -> "BondPortfolio":
+        """
+        Build a portfolio from a mapping of column names to lists or arrays, columns other than
+        maturities and coupons are optional
+        :param columns:
+        :return:
+        """
+        return cls(**{name: columns[name] for name in _COLUMNS if name in columns})
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping]) -> "BondPortfolio":
+        """
+        Build a portfolio from dictionaries with keys maturity, coupon and optionally freq, days_per_year and
+        principal_amount
+        :param records:
+        :return:
+        """
+        records = list(records)
+        columns = {
+            "maturities": [record["maturity"] for record in records],
+            "coupons": np.fromiter((record["coupon"] for record in records), np.float64, len(records)),
+        }
+        for name, default in (("freq", 2), ("days_per_year", 365), ("principal_amount", 100.0)):
+            if any(name in record for record in records):
+                columns[name] = [record.get(name, default) for record in records]
+        return cls.from_columns(columns)
+
+    def __len__(self) -> int:
+        return self.maturities.size
+
+    def __getitem__(self, key: Union[slice, np.ndarray, Sequence[int]]) -> "BondPortfolio":
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 if key != -1 else None)
+        return self._from_arrays(*(getattr(self, name)[key] for name in _COLUMNS))
+
+    def filter(self, mask: np.ndarray) -> "BondPortfolio":
+        """
+        Bonds for which mask is True
+        :param mask: boolean array with one flag per bond
+        :return:
+        """
+        return self[np.asarray(mask, dtype=bool)]
+
+    def __repr__(self) -> str:
+        return f"BondPortfolio({len(self)} bonds, {self.nbytes} bytes)"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _COLUMNS)
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+    def ytm(
+            self,
+            prices: np.ndarray,
+            adates: DateArray,
+            tol: float = 1e-10,
+            max_iter: int = 50,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Yields to maturity from dirty prices, see calc_ytm_of_bonds
+        :param prices: dirty prices
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param tol:
+        :param max_iter:
+        :return: (ytms in percentages, converged flags)
+        """
+        return calc_ytm_of_bonds(
+            prices,
+            self.coupons,
+            adates,
+            self.maturities,
+            self.days_per_year,
+            self.freq,
+            self.principal_amount,
+            tol,
+            max_iter,
+        )
+
+    def pv_from_ytm(self, ytms: np.ndarray, adates: DateArray) -> np.ndarray:
+        """
+        Present values from yields to maturity, see calc_pv_from_ytms
+        :param ytms: yields to maturity in percentages
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :return:
+        """
+        return calc_pv_from_ytms(
+            ytms,
+            self.coupons,
+            adates,
+            self.maturities,
+            self.days_per_year,
+            self.freq,
+            self.principal_amount,
+        )
+
+    def cashflow_layout(self, adates: DateArray) -> CashflowLayout:
+        return get_cashflow_layout(
+            adates,
+            self.maturities,
+            self.coupons,
+            self.freq,
+            self.days_per_year,
+            self.principal_amount,
+        )
+
+    def pv(self, adates: DateArray, curve: Union[Dict[float, float], Curve]) -> np.ndarray:
+        """
+        Present values against a curve, see calc_pv_of_vanilla_bonds
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+        :return:
+        """
+        return calc_pv_from_cashflow_layout(self.cashflow_layout(adates), curve)
+
+    def z_spread(
+            self, prices: np.ndarray, adates: DateArray, curve: Union[Dict[float, float], Curve]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Z-spreads over a curve, see calc_z_spreads
+        :param prices: dirty prices
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+        :return: (spreads in percentages, converged flags)
+        """
+        return calc_z_spreads_from_cashflow_layout(self.cashflow_layout(adates), prices, curve)
+
+    def yield_risk(self, ytms: np.ndarray, adates: DateArray) -> YieldRisk:
+        """
+        Durations, convexity and DV01 from yields to maturity, see calc_yield_risk
+        :param ytms: yields to maturity in percentages
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :return:
+        """
+        return calc_yield_risk_from_cashflow_layout(self.cashflow_layout(adates), ytms)
+
+    def curve_risk(self, adates: DateArray, curve: Union[Dict[float, float], Curve]) -> CurveRisk:
+        """
+        Effective and key-rate durations against a curve, see calc_curve_risk
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+        :return:
+        """
+        return calc_curve_risk_from_cashflow_layout(self.cashflow_layout(adates), curve)
+
+    def accrued_interest(self, adates: DateArray, day_count: Optional[str] = None) -> np.ndarray:
+        """
+        Accrued interest, see calc_accrued_interest_of_bonds
+        :param adates: as of dates, a single date is broadcast to all bonds
+        :param day_count: one of fi_utils.daycount.DAY_COUNT_CONVENTIONS, actual days / days_per_year by default
+        :return:
+        """
+        return calc_accrued_interest_of_bonds(
+            adates, self.maturities, self.coupons, self.freq, self.days_per_year, day_count
+        )
+
+    def time_series(
+            self,
+            adates: DateArray,
+            ytms: Optional[np.ndarray] = None,
+            curves: Optional[Sequence[Union[Dict[float, float], Curve]]] = None,
+    ) -> TimeSeriesValuation:
+        """
+        PV, accrued interest and clean price history over many as of dates, see calc_time_series
+        :param adates: as of dates
+        :param ytms: yields to maturity in percentages of shape (n_dates, n_bonds)
+        :param curves: one curve per as of date
+        :return:
+        """
+        return calc_time_series(
+            adates,
+            self.maturities,
+            self.coupons,
+            ytms,
+            curves,
+            self.freq,
+            self.days_per_year,
+            self.principal_amount,
+        )
@@ -0,0 +1,310 @@
+import asyncio
+import collections
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+
+from fi_utils.curve import Curve
+from fi_utils.curve_pricing import calc_pv_of_vanilla_bonds
+from fi_utils.ytm_solver import calc_pv_from_ytms, calc_ytm_of_bonds
+
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_MAX_BATCH_SIZE = 1024
+DEFAULT_MAX_PENDING = 16384
+LATENCY_SAMPLES = 10000
+
+# a pending request is (method, params, future, submitted at)
+PendingRequest = Tuple[str, Dict[str, Any], asyncio.Future, float]
+
+
+def _column(params: List[Dict[str, Any]], name: str, default=None, dtype=np.float64) -> np.ndarray:
+    return np.array([p.get(name, default) if default is not None else p[name] for p in params], dtype=dtype)
+
+
+def _evaluate_ytm(params: List[Dict[str, Any]]) -> List[float]:
+    ytms, converged = calc_ytm_of_bonds(
+        _column(params, "price"),
+        _column(params, "coupon_rate"),
+        _column(params, "adate", dtype="datetime64[D]"),
+        _column(params, "maturity", dtype="datetime64[D]"),
+        _column(params, "days_per_year", 365, np.int64),
+        _column(params, "freq", 2, np.int64),
+        _column(params, "principal_amount", 100.0),
+    )
+    return [ytm if ok else ValueError("failed to solve ytm") for ytm, ok in zip(ytms.tolist(), converged)]
+
+
+def _evaluate_pv_from_ytm(params: List[Dict[str, Any]]) -> List[float]:
+    return calc_pv_from_ytms(
+        _column(params, "ytm"),
+        _column(params, "coupon_rate"),
+        _column(params, "adate", dtype="datetime64[D]"),
+        _column(params, "maturity", dtype="datetime64[D]"),
+        _column(params, "days_per_year", 365, np.int64),
+        _column(params, "freq", 2, np.int64),
+        _column(params, "principal_amount", 100.0),
+    ).tolist()
+
+
+def _evaluate_curve_pv(params: List[Dict[str, Any]]) -> List[float]:
+    # requests sharing a curve are priced together against one compiled curve
+    groups = collections.defaultdict(list)
+    for i, p in enumerate(params):
+        groups[tuple(sorted((float(t), float(r)) for t, r in p["curve"].items()))].append(i)
+    results = [0.0] * len(params)
+    for curve, indices in groups.items():
+        group = [params[i] for i in indices]
+        pvs = calc_pv_of_vanilla_bonds(
+            _column(group, "adate", dtype="datetime64[D]"),
+            _column(group, "maturity", dtype="datetime64[D]"),
+            _column(group, "coupon"),
+            Curve(*zip(*curve)),
+            _column(group, "freq", 2, np.int64),
+            _column(group, "days_per_year", 365, np.int64),
+        )
+        for i, pv in zip(indices, pvs.tolist()):
+            results[i] = pv
+    return results
+
+
+METHODS: Dict[str, Callable[[List[Dict[str, Any]]], List[Any]]] = {
+    "ytm": _evaluate_ytm,
+    "pv_from_ytm": _evaluate_pv_from_ytm,
+    "curve_pv": _evaluate_curve_pv,
+}
+
+
+def _evaluate(method: str, params: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Evaluate a batch with the vectorized kernel, falling back to one request at a time if the batch fails
+    so that a bad request only fails itself
+    """
+    evaluate = METHODS[method]
+    try:
+        return evaluate(params)
+    except Exception:
+        results = []
+        for p in params:
+            try:
+                results.extend(evaluate([p]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class PricingService:
+    """
+    Local pricing service collecting concurrent requests into micro-batches. A batch is closed when it holds
+    max_batch_size requests or batch_window seconds after its first request, and is evaluated with the vectorized
+    kernels in a worker thread while the next batch is being collected. Requests wait in a queue of at most
+    max_pending requests, submit blocks while the queue is full, which pushes back on clients.
+    Methods are ytm (calc_ytm_of_bond), pv_from_ytm (calculate_pv_from_ytm) and curve_pv (calc_pv_of_vanilla_bond)
+    with the same parameter names as those functions, dates as ISO strings.
+    Closing the service fails the requests that were not priced yet with RuntimeError.
+    """
+
+    def __init__(
+            self,
+            batch_window: float = DEFAULT_BATCH_WINDOW,
+            max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+            max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._servers: List[asyncio.AbstractServer] = []
+        # futures of requests queued, being collected into a batch or being evaluated
+        self._pending: Set[asyncio.Future] = set()
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._requests = 0
+        self._batches = 0
+
+    async def __aenter__(self) -> "PricingService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._batch_task = asyncio.create_task(self._batch_loop())
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_task = None
+        # requests that were not priced fail instead of leaving submit waiting forever
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait()
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(RuntimeError("service closed"))
+        self._pending.clear()
+
+    async def submit(self, method: str, params: Dict[str, Any]) -> float:
+        """
+        Price one request
+        :param method: ytm, pv_from_ytm or curve_pv
+        :param params: keyword arguments of the method
+        :return:
+        """
+        return await (await self._enqueue(method, params))
+
+    async def _enqueue(self, method: str, params: Dict[str, Any]) -> asyncio.Future:
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method}")
+        if self._batch_task is None:
+            raise RuntimeError("service closed")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        await self._queue.put((method, params, future, time.perf_counter()))
+        return future
+
+    async def _next_batch(self) -> List[PendingRequest]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self):
+        # the next batch is collected while the previous one is evaluated, one batch is evaluated at a time
+        evaluating: Optional[asyncio.Task] = None
+        try:
+            while True:
+                batch = await self._next_batch()
+                if evaluating is not None:
+                    await evaluating
+                    # requests that arrived while the previous batch was evaluated join this one
+                    while len(batch) < self.max_batch_size and not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                evaluating = asyncio.create_task(self._evaluate_batch(batch))
+        finally:
+            if evaluating is not None:
+                evaluating.cancel()
+
+    async def _evaluate_batch(self, batch: List[PendingRequest]):
+        # a failure outside the kernels fails the batch, not the batch loop
+        try:
+            await self._evaluate_batch_by_method(batch)
+        except Exception as e:
+            logging.exception(f"failed to evaluate a batch of {len(batch)} pricing requests")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _evaluate_batch_by_method(self, batch: List[PendingRequest]):
+        loop = asyncio.get_running_loop()
+        by_method = collections.defaultdict(list)
+        for request in batch:
+            by_method[request[0]].append(request)
+        for method, requests in by_method.items():
+            results = await loop.run_in_executor(
+                None, _evaluate, method, [params for _, params, _, _ in requests]
+            )
+            now = time.perf_counter()
+            for (_, _, future, submitted), result in zip(requests, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+                self._latencies.append(now - submitted)
+        self._requests += len(batch)
+        self._batches += 1
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Requests and batches served, p50/p99 latency in milliseconds over the last LATENCY_SAMPLES requests,
+        average batch fill ratio against max_batch_size and current queue depth
+        :return:
+        """
+        latencies = np.array(self._latencies) * 1000
+        return {
+            "requests": self._requests,
+            "batches": self._batches,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if latencies.size else 0.0,
+            "batch_fill_ratio": self._requests / self._batches / self.max_batch_size if self._batches else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve newline delimited JSON requests {"id": ..., "method": ..., "params": {...}} and answer each with
+        {"id": ..., "result": ...} or {"id": ..., "error": ...} as soon as it is priced. A line that is not valid
+        JSON or not a JSON object is answered with an error and id null.
+        The method metrics returns the service metrics.
+        """
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request_id: Any, result: Any):
+            response = {"id": request_id}
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                response["result"] = await result if asyncio.isfuture(result) else result
+            except Exception as e:
+                response["error"] = str(e)
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    request = ValueError(f"pricing request is not valid JSON: {e}")
+                request_id = request.get("id") if isinstance(request, dict) else None
+                # waiting for queue space here stops reading from the client while the service is saturated
+                try:
+                    if isinstance(request, ValueError):
+                        raise request
+                    if not isinstance(request, dict):
+                        raise ValueError(f"pricing request is a JSON {type(request).__name__}, not an object")
+                    if request.get("method") == "metrics":
+                        result = self.metrics()
+                    else:
+                        result = await self._enqueue(request["method"], request.get("params", {}))
+                except Exception as e:
+                    result = e
+                task = asyncio.create_task(respond(request_id, result))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path: str) -> asyncio.AbstractServer:
+        server = await asyncio.start_unix_server(self._handle_connection, path=path)
+        self._servers.append(server)
+        return server
+
+    async def serve_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+        self._servers.append(server)
+        return server
@@ -0,0 +1,196 @@
+from typing import Dict, NamedTuple, Optional, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.curve_pricing import CashflowLayout, get_cashflow_layout
+from fi_utils.ytm_solver import DateArray
+
+
+class YieldRisk(NamedTuple):
+    """
+    Yield based risk measures. Durations and convexity are in years, DV01 is the PV change for one basis point
+    """
+
+    pv: np.ndarray
+    macaulay_duration: np.ndarray
+    modified_duration: np.ndarray
+    convexity: np.ndarray
+    dv01: np.ndarray
+
+
+class CurveRisk(NamedTuple):
+    """
+    Curve based risk measures. key_rate_durations[..., j] is the relative PV sensitivity to the rate at the j-th
+    curve tenor, their sum is the effective duration under a parallel shift of the curve
+    """
+
+    pv: np.ndarray
+    effective_duration: np.ndarray
+    dv01: np.ndarray
+    key_rate_durations: np.ndarray
+    key_rate_dv01: np.ndarray
+
+
+def calc_yield_risk_from_cashflow_layout(
+        layout: CashflowLayout, ytms: np.ndarray
+) -> YieldRisk:
+    """
+    Calculate PV, durations, convexity and DV01 per bond from yields to maturity in a single pass over the
+    cashflows, discounting with 1 / (1 + ytm / 100) ** time_to_cf
+    :param layout: cashflow layout of the portfolio, see get_cashflow_layout
+    :param ytms: yields to maturity in percentages, scalar or per bond
+    :return: YieldRisk per bond
+    """
+    growth = 1 + np.broadcast_to(np.asarray(ytms, dtype=np.float64), (layout.no_of_bonds,)) / 100
+    time_to_cf = layout.time_to_cf
+    discounted = layout.cashflows * growth[layout.bond_index] ** -time_to_cf
+    pv, time_weighted, convexity_weighted = layout.reduce(
+        np.stack(
+            [discounted, time_to_cf * discounted, time_to_cf * (time_to_cf + 1) * discounted]
+        )
+    )
+    macaulay_duration = time_weighted / pv
+    modified_duration = macaulay_duration / growth
+    return YieldRisk(
+        pv,
+        macaulay_duration,
+        modified_duration,
+        convexity_weighted / pv / growth ** 2,
+        pv * modified_duration * 1e-4,
+    )
+
+
+def calc_yield_risk(
+        ytms: np.ndarray,
+        coupon_rates: np.ndarray,
+        adates: DateArray,
+        maturities: DateArray,
+        days_per_year: Union[int, np.ndarray] = 365,
+        freq: Union[int, np.ndarray] = 2,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+) -> YieldRisk:
+    """
+    Calculate PV, Macaulay and modified duration, convexity and DV01 of many bonds from their yields to maturity.
+    PV is the same as calculate_pv_from_ytm
+    :param ytms: yields to maturity in percentages
+    :param coupon_rates: coupon rates in percentages
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param days_per_year: scalar or per bond
+    :param freq: coupon frequency, scalar or per bond
+    :param principal_amount: scalar or per bond
+    :return: YieldRisk per bond
+    """
+    layout = get_cashflow_layout(
+        adates, maturities, coupon_rates, freq, days_per_year, principal_amount
+    )
+    return calc_yield_risk_from_cashflow_layout(layout, ytms)
+
+
+def calc_curve_risk_from_cashflow_layout(
+        layout: CashflowLayout, curve: Union[Dict[float, float], Curve]
+) -> CurveRisk:
+    """
+    Calculate PV, effective duration, DV01 and key-rate durations against the tenors of the curve in a single
+    pass over the cashflows. A tenor rate moves the interpolated rate of a cashflow by its interpolation weight
+    :param layout: cashflow layout of the portfolio, see get_cashflow_layout
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :return: CurveRisk per bond, key-rate measures have shape (n_bonds, n_tenors)
+    """
+    curve = as_curve(curve)
+    left, right, weight = curve.interpolation_weights(layout.unique_times)
+    growth = 1 + curve.rate(layout.unique_times) / 100
+    discounted = layout.cashflows * (growth ** -layout.unique_times)[layout.time_index]
+    # minus the derivative of the discounted cashflow with respect to the rate as a decimal
+    sensitivity = discounted * (layout.unique_times / growth)[layout.time_index]
+    bond_index = layout.bond_index
+    no_of_tenors = len(curve)
+    key_rate_sensitivity = np.bincount(
+        np.concatenate(
+            [
+                bond_index * no_of_tenors + left[layout.time_index],
+                bond_index * no_of_tenors + right[layout.time_index],
+            ]
+        ),
+        weights=np.concatenate(
+            [
+                sensitivity * (1 - weight[layout.time_index]),
+                sensitivity * weight[layout.time_index],
+            ]
+        ),
+        minlength=layout.no_of_bonds * no_of_tenors,
+    ).reshape(layout.no_of_bonds, no_of_tenors)
+    pv = layout.reduce(discounted)
+    key_rate_durations = key_rate_sensitivity / pv[:, None]
+    effective_duration = key_rate_durations.sum(axis=1)
+    return CurveRisk(
+        pv,
+        effective_duration,
+        pv * effective_duration * 1e-4,
+        key_rate_durations,
+        key_rate_sensitivity * 1e-4,
+    )
+
+
+def calc_curve_risk(
+        adates: DateArray,
+        maturities: DateArray,
+        coupons: np.ndarray,
+        curve: Union[Dict[float, float], Curve],
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+) -> CurveRisk:
+    """
+    Calculate PV, effective duration, DV01 and key-rate durations of many vanilla bonds against a curve.
+    PV is the same as calc_pv_of_vanilla_bond
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param coupons: annual coupon rates
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :param principal_amount: scalar or per bond
+    :return: CurveRisk per bond
+    """
+    layout = get_cashflow_layout(
+        adates, maturities, coupons, freq, days_per_year, principal_amount
+    )
+    return calc_curve_risk_from_cashflow_layout(layout, curve)
+
+
+def _aggregate(risk: NamedTuple, quantities: Optional[np.ndarray], additive: set) -> tuple:
+    if quantities is not None:
+        quantities = np.asarray(quantities, dtype=np.float64)
+    pv = risk.pv if quantities is None else risk.pv * quantities
+    total_pv = pv.sum()
+    aggregates = []
+    for name, values in zip(risk._fields, risk):
+        if name != "pv" and name not in additive:
+            values = values * (pv / total_pv if values.ndim == 1 else (pv / total_pv)[:, None])
+        elif quantities is not None:
+            values = values * (quantities if values.ndim == 1 else quantities[:, None])
+        aggregates.append(values.sum(axis=0))
+    return tuple(aggregates)
+
+
+def aggregate_yield_risk(risk: YieldRisk, quantities: Optional[np.ndarray] = None) -> YieldRisk:
+    """
+    Aggregate per bond yield risk into portfolio risk. PV and DV01 are summed, durations and convexity are
+    averaged with PV weights
+    :param risk: YieldRisk per bond
+    :param quantities: number of bonds held per position, one of each by default
+    :return: YieldRisk of the portfolio
+    """
+    return YieldRisk(*_aggregate(risk, quantities, {"dv01"}))
+
+
+def aggregate_curve_risk(risk: CurveRisk, quantities: Optional[np.ndarray] = None) -> CurveRisk:
+    """
+    Aggregate per bond curve risk into portfolio risk. PV and DV01s are summed, durations are averaged with
+    PV weights
+    :param risk: CurveRisk per bond
+    :param quantities: number of bonds held per position, one of each by default
+    :return: CurveRisk of the portfolio
+    """
+    return CurveRisk(*_aggregate(risk, quantities, {"dv01", "key_rate_dv01"}))
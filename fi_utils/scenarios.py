@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.curve_pricing import CashflowLayout
+
+DEFAULT_MAX_MEMORY_BYTES = 256 * 2 ** 20
+
+
+def parallel_shift_scenarios(
+        curve: Union[Dict[float, float], Curve], shifts: Sequence[float]
+) -> np.ndarray:
+    """
+    Scenario matrix shifting every tenor of the curve by the same amount
+    :param curve:
+    :param shifts: shifts in percentages, 0.01 is one basis point
+    :return: scenario matrix of shape (n_scenarios, n_tenors)
+    """
+    curve = as_curve(curve)
+    return np.repeat(np.asarray(shifts, dtype=np.float64)[:, None], len(curve), axis=1)
+
+
+def twist_scenarios(
+        curve: Union[Dict[float, float], Curve],
+        twists: Sequence[float],
+        pivot: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Scenario matrix rotating the curve around a pivot tenor. A twist moves the longest tenor up by half of the
+    twist relative to the pivot and the shortest tenor down by the other half for a pivot in the middle
+    :param curve:
+    :param twists: change of the long end relative to the short end in percentages
+    :param pivot: tenor left unchanged, by default the middle of the curve
+    :return: scenario matrix of shape (n_scenarios, n_tenors)
+    """
+    tenors = as_curve(curve).tenors
+    span = tenors[-1] - tenors[0]
+    if span == 0:
+        raise ValueError("a curve with a single tenor cannot be twisted")
+    if pivot is None:
+        pivot = (tenors[0] + tenors[-1]) / 2
+    return np.asarray(twists, dtype=np.float64)[:, None] * ((tenors - pivot) / span)
+
+
+def key_rate_scenarios(
+        curve: Union[Dict[float, float], Curve], bump: float = 0.01
+) -> np.ndarray:
+    """
+    Scenario matrix bumping one tenor of the curve at a time
+    :param curve:
+    :param bump: bump in percentages, 0.01 is one basis point
+    :return: scenario matrix of shape (n_tenors, n_tenors)
+    """
+    return np.eye(len(as_curve(curve))) * bump
+
+
+def _calc_scenario_pvs_chunk(
+        layout: CashflowLayout,
+        base_rates: np.ndarray,
+        weights: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        scenarios: np.ndarray,
+) -> np.ndarray:
+    left, right, weight = weights
+    rates = base_rates + scenarios[:, left] * (1 - weight) + scenarios[:, right] * weight
+    discount_factors = (1 + rates / 100) ** -layout.unique_times
+    return layout.reduce(discount_factors[:, layout.time_index] * layout.cashflows)
+
+
+_worker_state = {}
+
+
+def _init_worker(layout: CashflowLayout, curve: Curve, scenarios: np.ndarray):
+    _worker_state["layout"] = layout
+    _worker_state["base_rates"] = curve.rate(layout.unique_times)
+    _worker_state["weights"] = curve.interpolation_weights(layout.unique_times)
+    _worker_state["scenarios"] = scenarios
+
+
+def _run_worker_chunk(start: int, stop: int) -> Tuple[int, np.ndarray]:
+    return start, _calc_scenario_pvs_chunk(
+        _worker_state["layout"],
+        _worker_state["base_rates"],
+        _worker_state["weights"],
+        _worker_state["scenarios"][start:stop],
+    )
+
+
+def get_scenario_chunk_size(
+        layout: CashflowLayout, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES
+) -> int:
+    """
+    Number of scenarios whose temporaries (rates and discount factors per unique time, discounted cashflows and
+    PV per bond) fit into max_memory_bytes
+    :param layout:
+    :param max_memory_bytes:
+    :return:
+    """
+    bytes_per_scenario = 8 * (
+            3 * layout.unique_times.size + 2 * layout.cashflows.size + layout.no_of_bonds
+    )
+    return max(1, max_memory_bytes // bytes_per_scenario)
+
+
+def calc_scenario_pvs(
+        layout: CashflowLayout,
+        curve: Union[Dict[float, float], Curve],
+        scenarios: np.ndarray,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        n_jobs: int = 1,
+) -> np.ndarray:
+    """
+    Reprice a portfolio under curve scenarios. Every scenario adds its row of rate shocks to the curve rates
+    at the curve tenors, and the shocked curve is interpolated like the base curve. The cashflow layout and
+    the interpolation weights of the unique cashflow times are shared by all scenarios, and scenarios are
+    evaluated in chunks so that temporaries stay within max_memory_bytes per process.
+    :param layout: cashflow layout of the portfolio, see get_cashflow_layout
+    :param curve: base curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :param scenarios: rate shocks in percentages of shape (n_scenarios, n_tenors)
+    :param max_memory_bytes: memory budget for temporaries of one chunk
+    :param n_jobs: number of worker processes, chunks are evaluated in the calling process if 1
+    :return: PV matrix of shape (n_scenarios, n_bonds)
+    """
+    curve = as_curve(curve)
+    scenarios = np.atleast_2d(np.asarray(scenarios, dtype=np.float64))
+    if scenarios.shape[1] != len(curve):
+        raise ValueError(
+            f"scenario matrix has {scenarios.shape[1]} columns but the curve has {len(curve)} tenors"
+        )
+    chunk_size = get_scenario_chunk_size(layout, max_memory_bytes)
+    pvs = np.empty((scenarios.shape[0], layout.no_of_bonds))
+    chunks = [
+        (start, min(start + chunk_size, scenarios.shape[0]))
+        for start in range(0, scenarios.shape[0], chunk_size)
+    ]
+    if n_jobs == 1 or len(chunks) == 1:
+        base_rates = curve.rate(layout.unique_times)
+        weights = curve.interpolation_weights(layout.unique_times)
+        for start, stop in chunks:
+            pvs[start:stop] = _calc_scenario_pvs_chunk(
+                layout, base_rates, weights, scenarios[start:stop]
+            )
+        return pvs
+    with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(layout, curve, scenarios),
+    ) as executor:
+        futures = [executor.submit(_run_worker_chunk, start, stop) for start, stop in chunks]
+        for future in futures:
+            start, chunk_pvs = future.result()
+            pvs[start: start + chunk_pvs.shape[0]] = chunk_pvs
+    return pvs
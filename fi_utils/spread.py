@@ -0,0 +1,96 @@
+from typing import Dict, Tuple, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.curve_pricing import CashflowLayout, get_cashflow_layout
+from fi_utils.instrumentation import failed_index_details, instrumented, is_enabled, record_solver
+from fi_utils.ytm_solver import DateArray
+
+
+@instrumented("z_spread_batch")
+def calc_z_spreads_from_cashflow_layout(
+        layout: CashflowLayout,
+        prices: np.ndarray,
+        curve: Union[Dict[float, float], Curve],
+        tol: float = 1e-10,
+        max_iter: int = 50,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Solve Z-spreads of many bonds at once with vectorized Newton iteration. Cashflows are discounted at
+    interpolated rate plus spread, 1 / (1 + (rate + spread) / 100) ** time_to_cf. Rates are interpolated once per
+    unique cashflow time before iterating, and each bond drops out of the iteration as soon as it converges
+    :param layout: cashflows of the bonds, see get_cashflow_layout
+    :param prices: dirty prices
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :param tol: convergence tolerance on spreads in percentages, relative for spreads above 1%
+    :param max_iter: maximum number of Newton iterations
+    :return: (spreads in percentages, NaN where not converged, converged flags)
+    """
+    prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), (layout.no_of_bonds,))
+    rates = as_curve(curve).rate(layout.unique_times)[layout.time_index]
+    # spreads must keep 1 + (rate + spread) / 100 positive for every cashflow
+    lower_bounds = -100 - np.minimum.reduceat(rates, layout.offsets[:-1]) + 1e-6
+    spreads = np.zeros(layout.no_of_bonds)
+    converged = np.zeros(layout.no_of_bonds, dtype=bool)
+    active = np.flatnonzero(prices > 0)
+    iterations = 0
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        iterations += active.size
+        lengths = np.diff(layout.offsets)[active]
+        offsets = np.zeros(active.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # cashflows of the active bonds in CSR order
+        cashflow_index = np.repeat(layout.offsets[active] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        time_to_cf = layout.time_to_cf[cashflow_index]
+        base = 1 + (rates[cashflow_index] + np.repeat(spreads[active], lengths)) / 100
+        discounted = layout.cashflows[cashflow_index] * base ** -time_to_cf
+        pv = np.add.reduceat(discounted, offsets[:-1])
+        dpv = np.add.reduceat(-discounted * time_to_cf / base / 100, offsets[:-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (pv - prices[active]) / dpv
+        x = spreads[active]
+        # PV is convex and decreasing in the spread, so Newton steps up never pass the root and steps down
+        # are only kept from crossing the lower bound
+        new_x = np.maximum(x - step, (x + lower_bounds[active]) / 2)
+        finite = np.isfinite(new_x)
+        spreads[active] = np.where(finite, new_x, x)
+        done = (np.abs(new_x - x) <= tol * np.maximum(np.abs(x), 1.0)) & finite
+        converged[active[done]] = True
+        active = active[~done & finite]
+    spreads[~converged] = np.nan
+    if is_enabled():
+        failed = np.flatnonzero(~converged)
+        record_solver("z_spread_batch", layout.no_of_bonds, iterations, failed.size, failed_index_details(failed))
+    return spreads, converged
+
+
+def calc_z_spreads(
+        prices: np.ndarray,
+        adates: DateArray,
+        maturities: DateArray,
+        coupons: np.ndarray,
+        curve: Union[Dict[float, float], Curve],
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+        tol: float = 1e-10,
+        max_iter: int = 50,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Z-spreads of vanilla bonds over a curve, the spreads that reprice calc_pv_of_vanilla_bond to market prices
+    :param prices: dirty prices
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param coupons: annual coupon rates
+    :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :param principal_amount: scalar or per bond
+    :param tol: convergence tolerance on spreads in percentages
+    :param max_iter: maximum number of Newton iterations
+    :return: (spreads in percentages, NaN where not converged, converged flags)
+    """
+    layout = get_cashflow_layout(adates, maturities, coupons, freq, days_per_year, principal_amount)
+    return calc_z_spreads_from_cashflow_layout(layout, prices, curve, tol, max_iter)
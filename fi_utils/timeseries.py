@@ -0,0 +1,190 @@
+from typing import Dict, NamedTuple, Optional, Sequence, Union
+import numpy as np
+
+from fi_utils.curve import Curve, as_curve
+from fi_utils.curve_pricing import get_cashflow_layout_from_coupon_layout
+from fi_utils.daycount import (
+    DateArray,
+    calc_coupon_periods,
+    calc_coupon_schedules,
+    calc_no_of_coupon_periods,
+    to_datetime64_array,
+)
+from fi_utils.instrumentation import instrumented
+from fi_utils.scenarios import DEFAULT_MAX_MEMORY_BYTES
+from fi_utils.ytm_solver import _pv_and_dpv_from_log_yield
+
+
+class TimeSeriesValuation(NamedTuple):
+    """
+    Valuation history of bonds, pv and accrued_interest have shape (n_dates, n_bonds) and are NaN on as of dates
+    after maturity
+    """
+
+    adates: np.ndarray
+    pv: np.ndarray
+    accrued_interest: np.ndarray
+
+    @property
+    def clean_price(self) -> np.ndarray:
+        return self.pv - self.accrued_interest
+
+
+class CouponHistory(NamedTuple):
+    """
+    Coupon layout of bonds on many as of dates, arrays of shape (n_dates, n_bonds). valid is False on as of dates
+    after maturity, where the other arrays hold zeros
+    """
+
+    valid: np.ndarray
+    time_to_next_cpn: np.ndarray
+    no_of_periods: np.ndarray
+    time_since_prev_cpn: np.ndarray
+
+
+@instrumented("coupon_history")
+def get_coupon_history(
+        adates: DateArray,
+        maturities: DateArray,
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+) -> CouponHistory:
+    """
+    Coupon layout of every bond on every as of date from one coupon schedule per bond. Coupon dates from the
+    coupon date preceding the first as of date through maturity are generated once, see calc_coupon_schedules,
+    and the coupons around each as of date are found by a binary search in the schedule of the bond.
+    Numbers of periods are counted like get_coupon_layout does, so the history prices exactly like pricing each
+    date on its own
+    :param adates: as of dates
+    :param maturities:
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :return: CouponHistory
+    """
+    adates = to_datetime64_array(adates).reshape(-1)
+    maturities = to_datetime64_array(maturities).reshape(-1)
+    freq, days_per_year = (
+        np.broadcast_to(np.asarray(value, dtype=np.int64), maturities.shape) for value in (freq, days_per_year)
+    )
+    first_date = adates.min()
+    start_dates = calc_coupon_periods(first_date, maturities, freq).prev_cpn_dates
+    offsets, coupon_dates = calc_coupon_schedules(np.minimum(start_dates, first_date), maturities, freq)
+    coupon_days = coupon_dates.view(np.int64)
+    adate_days = adates.view(np.int64)
+    # schedules are sorted within bonds and bonds follow each other, so (bond, day) keys are sorted globally
+    base = min(coupon_days.min(initial=adate_days.min()), adate_days.min())
+    span = max(coupon_days.max(initial=adate_days.max()), adate_days.max()) - base + 1
+    keys = np.repeat(np.arange(maturities.size), np.diff(offsets)) * span + (coupon_days - base)
+    next_index = np.searchsorted(keys, np.arange(maturities.size) * span + (adate_days[:, None] - base))
+    valid = next_index < offsets[1:]
+    next_index = np.where(valid, next_index, offsets[:-1])
+    safe_days = np.append(coupon_days, 0)
+    next_days = np.where(valid, safe_days[next_index], adate_days[:, None])
+    prev_days = np.where(
+        next_days == adate_days[:, None], next_days, safe_days[np.maximum(next_index - 1, 0)]
+    )
+    prev_days = np.where(valid, prev_days, adate_days[:, None])
+    time_to_next_cpn = (next_days - adate_days[:, None]) / days_per_year
+    no_of_periods = np.where(
+        valid, calc_no_of_coupon_periods(next_days.astype("datetime64[D]"), maturities, freq), 0
+    )
+    time_since_prev_cpn = (adate_days[:, None] - prev_days) / days_per_year
+    return CouponHistory(valid, time_to_next_cpn, no_of_periods, time_since_prev_cpn)
+
+
+def _calc_curve_pv_history(
+        history: CouponHistory,
+        coupons: np.ndarray,
+        freq: np.ndarray,
+        principal_amount: np.ndarray,
+        curves: Sequence[Union[Dict[float, float], Curve]],
+        max_memory_bytes: int,
+) -> np.ndarray:
+    curves = [as_curve(curve) for curve in curves]
+    # a curve evaluated at the union of all tenors interpolates exactly like itself, so every curve of the
+    # history becomes a row of one rate matrix over shared tenors
+    tenors = np.unique(np.concatenate([curve.tenors for curve in curves]))
+    union = Curve(tenors, np.zeros_like(tenors))
+    rate_history = np.stack([curve.rate(union.tenors) for curve in curves])
+    no_of_dates, no_of_bonds = history.valid.shape
+    pv = np.full((no_of_dates, no_of_bonds), np.nan)
+    cashflows_per_date = max(int((history.no_of_periods + 1).sum(axis=1).max(initial=0)), 1)
+    chunk_size = max(1, max_memory_bytes // (8 * 8 * cashflows_per_date))
+    for start in range(0, no_of_dates, chunk_size):
+        stop = min(start + chunk_size, no_of_dates)
+        date_index, bond_index = np.nonzero(history.valid[start:stop])
+        date_index += start
+        layout = get_cashflow_layout_from_coupon_layout(
+            history.time_to_next_cpn[date_index, bond_index],
+            history.no_of_periods[date_index, bond_index],
+            coupons[bond_index],
+            freq[bond_index],
+            principal_amount[bond_index],
+        )
+        left, right, weight = union.interpolation_weights(layout.unique_times)
+        cashflow_dates = np.repeat(date_index, np.diff(layout.offsets))
+        left, right, weight = left[layout.time_index], right[layout.time_index], weight[layout.time_index]
+        rates = rate_history[cashflow_dates, left] * (1 - weight) + rate_history[cashflow_dates, right] * weight
+        pv[date_index, bond_index] = layout.reduce(layout.cashflows * (1 + rates / 100) ** -layout.time_to_cf)
+    return pv
+
+
+@instrumented("time_series_valuation")
+def calc_time_series(
+        adates: DateArray,
+        maturities: DateArray,
+        coupons: np.ndarray,
+        ytms: Optional[np.ndarray] = None,
+        curves: Optional[Sequence[Union[Dict[float, float], Curve]]] = None,
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+) -> TimeSeriesValuation:
+    """
+    PV, accrued interest and clean price history of bonds over many as of dates as one (dates x bonds)
+    computation, the same values as calculate_pv_from_ytm or calc_pv_of_vanilla_bond and calc_accrued_interest
+    called for every date and bond. Coupon schedules are generated once per bond, see get_coupon_history.
+    Either a yield history or a curve history is given
+    :param adates: as of dates
+    :param maturities:
+    :param coupons: annual coupon rates
+    :param ytms: yields to maturity in percentages of shape (n_dates, n_bonds), a 1-D history of length n_dates
+    applies to every bond
+    :param curves: one curve per as of date, either dictionaries that map time to interest rates or compiled
+    Curves
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :param principal_amount: scalar or per bond
+    :param max_memory_bytes: memory budget for cashflow temporaries of the curve history, dates are priced in
+    chunks that fit into it
+    :return: TimeSeriesValuation
+    """
+    if (ytms is None) == (curves is None):
+        raise ValueError("either ytms or curves must be given")
+    adates = to_datetime64_array(adates).reshape(-1)
+    maturities = to_datetime64_array(maturities).reshape(-1)
+    coupons, freq, principal_amount = (
+        np.broadcast_to(np.asarray(value, dtype=dtype), maturities.shape)
+        for value, dtype in ((coupons, np.float64), (freq, np.int64), (principal_amount, np.float64))
+    )
+    history = get_coupon_history(adates, maturities, freq, days_per_year)
+    shape = history.valid.shape
+    accrued_interest = np.where(history.valid, coupons * history.time_since_prev_cpn, np.nan)
+    if curves is not None:
+        if len(curves) != adates.size:
+            raise ValueError(f"{len(curves)} curves given for {adates.size} as of dates")
+        pv = _calc_curve_pv_history(history, coupons, freq, principal_amount, curves, max_memory_bytes)
+        return TimeSeriesValuation(adates, pv, accrued_interest)
+    ytms = np.asarray(ytms, dtype=np.float64)
+    if ytms.ndim == 1:
+        ytms = ytms[:, None]
+    pv, _ = _pv_and_dpv_from_log_yield(
+        np.log1p(np.broadcast_to(ytms, shape) / 100),
+        coupons,
+        history.time_to_next_cpn,
+        history.no_of_periods,
+        freq,
+        principal_amount,
+    )
+    return TimeSeriesValuation(adates, np.where(history.valid, pv, np.nan), accrued_interest)
@@ -0,0 +1,308 @@
+import collections
+import datetime
+import itertools
+import threading
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
+
+from fi_utils.bond_valuation import calc_accrued_interest, calc_pv_of_vanilla_bond, calc_ytm_of_bond
+from fi_utils.curve import Curve
+from fi_utils.curve_pricing import calc_pv_of_vanilla_bonds
+from fi_utils.instrumentation import register_cache, unregister_cache
+from fi_utils.portfolio import BondPortfolio
+from fi_utils.ytm_solver import DateArray, calc_accrued_interest_of_bonds, calc_ytm_of_bonds, to_datetime64_array
+
+DEFAULT_VALUATION_CACHE_SIZE = 1 << 20
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+_cache_ids = itertools.count(1)
+
+
+class ValuationCacheInfo(NamedTuple):
+    """
+    Counters of a ValuationCache. hits and misses count cache lookups, one per distinct security, as of date and
+    price or curve, deduplicated counts lots of a batch valued together with an identical lot of the same batch.
+    """
+
+    hits: int
+    misses: int
+    deduplicated: int
+    maxsize: int
+    currsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+
+def curve_fingerprint(curve: Union[Dict[float, float], Curve]) -> Tuple[Tuple[float, float], ...]:
+    """
+    Hashable key of a curve, equal for a curve dictionary and the Curve compiled from it
+    :param curve: either a dictionary that maps time to interest rates or a compiled Curve
+    :return: sorted (tenor, rate) pairs
+    """
+    if isinstance(curve, Curve):
+        return tuple(zip(curve.tenors.tolist(), curve.rates.tolist()))
+    return tuple(sorted((float(tenor), float(rate)) for tenor, rate in curve.items()))
+
+
+def _day_number(adate: Union[datetime.date, np.datetime64]) -> int:
+    if isinstance(adate, np.datetime64):
+        return int(adate.astype("datetime64[D]").astype(np.int64))
+    return (adate - _EPOCH).days
+
+
+class ValuationCache:
+    """
+    Memoized ytm, accrued interest and curve PV of vanilla bonds in a bounded LRU cache. Keys are the normalized
+    bond terms (maturity, coupon, freq, days_per_year, principal amount), the as of date and the price or the
+    curve fingerprint, so scalar calls and batches share results. Batches collapse lots to unique keys, look each
+    up once, value the misses with the vectorized kernels and scatter results back to lots.
+    Unconverged yields are not cached. The cache is safe to share between threads.
+    Hit rates are reported to instrumentation under the name of the cache, unique among open caches and
+    valuation_<n> by default, until the cache is closed or garbage collected.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_VALUATION_CACHE_SIZE, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.name = f"valuation_{next(_cache_ids)}" if name is None else name
+        self._entries: "collections.OrderedDict[Hashable, float]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._deduplicated = 0
+        register_cache(self.name, self.cache_info)
+        self._registered = True
+
+    def close(self):
+        """
+        Stop reporting the cache to instrumentation, cached values stay usable
+        """
+        if self._registered:
+            unregister_cache(self.name)
+            self._registered = False
+
+    def cache_info(self) -> ValuationCacheInfo:
+        with self._lock:
+            return ValuationCacheInfo(self._hits, self._misses, self._deduplicated, self.maxsize, len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._deduplicated = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, keys: List[Hashable]) -> List[float]:
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+                    self._entries.move_to_end(key)
+                values.append(value)
+        return values
+
+    def _put(self, keys: List[Hashable], values: List[float]):
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _memoize(self, key: Hashable, evaluate: Callable[[], float]) -> float:
+        value = self._get([key])[0]
+        if value is None:
+            value = evaluate()
+            self._put([key], [value])
+        return value
+
+    def _memoize_batch(
+            self,
+            method: str,
+            columns: List[np.ndarray],
+            extra: Hashable,
+            evaluate: Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up unique rows of the key columns and evaluate the missing ones
+        :param method: name of the valuation in the keys
+        :param columns: key columns per lot, int64 day numbers and float64 or int64 terms
+        :param extra: key part shared by all lots, such as a curve fingerprint
+        :param evaluate: values and cacheable flags of the lots at the given indices
+        :return: (values per lot, found or valued flags per lot)
+        """
+        # rows of 8 byte columns compare as raw bytes, much faster to deduplicate than a record array
+        rows = np.empty((columns[0].size, len(columns)), dtype=np.int64)
+        for j, column in enumerate(columns):
+            rows[:, j] = (column + 0.0).view(np.int64) if column.dtype.kind == "f" else column
+        _, first_lots, inverse = np.unique(
+            rows.view(np.dtype((np.void, rows.itemsize * len(columns)))).reshape(-1),
+            return_index=True,
+            return_inverse=True,
+        )
+        inverse = inverse.reshape(-1)
+        keys = [(method, *row, extra) for row in zip(*(column[first_lots].tolist() for column in columns))]
+        cached = self._get(keys)
+        with self._lock:
+            self._deduplicated += inverse.size - first_lots.size
+        values = np.array([np.nan if value is None else value for value in cached], dtype=np.float64)
+        ok = np.array([value is not None for value in cached], dtype=bool)
+        missing = np.flatnonzero(~ok)
+        if missing.size:
+            missing_values, cacheable = evaluate(first_lots[missing])
+            values[missing] = missing_values
+            ok[missing] = cacheable
+            stored = missing[cacheable]
+            self._put([keys[i] for i in stored], values[stored].tolist())
+        return values[inverse], ok[inverse]
+
+    def ytm(
+            self,
+            price: float,
+            coupon_rate: float,
+            adate: datetime.date,
+            maturity: datetime.date,
+            days_per_year: int = 365,
+            freq: int = 2,
+            principal_amount: float = 100,
+    ) -> float:
+        """
+        Memoized calc_ytm_of_bond
+        :return: yield to maturity in percentages
+        """
+        key = (
+            "ytm", _day_number(maturity), float(coupon_rate), int(freq), int(days_per_year),
+            float(principal_amount), _day_number(adate), float(price), None,
+        )
+        return self._memoize(
+            key,
+            lambda: calc_ytm_of_bond(price, coupon_rate, adate, maturity, days_per_year, freq, principal_amount),
+        )
+
+    def accrued_interest(
+            self, adate: datetime.date, maturity: datetime.date, coupon: float, freq: int = 2, days_per_year: int = 365
+    ) -> float:
+        """
+        Memoized calc_accrued_interest
+        :return: accrued interest
+        """
+        key = (
+            "accrued_interest", _day_number(maturity), float(coupon), int(freq), int(days_per_year),
+            _day_number(adate), None,
+        )
+        return self._memoize(key, lambda: calc_accrued_interest(adate, maturity, coupon, freq, days_per_year))
+
+    def curve_pv(
+            self,
+            adate: datetime.date,
+            maturity: datetime.date,
+            coupon: float,
+            curve: Union[Dict[float, float], Curve],
+            freq: int = 2,
+            days_per_year: int = 365,
+    ) -> float:
+        """
+        Memoized calc_pv_of_vanilla_bond
+        :return: PV
+        """
+        key = (
+            "curve_pv", _day_number(maturity), float(coupon), int(freq), int(days_per_year), 100.0,
+            _day_number(adate), curve_fingerprint(curve),
+        )
+        return self._memoize(
+            key, lambda: calc_pv_of_vanilla_bond(adate, maturity, coupon, curve, freq, days_per_year)
+        )
+
+    @staticmethod
+    def _term_columns(portfolio: BondPortfolio, adates: DateArray) -> List[np.ndarray]:
+        shape = portfolio.maturities.shape
+        return [
+            portfolio.maturities.view(np.int64),
+            portfolio.coupons.astype(np.float64),
+            portfolio.freq.astype(np.int64),
+            portfolio.days_per_year.astype(np.int64),
+            portfolio.principal_amount.astype(np.float64),
+            np.broadcast_to(to_datetime64_array(adates).view(np.int64), shape),
+        ]
+
+    def ytm_batch(
+            self, portfolio: BondPortfolio, prices: np.ndarray, adates: DateArray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Yields to maturity of lots, each distinct security, as of date and price solved once, see calc_ytm_of_bonds
+        :param portfolio: lots
+        :param prices: dirty prices per lot
+        :param adates: as of dates, a single date is broadcast to all lots
+        :return: (ytms in percentages, converged flags)
+        """
+        columns = self._term_columns(portfolio, adates)
+        columns.append(np.broadcast_to(np.asarray(prices, dtype=np.float64), portfolio.maturities.shape))
+
+        def evaluate(lots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            return calc_ytm_of_bonds(
+                columns[6][lots],
+                portfolio.coupons[lots],
+                columns[5][lots].astype("datetime64[D]"),
+                portfolio.maturities[lots],
+                portfolio.days_per_year[lots],
+                portfolio.freq[lots],
+                portfolio.principal_amount[lots],
+            )
+
+        return self._memoize_batch("ytm", columns, None, evaluate)
+
+    def accrued_interest_batch(self, portfolio: BondPortfolio, adates: DateArray) -> np.ndarray:
+        """
+        Accrued interest of lots, each distinct security and as of date calculated once,
+        see calc_accrued_interest_of_bonds
+        :param portfolio: lots
+        :param adates: as of dates, a single date is broadcast to all lots
+        :return: accrued interest per lot
+        """
+        columns = self._term_columns(portfolio, adates)
+        del columns[4]
+
+        def evaluate(lots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            accrued_interest = calc_accrued_interest_of_bonds(
+                columns[4][lots].astype("datetime64[D]"),
+                portfolio.maturities[lots],
+                portfolio.coupons[lots],
+                portfolio.freq[lots],
+                portfolio.days_per_year[lots],
+            )
+            return accrued_interest, np.ones(lots.size, dtype=bool)
+
+        return self._memoize_batch("accrued_interest", columns, None, evaluate)[0]
+
+    def curve_pv_batch(
+            self, portfolio: BondPortfolio, adates: DateArray, curve: Union[Dict[float, float], Curve]
+    ) -> np.ndarray:
+        """
+        PV of lots against a curve, each distinct security and as of date priced once, see calc_pv_of_vanilla_bonds
+        :param portfolio: lots
+        :param adates: as of dates, a single date is broadcast to all lots
+        :param curve: interest rate curve, either a dictionary that maps time to interest rates or a compiled Curve
+        :return: PV per lot
+        """
+        columns = self._term_columns(portfolio, adates)
+
+        def evaluate(lots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            pvs = calc_pv_of_vanilla_bonds(
+                columns[5][lots].astype("datetime64[D]"),
+                portfolio.maturities[lots],
+                portfolio.coupons[lots],
+                curve,
+                portfolio.freq[lots],
+                portfolio.days_per_year[lots],
+                portfolio.principal_amount[lots],
+            )
+            return pvs, np.ones(lots.size, dtype=bool)
+
+        return self._memoize_batch("curve_pv", columns, curve_fingerprint(curve), evaluate)[0]
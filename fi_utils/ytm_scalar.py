@@ -0,0 +1,236 @@
+import math
+from typing import Callable, NamedTuple, Tuple
+
+
+class YtmSolution(NamedTuple):
+    ytm: float
+    converged: bool
+    pv_evaluations: int
+
+
+def _pv_and_dpv_from_log_yield_scalar(
+        log_yield: float,
+        coupon: float,
+        time_to_next_cpn: float,
+        no_of_periods: int,
+        period: float,
+        principal_amount: float,
+) -> Tuple[float, float]:
+    """
+    Scalar version of fi_utils.ytm_solver._pv_and_dpv_from_log_yield, coupon here is the coupon paid per period
+    """
+    last = no_of_periods * period
+    discount_to_next_cpn = math.exp(-log_yield * time_to_next_cpn)
+    discount_of_principal = math.exp(-log_yield * last)
+    step = math.expm1(-log_yield * period)
+    if step == 0:
+        annuity = no_of_periods + 1.0
+    else:
+        annuity = math.expm1(-log_yield * (no_of_periods + 1) * period) / step
+    if abs(log_yield * period) < 1e-6:
+        annuity_dx = (
+                period * no_of_periods * (no_of_periods + 1) / 2
+                * (log_yield * period * (2 * no_of_periods + 1) / 3 - 1)
+        )
+    else:
+        span = math.expm1(-log_yield * (no_of_periods + 1) * period)
+        annuity_dx = (
+                period * (-(span + 1) * (no_of_periods + 1) * step + (step + 1) * span) / step ** 2
+        )
+    pv = discount_to_next_cpn * (coupon * annuity + principal_amount * discount_of_principal)
+    dpv = -time_to_next_cpn * pv + discount_to_next_cpn * (
+            coupon * annuity_dx - principal_amount * last * discount_of_principal
+    )
+    return pv, dpv
+
+
+def _initial_log_yield(
+        price: float, coupon_rate: float, time_to_maturity: float, principal_amount: float
+) -> float:
+    """
+    Scalar version of fi_utils.ytm_solver._initial_log_yield
+    """
+    time_to_maturity = max(time_to_maturity, 1.0 / 365)
+    approx_ytm = (coupon_rate + (principal_amount - price) / time_to_maturity) / (
+            (principal_amount + price) / 2
+    )
+    return math.log1p(min(max(approx_ytm, -0.95), 10.0))
+
+
+def _two_cashflow_log_yield(
+        price: float, first_cf: float, last_cf: float, time_to_next_cpn: float, period: float
+) -> float:
+    """
+    Closed form log yield for a bond with two cashflows left. With the next coupon due today PV is linear in the
+    discount factor per period, with the next coupon a full period away it is quadratic. For other times to next
+    coupon the quadratic solution is used as a starting point for Newton.
+    """
+    if time_to_next_cpn == 0:
+        discount = (price - first_cf) / last_cf
+    else:
+        discount = (-first_cf + math.sqrt(first_cf ** 2 + 4 * last_cf * price)) / (2 * last_cf)
+    if discount <= 0:
+        return math.nan
+    return -math.log(discount) / period
+
+
+def _ytm_from_log_yield(log_yield: float) -> float:
+    """
+    Yield to maturity in percentages from a log yield, infinite where it overflows
+    """
+    try:
+        return math.expm1(log_yield) * 100
+    except OverflowError:
+        return math.inf
+
+
+def _log_yields_within_tol(a: float, b: float, tol: float) -> bool:
+    """
+    Whether two log yields agree to tol percent in yield and to tol / 100 in log yield. Far below a log yield of 0
+    whole steps barely move the yield, so the yield alone would stop the solve short of the root
+    """
+    return abs(b - a) <= tol / 100 and abs(_ytm_from_log_yield(b) - _ytm_from_log_yield(a)) <= tol
+
+
+def _converged_solution(
+        log_yield: float,
+        pv_evaluations: int,
+        price: float,
+        pv_and_dpv: Callable[[float], Tuple[float, float]],
+        tol: float,
+) -> YtmSolution:
+    """
+    Solution from a converged log yield, checked against the PV residual of the yield in percentages it reports.
+    A tiny price overflows the yield, a yield of -100% or below leaves no discount factor that reaches the price,
+    and close to -100% the yield in percentages cannot carry the log yield, so none of them counts as converged
+    """
+    ytm = _ytm_from_log_yield(log_yield)
+    if not -100 < ytm < math.inf:
+        return YtmSolution(math.nan, False, pv_evaluations)
+    try:
+        pv, dpv = pv_and_dpv(math.log1p(ytm / 100))
+    except OverflowError:
+        return YtmSolution(math.nan, False, pv_evaluations)
+    # the residual allowed is the PV change of a tol / 100 step in log yield and rounding of the price
+    if not abs(pv - price) <= abs(dpv) * tol / 100 + 16 * math.ulp(price):
+        return YtmSolution(math.nan, False, pv_evaluations)
+    return YtmSolution(ytm, True, pv_evaluations)
+
+
+def solve_ytm(
+        price: float,
+        coupon_rate: float,
+        time_to_next_cpn: float,
+        no_of_periods: int,
+        freq: int = 2,
+        principal_amount: float = 100.0,
+        tol: float = 1e-10,
+        max_iter: int = 100,
+) -> YtmSolution:
+    """
+    Solve yield to maturity of a single bond given its coupon layout.
+    Bonds with a single cashflow left are solved in closed form, bonds with two cashflows left start from
+    a closed form solution. Otherwise safeguarded Newton with the analytic derivative is run in log yield,
+    keeping a bracket around the root and bisecting whenever a Newton step leaves it. If Newton does not
+    converge within half of the max_iter PV evaluations, a one-sided bracket is widened and plain bisection
+    finishes the solve on the rest of them. Plain bisection stands in for Brent's method so that scalar
+    valuation does not depend on SciPy.
+    :param price: dirty price
+    :param coupon_rate: coupon rate in percentages
+    :param time_to_next_cpn: time to next coupon date in years
+    :param no_of_periods: number of coupon periods after next coupon date
+    :param freq: coupon frequency
+    :param principal_amount:
+    :param tol: convergence tolerance on yield to maturity in percentages, and tol / 100 on the log yield
+    :param max_iter: maximum number of PV evaluations of the whole solve
+    :return: YtmSolution
+    """
+    if not price > 0 or not math.isfinite(price):
+        return YtmSolution(math.nan, False, 0)
+    period = 1.0 / freq
+    coupon = coupon_rate / freq
+    if no_of_periods == 0 and time_to_next_cpn == 0:
+        return YtmSolution(math.nan, False, 0)
+
+    def pv_and_dpv(x: float) -> Tuple[float, float]:
+        return _pv_and_dpv_from_log_yield_scalar(x, coupon, time_to_next_cpn, no_of_periods, period, principal_amount)
+
+    def objective_func(x: float) -> float:
+        try:
+            return pv_and_dpv(x)[0] - price
+        except OverflowError:
+            return math.inf
+
+    if no_of_periods == 0:
+        return _converged_solution(
+            math.log((coupon + principal_amount) / price) / time_to_next_cpn, 0, price, pv_and_dpv, tol
+        )
+    if no_of_periods == 1:
+        log_yield = _two_cashflow_log_yield(
+            price, coupon, coupon + principal_amount, time_to_next_cpn, period
+        )
+        if time_to_next_cpn in (0, period) and math.isfinite(log_yield):
+            return _converged_solution(log_yield, 0, price, pv_and_dpv, tol)
+    else:
+        log_yield = math.nan
+    if not math.isfinite(log_yield):
+        log_yield = _initial_log_yield(
+            price,
+            coupon_rate,
+            time_to_next_cpn + no_of_periods * period,
+            principal_amount,
+        )
+
+    lower, upper = -math.inf, math.inf
+    pv_evaluations = 0
+    while pv_evaluations < (max_iter + 1) // 2:
+        pv_evaluations += 1
+        try:
+            pv, dpv = pv_and_dpv(log_yield)
+        except OverflowError:
+            pv, dpv = math.inf, -math.inf
+        diff = pv - price
+        if diff == 0:
+            return _converged_solution(log_yield, pv_evaluations, price, pv_and_dpv, tol)
+        # PV is decreasing in yield, so a positive difference means the root is above
+        if diff > 0:
+            lower = log_yield
+        else:
+            upper = log_yield
+        if math.isfinite(diff) and dpv < 0:
+            new_log_yield = log_yield - max(min(diff / dpv, 1.0), -1.0)
+        else:
+            new_log_yield = log_yield + (1.0 if diff > 0 else -1.0)
+        # a step that rounds away lands on the bound just set, and bisecting towards an open bound would jump to it
+        if not lower <= new_log_yield <= upper:
+            new_log_yield = (lower + upper) / 2
+        if _log_yields_within_tol(log_yield, new_log_yield, tol):
+            return _converged_solution(new_log_yield, pv_evaluations, price, pv_and_dpv, tol)
+        log_yield = new_log_yield
+
+    # widen the one-sided bracket left by monotone Newton iterates until it holds the root
+    width = 1.0
+    while not (math.isfinite(lower) and math.isfinite(upper)) and width <= 64 and pv_evaluations < max_iter:
+        probe = upper - width if math.isfinite(upper) else lower + width
+        pv_evaluations += 1
+        if objective_func(probe) > 0:
+            lower = probe
+        else:
+            upper = probe
+        width *= 2
+    if math.isfinite(lower) and math.isfinite(upper):
+        while True:
+            if _log_yields_within_tol(lower, upper, tol):
+                return _converged_solution((lower + upper) / 2, pv_evaluations, price, pv_and_dpv, tol)
+            if pv_evaluations >= max_iter:
+                break
+            middle = (lower + upper) / 2
+            pv_evaluations += 1
+            if objective_func(middle) > 0:
+                lower = middle
+            else:
+                upper = middle
+        log_yield = (lower + upper) / 2
+    # NaN where the last iterate overflows the yield, as for converged solutions
+    ytm = _ytm_from_log_yield(log_yield)
+    return YtmSolution(ytm if math.isfinite(ytm) else math.nan, False, pv_evaluations)
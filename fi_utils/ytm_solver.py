@@ -0,0 +1,287 @@
+from typing import Optional, Tuple, Union
+import numpy as np
+
+from fi_utils.daycount import (
+    DateArray,
+    calc_accrual_fractions,
+    calc_coupon_periods,
+    calc_no_of_coupon_periods,
+    to_datetime64_array,
+)
+from fi_utils.instrumentation import failed_index_details, instrumented, is_enabled, record_solver
+
+
+@instrumented("coupon_layout")
+def get_coupon_layout(
+        adates: DateArray,
+        maturities: DateArray,
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get time to next coupon date in years and number of coupon periods after next coupon date for each bond.
+    Next coupon dates are calculated for all bonds at once, see fi_utils.daycount.calc_coupon_periods
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities: maturities
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond
+    :return: (time_to_next_cpn, no_of_periods)
+    """
+    adates, maturities, freq, days_per_year = np.broadcast_arrays(
+        to_datetime64_array(adates),
+        to_datetime64_array(maturities),
+        np.asarray(freq, dtype=np.int64),
+        np.asarray(days_per_year, dtype=np.int64),
+    )
+    next_cpn_dates = calc_coupon_periods(adates, maturities, freq).next_cpn_dates
+    if np.isnat(next_cpn_dates).any():
+        raise ValueError(f"{np.count_nonzero(np.isnat(next_cpn_dates))} as of dates are after maturity")
+    time_to_next_cpn = (next_cpn_dates - adates).astype(np.int64) / days_per_year
+    no_of_periods = calc_no_of_coupon_periods(next_cpn_dates, maturities, freq)
+    return time_to_next_cpn, no_of_periods
+
+
+@instrumented("accrued_interest_batch")
+def calc_accrued_interest_of_bonds(
+        adates: DateArray,
+        maturities: DateArray,
+        coupons: np.ndarray,
+        freq: Union[int, np.ndarray] = 2,
+        days_per_year: Union[int, np.ndarray] = 365,
+        day_count: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Calculate accrued interest of many bonds, see calc_accrued_interest.
+    Previous coupon dates are calculated for all bonds at once, see fi_utils.daycount.calc_coupon_periods
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param coupons: annual coupon rates
+    :param freq: coupon frequency, scalar or per bond
+    :param days_per_year: scalar or per bond, used without a day count convention
+    :param day_count: one of fi_utils.daycount.DAY_COUNT_CONVENTIONS, actual days / days_per_year by default
+    :return: accrued interest per bond
+    """
+    coupons = np.asarray(coupons, dtype=np.float64)
+    if day_count is not None:
+        return coupons * calc_accrual_fractions(adates, maturities, freq, day_count)
+    adates = to_datetime64_array(adates)
+    prev_cpn_dates = calc_coupon_periods(adates, maturities, freq).prev_cpn_dates
+    return coupons * ((adates - prev_cpn_dates).astype(np.int64) / np.asarray(days_per_year))
+
+
+def _pv_and_dpv_from_log_yield(
+        log_yield: np.ndarray,
+        coupon_rate: np.ndarray,
+        time_to_next_cpn: np.ndarray,
+        no_of_periods: np.ndarray,
+        freq: np.ndarray,
+        principal_amount: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    PV and its derivative with respect to log yield ln(1 + ytm / 100) using the annuity closed form.
+    Coupons are paid at time_to_next_cpn + k / freq for k = 0..no_of_periods, principal with the last coupon.
+    """
+    period = 1.0 / freq
+    last = no_of_periods * period
+    step = np.expm1(-log_yield * period)
+    span = np.expm1(-log_yield * (no_of_periods + 1) * period)
+    flat = step == 0
+    safe_step = np.where(flat, 1.0, step)
+    # annuity factor sum_k exp(-x * k / freq) and its derivative with respect to x
+    annuity = np.where(flat, no_of_periods + 1.0, span / safe_step)
+    annuity_dx = np.where(
+        np.abs(log_yield * period) < 1e-6,
+        period * no_of_periods * (no_of_periods + 1) / 2 * (log_yield * period * (2 * no_of_periods + 1) / 3 - 1),
+        period * ((span + 1) * (no_of_periods + 1) * -safe_step + (step + 1) * span) / safe_step ** 2,
+    )
+    discount_to_next_cpn = np.exp(-log_yield * time_to_next_cpn)
+    discount_of_principal = np.exp(-log_yield * last)
+    coupon = coupon_rate / freq
+    pv = discount_to_next_cpn * (coupon * annuity + principal_amount * discount_of_principal)
+    dpv = -time_to_next_cpn * pv + discount_to_next_cpn * (
+            coupon * annuity_dx - principal_amount * last * discount_of_principal
+    )
+    return pv, dpv
+
+
+def _initial_log_yield(
+        prices: np.ndarray,
+        coupon_rate: np.ndarray,
+        time_to_maturity: np.ndarray,
+        principal_amount: np.ndarray,
+) -> np.ndarray:
+    """
+    Initial guess from the approximate yield formula (coupon + pull to par per year) / average of price and par
+    """
+    time_to_maturity = np.maximum(time_to_maturity, 1.0 / 365)
+    approx_ytm = (coupon_rate + (principal_amount - prices) / time_to_maturity) / (
+            (principal_amount + prices) / 2
+    )
+    return np.log1p(np.clip(approx_ytm, -0.95, 10.0))
+
+
+@instrumented("ytm_batch")
+def calc_ytm_of_bonds(
+        prices: np.ndarray,
+        coupon_rates: np.ndarray,
+        adates: DateArray,
+        maturities: DateArray,
+        days_per_year: Union[int, np.ndarray] = 365,
+        freq: Union[int, np.ndarray] = 2,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+        tol: float = 1e-10,
+        max_iter: int = 50,
+        initial_ytms: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate yields to maturity of many bonds at once with vectorized Newton iteration.
+    Newton steps are taken in log yield ln(1 + ytm / 100), where PV is a convex decreasing function,
+    so the iteration cannot leave the domain and converges from any starting point.
+    Each bond drops out of the iteration as soon as it converges.
+    :param prices: dirty prices
+    :param coupon_rates: coupon rates in percentages
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param days_per_year: scalar or per bond
+    :param freq: coupon frequency, scalar or per bond
+    :param principal_amount: scalar or per bond
+    :param tol: convergence tolerance on yield to maturity in percentages
+    :param max_iter: maximum number of Newton iterations
+    :param initial_ytms: starting yields in percentages such as yields of the previous day, NaN starts from
+    the approximate yield formula
+    :return: (ytms in percentages, NaN where not converged, converged flags)
+    """
+    time_to_next_cpn, no_of_periods = get_coupon_layout(
+        adates, maturities, freq, days_per_year
+    )
+    return calc_ytm_from_coupon_layout(
+        prices, coupon_rates, time_to_next_cpn, no_of_periods, freq, principal_amount, tol, max_iter,
+        initial_ytms,
+    )
+
+
+def calc_ytm_from_coupon_layout(
+        prices: np.ndarray,
+        coupon_rates: np.ndarray,
+        time_to_next_cpn: np.ndarray,
+        no_of_periods: np.ndarray,
+        freq: Union[int, np.ndarray] = 2,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+        tol: float = 1e-10,
+        max_iter: int = 50,
+        initial_ytms: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate yields to maturity of many bonds given their coupon layout, see calc_ytm_of_bonds
+    :param prices: dirty prices
+    :param coupon_rates: coupon rates in percentages
+    :param time_to_next_cpn: times to next coupon dates in years, see get_coupon_layout
+    :param no_of_periods: numbers of coupon periods after next coupon dates, see get_coupon_layout
+    :param freq: coupon frequency, scalar or per bond
+    :param principal_amount: scalar or per bond
+    :param tol: convergence tolerance on yield to maturity in percentages
+    :param max_iter: maximum number of Newton iterations
+    :param initial_ytms: starting yields in percentages, NaN starts from the approximate yield formula
+    :return: (ytms in percentages, NaN where not converged, converged flags)
+    """
+    prices = np.atleast_1d(np.asarray(prices, dtype=np.float64))
+    prices, coupon_rates, principal_amount, freq, time_to_next_cpn, no_of_periods = (
+        np.broadcast_arrays(
+            prices,
+            np.asarray(coupon_rates, dtype=np.float64),
+            np.asarray(principal_amount, dtype=np.float64),
+            np.asarray(freq, dtype=np.int64),
+            time_to_next_cpn,
+            no_of_periods,
+        )
+    )
+    log_yield = _initial_log_yield(
+        prices,
+        coupon_rates,
+        time_to_next_cpn + no_of_periods / freq,
+        principal_amount,
+    )
+    if initial_ytms is not None:
+        initial_log_yield = np.log1p(
+            np.broadcast_to(np.asarray(initial_ytms, dtype=np.float64), prices.shape) / 100
+        )
+        log_yield = np.where(np.isfinite(initial_log_yield), initial_log_yield, log_yield)
+    converged = np.zeros(prices.shape, dtype=bool)
+    active = np.flatnonzero(prices > 0)
+    iterations = 0
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        iterations += active.size
+        x = log_yield[active]
+        pv, dpv = _pv_and_dpv_from_log_yield(
+            x,
+            coupon_rates[active],
+            time_to_next_cpn[active],
+            no_of_periods[active],
+            freq[active],
+            principal_amount[active],
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (pv - prices[active]) / dpv
+        # cap the step so that a far-off first guess does not overflow the discount factors
+        new_x = x - np.clip(step, -1.0, 1.0)
+        # PV that does not move with the yield, as for a bond at maturity, leaves the row unsolved
+        finite = np.isfinite(step)
+        log_yield[active] = np.where(finite, new_x, x)
+        new_ytm = np.expm1(new_x) * 100
+        # the log yield step is bounded too, since far below a log yield of 0 a whole step barely moves the yield
+        done = (np.abs(new_x - x) <= tol / 100) & (np.abs(new_ytm - np.expm1(x) * 100) <= tol) | (new_x == x)
+        converged[active[done & finite]] = True
+        active = active[~done & finite]
+    ytms = np.expm1(log_yield) * 100
+    # close to -100% the yield in percentages cannot carry the log yield that reprices the bond
+    with np.errstate(divide="ignore", invalid="ignore"):
+        converged &= np.abs(np.log1p(ytms / 100) - log_yield) <= tol / 100
+    ytms[~converged] = np.nan
+    if is_enabled():
+        failed = np.flatnonzero(~converged)
+        record_solver("ytm_batch", prices.size, iterations, failed.size, failed_index_details(failed))
+    return ytms, converged
+
+
+@instrumented("pv_from_ytm_batch")
+def calc_pv_from_ytms(
+        ytms: np.ndarray,
+        coupon_rates: np.ndarray,
+        adates: DateArray,
+        maturities: DateArray,
+        days_per_year: Union[int, np.ndarray] = 365,
+        freq: Union[int, np.ndarray] = 2,
+        principal_amount: Union[float, np.ndarray] = 100.0,
+) -> np.ndarray:
+    """
+    Calculate present values of many bonds from yields to maturity with the annuity closed form.
+    All inputs broadcast against each other, so a price/yield grid of a whole book is obtained
+    by passing ytms of shape (n_yields, 1) together with per bond arrays of shape (n_bonds,)
+    :param ytms: yields to maturity in percentages
+    :param coupon_rates: coupon rates in percentages
+    :param adates: as of dates, a single date is broadcast to all bonds
+    :param maturities:
+    :param days_per_year: scalar or per bond
+    :param freq: coupon frequency, scalar or per bond
+    :param principal_amount: scalar or per bond
+    :return: present values with the broadcast shape of the inputs
+    """
+    time_to_next_cpn, no_of_periods = get_coupon_layout(
+        adates, maturities, freq, days_per_year
+    )
+    log_yield, coupon_rates, time_to_next_cpn, no_of_periods, freq, principal_amount = (
+        np.broadcast_arrays(
+            np.log1p(np.asarray(ytms, dtype=np.float64) / 100),
+            np.asarray(coupon_rates, dtype=np.float64),
+            time_to_next_cpn,
+            no_of_periods,
+            np.asarray(freq, dtype=np.int64),
+            np.asarray(principal_amount, dtype=np.float64),
+        )
+    )
+    pv, _ = _pv_and_dpv_from_log_yield(
+        log_yield, coupon_rates, time_to_next_cpn, no_of_periods, freq, principal_amount
+    )
+    return pv
@@ -0,0 +1,31 @@
+import datetime
+from typing import Sequence, Union
+import numpy as np
+
+from fi_utils.portfolio import BondPortfolio
+
+
+def make_synthetic_portfolio(
+        rng: np.random.Generator,
+        size: int,
+        start_date: Union[datetime.date, np.datetime64, str],
+        min_days: int = 30,
+        max_days: int = 30 * 365,
+        freq: Sequence[int] = (1, 2, 4),
+) -> BondPortfolio:
+    """
+    Bonds maturing min_days to max_days after the start date with random coupons between 0 and 8 rounded to
+    3 decimals and random coupon frequencies, drawn from rng in that order
+    :param rng: random generator, further draws of a test continue from it
+    :param size: number of bonds
+    :param start_date:
+    :param min_days: shortest days to maturity, inclusive
+    :param max_days: longest days to maturity, exclusive
+    :param freq: coupon frequencies to choose from
+    :return: BondPortfolio
+    """
+    return BondPortfolio(
+        np.datetime64(start_date, "D") + rng.integers(min_days, max_days, size),
+        np.round(rng.uniform(0.0, 8.0, size), 3),
+        freq=rng.choice(freq, size),
+    )
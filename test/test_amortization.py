@@ -1,6 +1,17 @@
 import unittest
+import os
+import tempfile
 from datetime import date
+import numpy as np
+
 from fi_utils.abor_utils import compute_linear_amortization_schedule
+from fi_utils.amortization import (
+    aggregate_book_values,
+    compute_effective_interest_schedules,
+    compute_linear_amortization_schedules,
+)
+from fi_utils.bond_valuation import calculate_pv_from_ytm
+from fi_utils.coupon_schedule import get_coupon_schedule
 
 
 class TestLinearAmortizationSchedule(unittest.TestCase):
@@ -62,5 +73,103 @@ class TestLinearAmortizationSchedule(unittest.TestCase):
             )
 
 
+class TestLinearAmortizationSchedules(unittest.TestCase):
+    def setUp(self):
+        self.book_prices = np.array([95.0, 105.0, 99.0])
+        self.maturities = np.array(["2030-04-30", "2027-04-30", "2028-01-15"], dtype="datetime64[D]")
+        self.purchase_date = date(2025, 4, 30)
+
+    def test_matches_scalar_schedule(self):
+        schedule = compute_linear_amortization_schedules(
+            self.book_prices, self.maturities, self.purchase_date, 0.5
+        )
+        self.assertEqual(schedule.book_values.shape, (3, 11))
+        for i, (book_price, maturity) in enumerate(zip(self.book_prices, self.maturities)):
+            periods, delta = compute_linear_amortization_schedule(
+                book_price, maturity.item(), self.purchase_date, 0.5
+            )
+            self.assertEqual(schedule.total_periods[i], periods)
+            self.assertAlmostEqual(schedule.change_per_period[i], delta)
+            book_value = book_price
+            for k in range(periods + 1):
+                self.assertAlmostEqual(schedule.book_values[i, k], book_value)
+                book_value += delta
+            self.assertEqual(schedule.book_values[i, periods], 100.0)
+            self.assertTrue(np.isnan(schedule.book_values[i, periods + 1:]).all())
+
+    def test_memmap_and_aggregation(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "book_values.npy")
+            schedule = compute_linear_amortization_schedules(
+                self.book_prices, self.maturities, self.purchase_date, 1.0, memmap_path=path
+            )
+            self.assertIsInstance(schedule.book_values, np.memmap)
+            book_values = np.load(path, mmap_mode="r")
+            totals = aggregate_book_values(book_values, quantities=[1.0, 2.0, 3.0])
+            np.testing.assert_array_equal(totals.live_positions, [3, 3, 3, 1, 1, 1])
+            np.testing.assert_allclose(totals.book_value[0], 95.0 + 2 * 105.0 + 3 * 99.0)
+            np.testing.assert_allclose(totals.book_value[2], 97.0 + 2 * 100.0 + 3 * 100.0)
+            np.testing.assert_allclose(totals.book_value[-1], 100.0)
+            del schedule, book_values
+
+    def test_past_maturity(self):
+        with self.assertRaises(ValueError):
+            compute_linear_amortization_schedules(
+                self.book_prices, self.maturities, date(2027, 6, 1), 1.0
+            )
+
+
+class TestEffectiveInterestSchedules(unittest.TestCase):
+    def setUp(self):
+        self.purchase_date = date(2025, 4, 17)
+        self.maturities = [date(2030, 6, 15), date(2027, 1, 31), date(2026, 3, 1)]
+        self.coupons = np.array([3.5, 1.0, 6.0])
+        self.ytms = np.array([4.2, 3.1, 2.0])
+        self.prices = np.array(
+            [
+                calculate_pv_from_ytm(ytm, coupon, self.purchase_date, maturity)
+                for ytm, coupon, maturity in zip(self.ytms, self.coupons, self.maturities)
+            ]
+        )
+
+    def test_book_values_are_pv_at_purchase_yield(self):
+        schedule = compute_effective_interest_schedules(
+            self.prices, self.coupons, self.purchase_date, np.array(self.maturities, dtype="datetime64[D]")
+        )
+        self.assertTrue(schedule.converged.all())
+        # purchase yields agree with the scalar pricing, including the 181 day half years of the 2027 bond
+        np.testing.assert_allclose(schedule.purchase_yields, self.ytms, atol=1e-8)
+        self.assertEqual(schedule.book_values.shape, (3, 12))
+        for i, maturity in enumerate(self.maturities):
+            coupon_dates = get_coupon_schedule(maturity).coupon_dates_between(self.purchase_date, maturity)
+            self.assertEqual(schedule.no_of_coupons[i], len(coupon_dates))
+            n = len(coupon_dates)
+            for k in range(1, n):
+                # book value right after a coupon is the PV of the remaining cashflows at the purchase yield
+                discount = (1 + schedule.purchase_yields[i] / 100) ** -(np.arange(1, n - k + 1) / 2)
+                self.assertAlmostEqual(
+                    schedule.book_values[i, k],
+                    self.coupons[i] / 2 * discount.sum() + 100.0 * discount[-1],
+                    places=8,
+                )
+            self.assertAlmostEqual(schedule.book_values[i, len(coupon_dates)], 100.0, places=8)
+            self.assertTrue(np.isnan(schedule.book_values[i, len(coupon_dates) + 1:]).all())
+            # income is the cash received less the purchase price
+            self.assertAlmostEqual(
+                np.nansum(schedule.income[i]),
+                len(coupon_dates) * self.coupons[i] / 2 + 100.0 - self.prices[i],
+                places=8,
+            )
+
+    def test_memmap_output(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            schedule = compute_effective_interest_schedules(
+                self.prices, self.coupons, self.purchase_date, self.maturities, memmap_dir=tmpdir
+            )
+            income = np.load(os.path.join(tmpdir, "income.npy"), mmap_mode="r")
+            np.testing.assert_array_equal(income, schedule.income)
+            del schedule, income
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -81,6 +81,20 @@ class MyTestCase(unittest.TestCase):
         print(f"price {price}, coupon {coupon}, maturity {maturity}, ytm : {ytm}")
         self.assertTrue(ytm > 0)
 
+    def test_calc_ytm_of_short_dated_bond(self):
+        from fi_utils.bond_valuation import calc_ytm_of_bond, calculate_pv_from_ytm
+
+        price = 104.3
+        coupon = 5.41
+        adate = datetime.date(2027, 5, 20)
+        maturity = datetime.date(2027, 5, 21)
+        ytm = calc_ytm_of_bond(price, coupon, adate, maturity)
+        print(f"price {price}, coupon {coupon}, maturity {maturity}, ytm : {ytm}")
+        self.assertTrue(ytm > -100)
+        self.assertAlmostEqual(
+            calculate_pv_from_ytm(ytm, coupon, adate, maturity), price, places=8
+        )
+
     def test_get_possible_coupon_dates_in_the_year(self):
         from fi_utils.bond_valuation import get_possible_coupon_dates_in_the_year
 
@@ -179,6 +193,40 @@ class MyTestCase(unittest.TestCase):
         )
         self.assertTrue(no_of_periods > 0)
 
+    def test_no_of_cf_periods_to_end_of_month_maturity(self):
+        from fi_utils.bond_valuation import calc_ytm_of_bond, calculate_pv_from_ytm, get_no_of_cf_periods
+
+        # coupons on 2029-11-30, 2030-02-28 and 2030-05-31 are 182 days apart in total, less than half a year of
+        # 365 days, so truncating days / days_per_year * freq counted 2 and dropped the February coupon
+        adate = datetime.date(2029, 11, 1)
+        maturity = datetime.date(2030, 5, 31)
+        freq = 4
+        next_cpn_date = find_next_coupon_date(adate, maturity, freq)
+        self.assertEqual(next_cpn_date, datetime.date(2029, 11, 30))
+        self.assertEqual(int((maturity - next_cpn_date).days / 365 * freq) + 1, 2)
+        self.assertEqual(get_no_of_cf_periods(next_cpn_date, maturity, freq), 3)
+
+        time_to_next_cpn = (next_cpn_date - adate).days / 365
+        expected_pv = sum(
+            (1.0 + (100.0 if k == 2 else 0.0)) / 1.05 ** (time_to_next_cpn + k / freq) for k in range(3)
+        )
+        pv = calculate_pv_from_ytm(5.0, 4.0, adate, maturity, freq=freq)
+        self.assertAlmostEqual(pv, expected_pv, places=10)
+        self.assertAlmostEqual(calc_ytm_of_bond(pv, 4.0, adate, maturity, freq=freq), 5.0, places=8)
+
+    def test_no_of_cf_periods_matches_day_count_on_regular_schedules(self):
+        from fi_utils.bond_valuation import get_no_of_cf_periods
+
+        # where the coupon dates span at least their nominal years, the month count keeps the truncated day count
+        maturity = datetime.date(2048, 9, 25)
+        for freq in (1, 2, 4, 12):
+            for adate in (datetime.date(2025, 2, 25), datetime.date(2025, 4, 25), datetime.date(2025, 10, 1)):
+                next_cpn_date = find_next_coupon_date(adate, maturity, freq)
+                self.assertEqual(
+                    get_no_of_cf_periods(next_cpn_date, maturity, freq),
+                    int((maturity - next_cpn_date).days / 365 * freq) + 1,
+                )
+
     def test_find_matching_interval_in_curve(self):
         from fi_utils.bond_valuation import find_matching_interval_in_curve
 
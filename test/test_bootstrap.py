@@ -0,0 +1,46 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import calc_pv_of_vanilla_bond
+from fi_utils.bootstrap import (
+    bootstrap_cache_info,
+    bootstrap_curve,
+    bootstrap_discount_factors,
+    clear_bootstrap_cache,
+)
+
+
+class TestBootstrap(unittest.TestCase):
+    def setUp(self):
+        self.par_rates = {0.25: 3.9, 1: 4.0, 2: 3.8, 3: 3.75, 5: 3.8, 7: 3.9, 10: 4.05, 30: 4.5}
+        clear_bootstrap_cache()
+
+    def test_reprices_par_swaps(self):
+        times, discount_factors = bootstrap_discount_factors(
+            list(self.par_rates), list(self.par_rates.values()), freq=2
+        )
+        self.assertAlmostEqual(discount_factors[0], 1 / (1 + 0.039 * 0.25))
+        for tenor in (1, 2, 3, 5, 7, 10, 30):
+            payments = (times > 0.25) & (times <= tenor + 1e-12)
+            annuity = discount_factors[payments].sum() / 2
+            self.assertAlmostEqual(
+                self.par_rates[tenor] / 100 * annuity + discount_factors[payments][-1], 1.0, places=12
+            )
+
+    def test_snapshots_bootstrapped_at_once(self):
+        tenors = list(self.par_rates)
+        rates = np.array([list(self.par_rates.values()), [r + 0.5 for r in self.par_rates.values()]])
+        times, discount_factors = bootstrap_discount_factors(tenors, rates)
+        self.assertEqual(discount_factors.shape, (2, times.size))
+        np.testing.assert_allclose(discount_factors[1], bootstrap_discount_factors(tenors, rates[1])[1])
+
+    def test_curve_cached_by_quotes(self):
+        curve = bootstrap_curve(self.par_rates)
+        self.assertIs(bootstrap_curve(dict(reversed(list(self.par_rates.items())))), curve)
+        self.assertIsNot(bootstrap_curve({**self.par_rates, 30: 4.6}), curve)
+        self.assertEqual((bootstrap_cache_info().hits, bootstrap_cache_info().misses), (1, 2))
+        # a par bond paying the 5 year swap rate on the fixed leg dates prices at par
+        adate = datetime.date(2025, 6, 15)
+        pv = calc_pv_of_vanilla_bond(adate, datetime.date(2030, 6, 15), 3.8, curve)
+        self.assertAlmostEqual(pv, 100.0 + 3.8 / 2, delta=0.05)
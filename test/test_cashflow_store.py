@@ -0,0 +1,108 @@
+import unittest
+import datetime
+import errno
+import os
+import sys
+import tempfile
+import threading
+from unittest import mock
+import numpy as np
+
+from fi_utils.cashflow_store import CashflowStore
+from fi_utils.coupon_schedule import get_coupon_schedule
+from fi_utils.curve_pricing import calc_pv_from_cashflow_layout, calc_pv_of_vanilla_bonds
+from test.helpers import make_synthetic_portfolio
+
+
+class TestCashflowStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        self.start_date = datetime.date(2025, 1, 1)
+        size = 400
+        self.portfolio = make_synthetic_portfolio(rng, size, self.start_date, 10)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cashflows")
+        self.curve = {0.5: 3.9, 1: 4.0, 2: 3.8, 5: 3.8, 10: 4.05, 30: 4.5}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cashflows_match_coupon_schedule(self):
+        store = CashflowStore.create(self.path, self.start_date).append(self.portfolio)
+        self.assertEqual(len(store), len(self.portfolio))
+        for i in range(len(store)):
+            maturity = self.portfolio.maturities[i].item()
+            schedule = get_coupon_schedule(maturity, int(self.portfolio.freq[i]))
+            dates = store.cashflow_dates[store.offsets[i]: store.offsets[i + 1]]
+            self.assertEqual(dates.tolist(), schedule.coupon_dates_between(self.start_date, maturity))
+            amounts = store.cashflow_amounts[store.offsets[i]: store.offsets[i + 1]]
+            coupon = self.portfolio.coupons[i] / self.portfolio.freq[i]
+            np.testing.assert_allclose(amounts[:-1], coupon)
+            self.assertAlmostEqual(amounts[-1], coupon + 100.0)
+        np.testing.assert_array_equal(store.security_index, np.repeat(np.arange(len(store)), np.diff(store.offsets)))
+
+    def test_append_creates_versions(self):
+        store = CashflowStore.create(self.path, self.start_date).append(self.portfolio[:300])
+        appended = store.append(self.portfolio[300:])
+        self.assertEqual((store.version, appended.version), (1, 2))
+        # an open version keeps its prefix of the columns
+        self.assertEqual(len(store), 300)
+        self.assertEqual(len(CashflowStore(self.path)), len(self.portfolio))
+        self.assertEqual(len(CashflowStore(self.path, version=1)), 300)
+        whole = CashflowStore.create(os.path.join(self.tmp_dir.name, "whole"), self.start_date).append(self.portfolio)
+        np.testing.assert_array_equal(appended.offsets, whole.offsets)
+        np.testing.assert_array_equal(appended.cashflow_dates, whole.cashflow_dates)
+        np.testing.assert_array_equal(appended.security_index, whole.security_index)
+        np.testing.assert_array_equal(appended.securities.maturities, self.portfolio.maturities)
+        self.assertEqual([v["securities"] for v in appended.versions()], [0, 300, 400])
+        with self.assertRaises(ValueError):
+            CashflowStore(self.path, version=3)
+
+    def test_concurrent_appends(self):
+        store = CashflowStore.create(self.path, self.start_date)
+        threads = [
+            threading.Thread(target=store.append, args=(self.portfolio[i: i + 50],)) for i in range(0, 400, 50)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        appended = CashflowStore(self.path)
+        self.assertEqual(appended.version, 8)
+        self.assertEqual([v["securities"] for v in appended.versions()], list(range(0, 401, 50)))
+        np.testing.assert_array_equal(
+            appended.security_index, np.repeat(np.arange(len(appended)), np.diff(appended.offsets))
+        )
+        self.assertEqual(appended.offsets[-1], appended.no_of_cashflows)
+        self.assertEqual(os.path.getsize(os.path.join(self.path, "cashflow_dates.bin")), appended.no_of_cashflows * 8)
+
+    def test_append_without_file_locking(self):
+        store = CashflowStore.create(self.path, self.start_date)
+        with mock.patch.dict(sys.modules, {"fcntl": None, "msvcrt": None}):
+            with self.assertRaises(NotImplementedError):
+                store.append(self.portfolio)
+        self.assertEqual(store.append(self.portfolio).version, 1)
+
+    def test_append_waits_for_windows_lock(self):
+        store = CashflowStore.create(self.path, self.start_date)
+        msvcrt = mock.Mock(LK_LOCK=1, LK_UNLCK=0)
+        msvcrt.locking.side_effect = [OSError(errno.EDEADLK, "busy"), OSError(errno.EDEADLK, "busy"), None, None]
+        with mock.patch.dict(sys.modules, {"fcntl": None, "msvcrt": msvcrt}):
+            self.assertEqual(store.append(self.portfolio).version, 1)
+        self.assertEqual([c.args[1] for c in msvcrt.locking.call_args_list], [1, 1, 1, 0])
+        msvcrt.locking.side_effect = OSError(errno.EBADF, "bad file descriptor")
+        with mock.patch.dict(sys.modules, {"fcntl": None, "msvcrt": msvcrt}):
+            with self.assertRaises(OSError):
+                store.append(self.portfolio)
+
+    def test_layout_prices_like_portfolio(self):
+        store = CashflowStore.create(self.path, self.start_date).append(self.portfolio)
+        adate = datetime.date(2025, 4, 17)
+        alive = np.flatnonzero(self.portfolio.maturities > np.datetime64(adate))
+        layout = store.cashflow_layout(adate, alive)
+        pv = calc_pv_from_cashflow_layout(layout, self.curve)
+        portfolio = self.portfolio[alive]
+        expected = calc_pv_of_vanilla_bonds(adate, portfolio.maturities, portfolio.coupons, self.curve, portfolio.freq)
+        np.testing.assert_allclose(pv, expected, rtol=1e-12)
+        with self.assertRaises(ValueError):
+            store.cashflow_layout(adate)
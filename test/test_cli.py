@@ -0,0 +1,89 @@
+import unittest
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from fi_utils import cli
+from fi_utils.bond_valuation import calc_accrued_interest, calc_ytm_of_bond
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.adate = datetime.date(2025, 4, 17)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self, argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = cli.main(argv)
+        return status, stdout.getvalue()
+
+    def test_accrued(self):
+        status, output = self._run(
+            ["accrued", "--adate", "2025-04-17", "--maturity", "2030-06-15", "--coupon", "3.5"]
+        )
+        self.assertEqual(status, 0)
+        result = json.loads(output)
+        self.assertEqual(result["prev_coupon_date"], "2024-12-15")
+        self.assertEqual(result["next_coupon_date"], "2025-06-15")
+        self.assertAlmostEqual(
+            result["accrued_interest"],
+            calc_accrued_interest(self.adate, datetime.date(2030, 6, 15), 3.5),
+        )
+
+    def test_price(self):
+        input_path = os.path.join(self.tmpdir.name, "positions.csv")
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        curve_path = os.path.join(self.tmpdir.name, "curve.json")
+        with open(input_path, "w", newline="") as f:
+            csv.writer(f).writerows(
+                [["maturity", "coupon", "price"], ["2030-06-15", "3.5", "98.5"], ["2027-01-31", "1.0", "95"]]
+            )
+        with open(curve_path, "w") as f:
+            json.dump({"1": 4.0, "5": 4.2, "10": 4.4}, f)
+        status, _ = self._run(
+            ["price", input_path, output_path, "--adate", "2025-04-17", "--curve", curve_path]
+        )
+        self.assertEqual(status, 0)
+        with open(output_path, newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][-4:], ["ytm", "ytm_converged", "accrued_interest", "pv"])
+        self.assertAlmostEqual(
+            float(rows[1][3]), calc_ytm_of_bond(98.5, 3.5, self.adate, datetime.date(2030, 6, 15)), places=8
+        )
+
+    def test_missing_input(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            status, _ = self._run(
+                ["price", os.path.join(self.tmpdir.name, "missing.csv"), "out.csv", "--adate", "2025-04-17"]
+            )
+        self.assertEqual(status, 1)
+
+
+class TestStartup(unittest.TestCase):
+    def test_scalar_valuation_does_not_import_numpy_or_scipy(self):
+        code = (
+            "import datetime, sys\n"
+            "from fi_utils.bond_valuation import calc_accrued_interest, calc_ytm_of_bond, calculate_pv_from_ytm\n"
+            "adate, maturity = datetime.date(2025, 4, 17), datetime.date(2030, 6, 15)\n"
+            "calc_accrued_interest(adate, maturity, 3.5)\n"
+            "calc_ytm_of_bond(calculate_pv_from_ytm(4.0, 3.5, adate, maturity), 3.5, adate, maturity)\n"
+            "print(sorted(m for m in ('numpy', 'scipy') if m in sys.modules))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
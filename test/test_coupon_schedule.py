@@ -0,0 +1,76 @@
+import unittest
+import datetime
+import threading
+
+from fi_utils.coupon_schedule import (
+    CouponSchedule,
+    clear_coupon_schedule_cache,
+    coupon_schedule_cache_info,
+    get_coupon_schedule,
+)
+
+
+class TestCouponSchedule(unittest.TestCase):
+    def test_next_and_prev_coupon_date(self):
+        schedule = CouponSchedule(datetime.date(2048, 9, 25), freq=2)
+        adate = datetime.date(2025, 4, 17)
+        self.assertEqual(schedule.next_coupon_date(adate), datetime.date(2025, 9, 25))
+        self.assertEqual(schedule.prev_coupon_date(adate), datetime.date(2025, 3, 25))
+
+    def test_coupon_date_is_both_next_and_prev(self):
+        schedule = CouponSchedule(datetime.date(2048, 9, 25), freq=4)
+        adate = datetime.date(2025, 6, 25)
+        self.assertEqual(schedule.next_coupon_date(adate), adate)
+        self.assertEqual(schedule.prev_coupon_date(adate), adate)
+
+    def test_month_end_maturity(self):
+        schedule = CouponSchedule(datetime.date(2037, 8, 31), freq=2)
+        self.assertEqual(
+            schedule.prev_coupon_date(datetime.date(2028, 5, 1)),
+            datetime.date(2028, 2, 29),
+        )
+        self.assertEqual(
+            schedule.coupon_dates_between(datetime.date(2029, 1, 1), datetime.date(2030, 12, 31)),
+            [
+                datetime.date(2029, 2, 28),
+                datetime.date(2029, 8, 31),
+                datetime.date(2030, 2, 28),
+                datetime.date(2030, 8, 31),
+            ],
+        )
+
+    def test_after_maturity(self):
+        schedule = CouponSchedule(datetime.date(2027, 5, 21))
+        with self.assertRaises(ValueError):
+            schedule.next_coupon_date(datetime.date(2027, 5, 22))
+
+    def test_concurrent_lookups(self):
+        maturity = datetime.date(2098, 9, 25)
+        schedule = CouponSchedule(maturity, freq=12)
+        adates = [datetime.date(1950 + i % 140, 1 + i % 12, 1 + i % 28) for i in range(0, 4000, 7)]
+        results = {}
+
+        def look_up(thread: int):
+            results[thread] = [schedule.prev_coupon_date(adate) for adate in adates[thread::8]]
+
+        threads = [threading.Thread(target=look_up, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for thread in range(8):
+            expected = [CouponSchedule(maturity, freq=12).prev_coupon_date(adate) for adate in adates[thread::8]]
+            self.assertEqual(results[thread], expected)
+        self.assertEqual(schedule._ordinals, sorted(set(schedule._ordinals)))
+
+    def test_registry_shares_schedules(self):
+        clear_coupon_schedule_cache()
+        maturity = datetime.date(2048, 9, 25)
+        schedule = get_coupon_schedule(maturity)
+        self.assertIs(get_coupon_schedule(maturity, 2, 365), schedule)
+        self.assertIsNot(get_coupon_schedule(maturity, 4), schedule)
+        self.assertEqual(coupon_schedule_cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import (
+    calc_discount_factor_given_ir_and_time_to_cf,
+    calc_interpolated_rate_from_interval_curve,
+    calc_pv_of_vanilla_bond,
+    find_matching_interval_in_curve,
+)
+from fi_utils.curve import Curve, as_curve
+
+
+class TestCurve(unittest.TestCase):
+    def setUp(self):
+        self.curve_dict = {10: 4.2, 0.5: 3.0, 1: 3.2, 2: 3.5, 5: 3.9, 30: 4.5}
+        self.curve = Curve.from_dict(self.curve_dict)
+
+    def test_matches_interval_interpolation(self):
+        time_to_cf = np.array([0.1, 0.5, 0.7, 1.0, 3.4, 12.25, 30.0, 45.0])
+        expected = [
+            calc_interpolated_rate_from_interval_curve(
+                find_matching_interval_in_curve(t, self.curve_dict), t
+            )
+            for t in time_to_cf
+        ]
+        np.testing.assert_allclose(self.curve.rate(time_to_cf), expected, rtol=1e-14)
+        np.testing.assert_allclose(
+            self.curve.discount_factor(time_to_cf),
+            [
+                calc_discount_factor_given_ir_and_time_to_cf(ir, t)
+                for ir, t in zip(expected, time_to_cf)
+            ],
+            rtol=1e-14,
+        )
+
+    def test_tenors_are_sorted_and_frozen(self):
+        self.assertTrue((np.diff(self.curve.tenors) > 0).all())
+        with self.assertRaises(ValueError):
+            self.curve.rates[0] = 1.0
+        self.assertIs(as_curve(self.curve), self.curve)
+
+    def test_single_tenor_curve_is_flat(self):
+        curve = Curve.from_dict({5: 4.0})
+        np.testing.assert_array_equal(curve.rate([0.5, 5.0, 20.0]), 4.0)
+
+    def test_duplicate_tenors(self):
+        with self.assertRaises(ValueError):
+            Curve([1.0, 1.0], [3.0, 3.1])
+
+    def test_pv_of_vanilla_bond_with_compiled_curve(self):
+        adate = datetime.date(2025, 4, 25)
+        maturity = datetime.date(2048, 9, 25)
+        self.assertAlmostEqual(
+            calc_pv_of_vanilla_bond(adate, maturity, 4.7, self.curve),
+            calc_pv_of_vanilla_bond(adate, maturity, 4.7, self.curve_dict),
+            places=12,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
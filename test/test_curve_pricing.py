@@ -0,0 +1,49 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import (
+    calc_pv_of_vanilla_bond,
+    get_vanilla_bond_cf_and_time_to_cf,
+)
+from fi_utils.curve_pricing import calc_pv_of_vanilla_bonds, get_cashflow_layout
+from test.helpers import make_synthetic_portfolio
+
+
+class TestCurvePricing(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.adate = datetime.date(2025, 4, 25)
+        portfolio = make_synthetic_portfolio(rng, 300, self.adate, 1)
+        self.maturities = portfolio.maturities.tolist()
+        self.coupons, self.freq = portfolio.coupons, portfolio.freq
+        self.curve = {y: 4.0 + y / 100 for y in range(1, 31)}
+
+    def test_matches_scalar_pv(self):
+        pvs = calc_pv_of_vanilla_bonds(
+            self.adate, self.maturities, self.coupons, self.curve, freq=self.freq
+        )
+        for pv, maturity, coupon, freq in zip(
+                pvs, self.maturities, self.coupons, self.freq
+        ):
+            self.assertAlmostEqual(
+                pv,
+                calc_pv_of_vanilla_bond(self.adate, maturity, coupon, self.curve, int(freq)),
+                delta=1e-10,
+            )
+
+    def test_layout_matches_scalar_cashflows(self):
+        layout = get_cashflow_layout(self.adate, self.maturities[:5], self.coupons[:5])
+        self.assertEqual(layout.no_of_bonds, 5)
+        for i, (maturity, coupon) in enumerate(zip(self.maturities[:5], self.coupons[:5])):
+            bond_cf = get_vanilla_bond_cf_and_time_to_cf(self.adate, maturity, coupon)
+            cashflows = slice(layout.offsets[i], layout.offsets[i + 1])
+            self.assertEqual(list(bond_cf), layout.time_to_cf[cashflows].tolist())
+            self.assertEqual(list(bond_cf.values()), layout.cashflows[cashflows].tolist())
+        np.testing.assert_array_equal(
+            layout.unique_times[layout.time_index], layout.time_to_cf
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
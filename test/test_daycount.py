@@ -0,0 +1,74 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import calc_accrued_interest
+from fi_utils.coupon_schedule import get_coupon_schedule
+from fi_utils.daycount import calc_accrual_fractions, calc_coupon_periods, calc_year_fractions
+from fi_utils.ytm_solver import calc_accrued_interest_of_bonds
+from test.helpers import make_synthetic_portfolio
+
+
+class TestCouponPeriods(unittest.TestCase):
+    def test_matches_coupon_schedule(self):
+        rng = np.random.default_rng(3)
+        size = 2000
+        maturities = np.datetime64("2025-01-01") + rng.integers(0, 30 * 365, size)
+        # end of month and leap day maturities
+        maturities[:4] = np.array(["2028-02-29", "2030-08-31", "2031-05-31", "2027-02-28"], dtype="datetime64[D]")
+        adates = maturities - rng.integers(0, 30 * 365, size)
+        adates[4] = maturities[4]
+        freq = rng.choice([1, 2, 4, 12], size)
+        periods = calc_coupon_periods(adates, maturities, freq)
+        for i in range(size):
+            schedule = get_coupon_schedule(maturities[i].item(), int(freq[i]))
+            adate = adates[i].item()
+            self.assertEqual(periods.prev_cpn_dates[i].item(), schedule.prev_coupon_date(adate))
+            self.assertEqual(periods.next_cpn_dates[i].item(), schedule.next_coupon_date(adate))
+            if adate >= maturities[i].item():
+                continue
+            self.assertEqual(
+                periods.period_end_dates[i].item(),
+                schedule.next_coupon_date(schedule.prev_coupon_date(adate) + datetime.timedelta(days=1)),
+            )
+
+    def test_after_maturity(self):
+        periods = calc_coupon_periods(datetime.date(2030, 7, 1), datetime.date(2030, 6, 15))
+        self.assertEqual(periods.prev_cpn_dates[0].item(), datetime.date(2030, 6, 15))
+        self.assertTrue(np.isnat(periods.next_cpn_dates[0]))
+
+    def test_invalid_frequency(self):
+        with self.assertRaises(ValueError):
+            calc_coupon_periods(datetime.date(2025, 1, 1), datetime.date(2030, 6, 15), 5)
+
+
+class TestDayCounts(unittest.TestCase):
+    def test_year_fractions(self):
+        start = np.array(["2025-01-31", "2025-02-28", "2025-03-30"], dtype="datetime64[D]")
+        end = np.array(["2025-03-31", "2025-08-31", "2025-03-31"], dtype="datetime64[D]")
+        np.testing.assert_allclose(calc_year_fractions(start, end, "ACT/365"), [59 / 365, 184 / 365, 1 / 365])
+        np.testing.assert_allclose(calc_year_fractions(start, end, "ACT/360"), [59 / 360, 184 / 360, 1 / 360])
+        np.testing.assert_allclose(calc_year_fractions(start, end, "30/360"), [60 / 360, 183 / 360, 0])
+        with self.assertRaises(ValueError):
+            calc_year_fractions(start, end, "ACT/ACT")
+
+    def test_act_act_accrual(self):
+        # 2025-03-15 to 2025-09-15 has 184 days, 31 of them accrued by 2025-04-15
+        fraction = calc_accrual_fractions(datetime.date(2025, 4, 15), datetime.date(2030, 9, 15), 2, "ACT/ACT")
+        self.assertAlmostEqual(fraction[0], 31 / 184 / 2)
+        fraction = calc_accrual_fractions(datetime.date(2025, 3, 15), datetime.date(2030, 9, 15), 2, "ACT/ACT")
+        self.assertEqual(fraction[0], 0.0)
+
+    def test_accrued_interest_matches_scalar(self):
+        rng = np.random.default_rng(4)
+        adate = datetime.date(2025, 4, 17)
+        portfolio = make_synthetic_portfolio(rng, 500, adate, 0)
+        maturities, coupons, freq = portfolio.maturities, portfolio.coupons, portfolio.freq
+        accrued = calc_accrued_interest_of_bonds(adate, maturities, coupons, freq)
+        for i in range(500):
+            self.assertAlmostEqual(
+                accrued[i], calc_accrued_interest(adate, maturities[i].item(), coupons[i], int(freq[i])), places=12
+            )
+        np.testing.assert_allclose(
+            calc_accrued_interest_of_bonds(adate, maturities, coupons, freq, day_count="ACT/365"), accrued
+        )
@@ -0,0 +1,87 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils import instrumentation
+from fi_utils.incremental import IncrementalRevaluer
+from fi_utils.portfolio import BondPortfolio
+from test.helpers import make_synthetic_portfolio
+
+
+class TestIncrementalRevaluer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.adate = datetime.date(2025, 6, 10)
+        size = 200
+        self.portfolio = make_synthetic_portfolio(rng, size, self.adate, max_days=20 * 365)
+        self.ytms = rng.uniform(1, 6, size)
+        self.curve = {y: 3.5 + y / 50 for y in range(1, 31)}
+
+    def _prices(self, adate):
+        return self.portfolio.pv_from_ytm(self.ytms, adate)
+
+    def test_matches_full_revaluation_day_over_day(self):
+        revaluer = IncrementalRevaluer(self.portfolio)
+        for day in range(10):
+            adate = self.adate + datetime.timedelta(days=day)
+            prices = self._prices(adate)
+            result = revaluer.revalue(adate, prices, self.curve)
+            expected_ytms, expected_converged = self.portfolio.ytm(prices, adate)
+            np.testing.assert_array_equal(result.converged, expected_converged)
+            np.testing.assert_allclose(result.ytm, expected_ytms, atol=1e-8)
+            np.testing.assert_allclose(result.pv, self.portfolio.pv(adate, self.curve), rtol=1e-12)
+            if day == 0:
+                self.assertEqual(result.recomputed_layouts, len(self.portfolio))
+            else:
+                # only bonds that paid a coupon yesterday are laid out again
+                self.assertLess(result.recomputed_layouts, len(self.portfolio) // 5)
+
+    def test_only_changed_inputs_are_solved_again(self):
+        revaluer = IncrementalRevaluer(self.portfolio)
+        prices = self._prices(self.adate)
+        revaluer.revalue(self.adate, prices)
+        prices = prices.copy()
+        prices[:3] += 0.5
+        result = revaluer.revalue(self.adate, prices)
+        self.assertEqual((result.recomputed_layouts, result.solved), (0, 3))
+        np.testing.assert_allclose(result.ytm, self.portfolio.ytm(prices, self.adate)[0], atol=1e-8)
+
+        coupons = self.portfolio.coupons.copy()
+        coupons[5] += 1
+        changed = revaluer.update_portfolio(
+            BondPortfolio(self.portfolio.maturities, coupons, self.portfolio.freq)
+        )
+        self.assertEqual(np.flatnonzero(changed).tolist(), [5])
+        result = revaluer.revalue(self.adate, prices)
+        self.assertEqual((result.recomputed_layouts, result.solved), (1, 1))
+
+    def test_warm_start_takes_fewer_iterations(self):
+        revaluer = IncrementalRevaluer(self.portfolio)
+        revaluer.revalue(self.adate, self._prices(self.adate))
+        next_day = self.adate + datetime.timedelta(days=1)
+        with instrumentation.collect() as telemetry:
+            revaluer.revalue(next_day, self._prices(next_day))
+        warm = telemetry.snapshot()["solvers"]["ytm_batch"]["iterations"]
+        with instrumentation.collect() as telemetry:
+            self.portfolio.ytm(self._prices(next_day), next_day)
+        cold = telemetry.snapshot()["solvers"]["ytm_batch"]["iterations"]
+        self.assertLess(warm, cold)
+
+    def test_maturing_bonds(self):
+        maturities = self.portfolio.maturities.copy()
+        maturities[[3, 17]] = np.datetime64(self.adate) + np.array([2, 5])
+        self.portfolio = BondPortfolio(maturities, self.portfolio.coupons, self.portfolio.freq)
+        revaluer = IncrementalRevaluer(self.portfolio)
+        for day in range(8):
+            adate = self.adate + datetime.timedelta(days=day)
+            # yields are not defined on the maturity date, so only bonds before maturity are compared
+            alive = self.portfolio.maturities > np.datetime64(adate)
+            prices = np.full(len(self.portfolio), np.nan)
+            prices[alive] = self.portfolio[alive].pv_from_ytm(self.ytms[alive], adate)
+            result = revaluer.revalue(adate, prices, self.curve)
+            expected_ytms, _ = self.portfolio[alive].ytm(prices[alive], adate)
+            np.testing.assert_allclose(result.ytm[alive], expected_ytms, atol=1e-8)
+            np.testing.assert_allclose(result.pv[alive], self.portfolio[alive].pv(adate, self.curve), rtol=1e-12)
+        self.assertEqual(np.flatnonzero(np.isnan(result.ytm)).tolist(), [3, 17])
+        self.assertEqual(np.flatnonzero(np.isnan(result.pv)).tolist(), [3, 17])
+        self.assertFalse(result.converged[[3, 17]].any())
@@ -0,0 +1,67 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils import instrumentation
+from fi_utils.bond_valuation import calc_ytm_of_bond, calculate_pv_from_ytm, find_next_coupon_date
+from fi_utils.coupon_schedule import clear_coupon_schedule_cache
+from fi_utils.ytm_solver import calc_ytm_of_bonds
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.adate = datetime.date(2025, 4, 17)
+        self.maturity = datetime.date(2030, 6, 15)
+        clear_coupon_schedule_cache()
+
+    def test_disabled_by_default(self):
+        instrumentation.telemetry.reset()
+        calculate_pv_from_ytm(4.0, 3.0, self.adate, self.maturity)
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertEqual(instrumentation.telemetry.snapshot()["stages"], {})
+
+    def test_collect_counts_stages_and_solver_iterations(self):
+        price = calculate_pv_from_ytm(4.0, 3.0, self.adate, self.maturity)
+        clear_coupon_schedule_cache()
+        with instrumentation.collect() as telemetry:
+            for _ in range(3):
+                calc_ytm_of_bond(price, 3.0, self.adate, self.maturity)
+        self.assertFalse(instrumentation.is_enabled())
+        snapshot = telemetry.snapshot()
+        self.assertEqual(snapshot["stages"]["ytm"]["calls"], 3)
+        self.assertGreater(snapshot["stages"]["ytm"]["seconds"], 0)
+        self.assertEqual(snapshot["stages"]["coupon_dates"]["calls"], 3)
+        self.assertEqual(snapshot["solvers"]["ytm"]["bonds"], 3)
+        self.assertEqual(snapshot["solvers"]["ytm"]["failures"], 0)
+        self.assertGreater(snapshot["solvers"]["ytm"]["iterations_per_bond"], 0)
+        # the schedule is built once and looked up from the registry afterwards
+        self.assertEqual(snapshot["caches"]["coupon_schedule"]["misses"], 1)
+        self.assertAlmostEqual(snapshot["caches"]["coupon_schedule"]["hit_rate"], 2 / 3)
+
+    def test_batch_solver_failures(self):
+        prices = np.array([100.0, 1e9] * 12)
+        with instrumentation.collect() as telemetry:
+            _, converged = calc_ytm_of_bonds(prices, 3.0, self.adate, self.maturity, max_iter=5)
+        snapshot = telemetry.snapshot()
+        self.assertEqual(snapshot["solvers"]["ytm_batch"]["bonds"], 24)
+        self.assertGreaterEqual(snapshot["solvers"]["ytm_batch"]["failures"], 1)
+        self.assertEqual(snapshot["solvers"]["ytm_batch"]["failures"], int((~converged).sum()))
+        self.assertEqual(
+            snapshot["failures"], [{"stage": "ytm_batch", "count": 12, "indices": list(range(1, 24, 2))}]
+        )
+
+    def test_failure_details_are_bounded(self):
+        prices = np.full(100000, 1e9)
+        with instrumentation.collect() as telemetry:
+            calc_ytm_of_bonds(prices, 3.0, self.adate, self.maturity, max_iter=5)
+        failure, = telemetry.snapshot()["failures"]
+        self.assertEqual(failure["count"], 100000)
+        self.assertEqual(failure["indices"], list(range(instrumentation.MAX_RECORDED_INDICES)))
+
+    def test_prometheus_export(self):
+        with instrumentation.collect() as telemetry:
+            find_next_coupon_date(self.adate, self.maturity)
+        text = telemetry.to_prometheus()
+        self.assertIn("# TYPE fi_utils_stage_calls_total counter", text)
+        self.assertIn('fi_utils_stage_calls_total{stage="coupon_dates"} 1', text)
+        self.assertIn('fi_utils_cache_misses_total{cache="coupon_schedule"} 1', text)
@@ -0,0 +1,88 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.curve_pricing import calc_pv_from_cashflow_layout
+from fi_utils.monte_carlo import (
+    PVStatistics,
+    hull_white_model,
+    simulate_discount_factors,
+    simulate_portfolio_pvs,
+    vasicek_model,
+)
+from test.helpers import make_synthetic_portfolio
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(24)
+        size = 30
+        self.adate = datetime.date(2025, 4, 17)
+        self.portfolio = make_synthetic_portfolio(rng, size, self.adate, max_days=10 * 365)
+        self.layout = self.portfolio.cashflow_layout(self.adate)
+        self.curve = {0.5: 3.9, 1: 4.0, 2: 3.8, 5: 3.8, 10: 4.05}
+
+    def test_hull_white_fits_initial_curve(self):
+        model = hull_white_model(self.curve, 0.1, 1.0, 10.0)
+        discount_factors = simulate_discount_factors(model, 20000, np.random.default_rng(1))
+        curve_discount_factors = (1 + np.interp(model.times, list(self.curve), list(self.curve.values())) / 100) ** (
+            -model.times
+        )
+        np.testing.assert_allclose(discount_factors.mean(axis=0), curve_discount_factors, rtol=3e-3)
+        result = simulate_portfolio_pvs(self.layout, model, 20000, seed=2)
+        np.testing.assert_allclose(result.mean_pv, calc_pv_from_cashflow_layout(self.layout, self.curve), rtol=3e-3)
+        self.assertGreater(result.statistics.value_at_risk(0.99), 0)
+        self.assertGreater(result.statistics.expected_shortfall(0.99), result.statistics.value_at_risk(0.99))
+
+    def test_deterministic_vasicek(self):
+        model = vasicek_model(4.0, 0.0, 4.0, 0.0, 10.0)
+        result = simulate_portfolio_pvs(self.layout, model, 10, quantities=np.arange(30), seed=3)
+        expected = self.layout.reduce(self.layout.cashflows * np.exp(-0.04 * self.layout.time_to_cf))
+        np.testing.assert_allclose(result.mean_pv, expected, rtol=1e-12)
+        self.assertAlmostEqual(result.statistics.mean, expected @ np.arange(30), places=8)
+        self.assertAlmostEqual(result.statistics.std, 0.0, places=8)
+        with self.assertRaises(ValueError):
+            simulate_portfolio_pvs(self.layout, vasicek_model(4.0, 0.1, 4.0, 1.0, 5.0), 10)
+
+    def test_chunks_independent_of_processes(self):
+        model = vasicek_model(3.5, 0.2, 4.0, 1.2, 10.0, steps_per_year=12)
+        results = [
+            simulate_portfolio_pvs(self.layout, model, 3000, seed=4, max_memory_bytes=2_000_000, n_jobs=n_jobs)
+            for n_jobs in (1, 2)
+        ]
+        np.testing.assert_allclose(results[0].mean_pv, results[1].mean_pv, rtol=1e-12)
+        np.testing.assert_allclose(
+            results[0].statistics.quantile([0.01, 0.5, 0.99]), results[1].statistics.quantile([0.01, 0.5, 0.99])
+        )
+
+
+class TestPVStatistics(unittest.TestCase):
+    def test_matches_full_sample(self):
+        pvs = np.random.default_rng(5).normal(100, 3, 100000)
+        statistics = PVStatistics(1001)
+        for chunk in np.array_split(pvs, 37):
+            statistics.update(chunk)
+        self.assertAlmostEqual(statistics.mean, pvs.mean(), places=9)
+        self.assertAlmostEqual(statistics.std, pvs.std(ddof=1), places=9)
+        levels = [0.001, 0.01, 0.25, 0.5, 0.9, 0.999]
+        np.testing.assert_allclose(statistics.quantile(levels), np.quantile(pvs, levels), atol=2e-3)
+        np.testing.assert_allclose(statistics.quantile(levels[:2]), np.quantile(pvs, levels[:2]), rtol=1e-12)
+        worst = np.sort(pvs)[:1000]
+        self.assertAlmostEqual(statistics.expected_shortfall(0.99), pvs.mean() - worst.mean(), places=9)
+        with self.assertRaises(ValueError):
+            statistics.expected_shortfall(0.95)
+
+    def test_small_first_chunk_keeps_memory_bounded(self):
+        pvs = np.random.default_rng(6).normal(100, 3, 200000)
+        statistics = PVStatistics(101, bins=1 << 12)
+        statistics.update(pvs[:5])
+        held_bytes = sum(value.nbytes for value in vars(statistics).values() if isinstance(value, np.ndarray))
+        for chunk in np.array_split(pvs[5:], 50):
+            statistics.update(chunk)
+            self.assertEqual(
+                sum(value.nbytes for value in vars(statistics).values() if isinstance(value, np.ndarray)),
+                held_bytes + 8 * (101 - 5),
+            )
+        levels = [0.01, 0.25, 0.5, 0.9, 0.999]
+        np.testing.assert_allclose(statistics.quantile(levels), np.quantile(pvs, levels), atol=2e-2)
+        self.assertAlmostEqual(statistics.mean, pvs.mean(), places=9)
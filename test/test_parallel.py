@@ -0,0 +1,43 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.parallel import ParallelValuationExecutor
+from fi_utils.portfolio import BondPortfolio
+from test.helpers import make_synthetic_portfolio
+
+
+class TestParallelValuationExecutor(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.adate = datetime.date(2025, 4, 17)
+        self.portfolio = make_synthetic_portfolio(rng, 1000, self.adate, 1)
+        self.prices = rng.uniform(80.0, 120.0, 1000)
+        self.curve = {y: 4.0 + y / 100 for y in range(1, 31)}
+
+    def test_matches_single_process(self):
+        with ParallelValuationExecutor(n_workers=2, task_size=128) as executor:
+            ytms, converged = executor.ytm(self.portfolio, self.prices, self.adate)
+            pvs = executor.pv(self.portfolio, self.adate, self.curve)
+            accrued = executor.accrued_interest(self.portfolio, self.adate)
+        expected_ytms, expected_converged = self.portfolio.ytm(self.prices, self.adate)
+        np.testing.assert_array_equal(ytms, expected_ytms)
+        np.testing.assert_array_equal(converged, expected_converged)
+        np.testing.assert_array_equal(pvs, self.portfolio.pv(self.adate, self.curve))
+        np.testing.assert_array_equal(accrued, self.portfolio.accrued_interest(self.adate))
+
+    def test_worker_errors_are_raised(self):
+        matured = BondPortfolio([datetime.date(2020, 1, 1)], [4.0])
+        with ParallelValuationExecutor(n_workers=1) as executor:
+            with self.assertRaises(ValueError):
+                executor.pv(matured, self.adate, self.curve)
+
+    def test_prices_must_match_portfolio(self):
+        with ParallelValuationExecutor(n_workers=1) as executor:
+            for prices in (self.prices[:-1], self.prices[:, None], 100.0):
+                with self.assertRaises(ValueError):
+                    executor.ytm(self.portfolio, prices, self.adate)
+
+
+if __name__ == "__main__":
+    unittest.main()
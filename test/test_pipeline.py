@@ -0,0 +1,143 @@
+import unittest
+import csv
+import datetime
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+
+from fi_utils import pipeline
+from fi_utils.bond_valuation import calc_ytm_of_bond
+from test.helpers import make_synthetic_portfolio
+
+
+class TestValuePositionsFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmpdir.name, "positions.csv")
+        self.adate = datetime.date(2025, 4, 17)
+        self.curve = {y: 4.0 + y / 100 for y in range(1, 31)}
+        rng = np.random.default_rng(11)
+        portfolio = make_synthetic_portfolio(rng, 250, self.adate, max_days=20 * 365, freq=(2, 4))
+        prices = np.round(rng.uniform(80, 120, 250), 3).tolist()
+        with open(self.input_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["position_id", "maturity", "coupon", "price", "freq"])
+            columns = zip(portfolio.maturities.tolist(), portfolio.coupons.tolist(), prices, portfolio.freq.tolist())
+            for i, (maturity, coupon, price, freq) in enumerate(columns):
+                writer.writerow([f"P{i}", maturity.isoformat(), coupon, price, freq])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _read(self, path):
+        with open(path, newline="") as f:
+            return list(csv.reader(f))
+
+    def test_values_all_positions(self):
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        stats = pipeline.value_positions_file(
+            self.input_path, output_path, self.adate, self.curve, chunk_size=100
+        )
+        self.assertEqual((stats.rows, stats.chunks, stats.resumed_rows), (250, 3, 0))
+        rows = self._read(output_path)
+        self.assertEqual(
+            rows[0],
+            ["position_id", "maturity", "coupon", "price", "freq", "ytm", "ytm_converged",
+             "accrued_interest", "pv"],
+        )
+        self.assertEqual(len(rows), 251)
+        _, maturity, coupon, price, freq, ytm = rows[7][:6]
+        self.assertAlmostEqual(
+            float(ytm),
+            calc_ytm_of_bond(float(price), float(coupon), self.adate,
+                             datetime.date.fromisoformat(maturity), freq=int(freq)),
+            places=8,
+        )
+
+    def test_resumes_after_last_completed_chunk(self):
+        reference_path = os.path.join(self.tmpdir.name, "reference.csv")
+        pipeline.value_positions_file(self.input_path, reference_path, self.adate, chunk_size=100)
+
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        value_positions_chunk = pipeline.value_positions_chunk
+        calls = []
+
+        def fail_on_second_chunk(*args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return value_positions_chunk(*args)
+
+        with mock.patch.object(pipeline, "value_positions_chunk", fail_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        # a partially written chunk after the checkpoint is discarded on resume
+        with open(output_path, "a") as f:
+            f.write("partial,row")
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        self.assertEqual((stats.rows, stats.resumed_rows), (250, 100))
+        self.assertEqual(self._read(output_path), self._read(reference_path))
+
+    def test_matured_positions(self):
+        with open(self.input_path, "a", newline="") as f:
+            csv.writer(f).writerow(["MATURED", "2025-03-31", 2.5, 100.0, 2])
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, self.curve, chunk_size=100)
+        self.assertEqual(stats.rows, 251)
+        rows = self._read(output_path)
+        self.assertEqual(rows[-1][5:], ["nan", "False", "nan", "nan"])
+        self.assertTrue(all(row[6] == "True" for row in rows[1:-1]))
+
+    def test_skips_blank_lines(self):
+        with open(self.input_path, "a", newline="") as f:
+            f.write("\n")
+            csv.writer(f).writerow(["LAST", "2030-06-15", 2.5, 100.0, 2])
+            f.write("\n")
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        self.assertEqual(stats.rows, 251)
+        rows = self._read(output_path)
+        self.assertEqual(len(rows), 252)
+        self.assertEqual(rows[-1][:5], ["LAST", "2030-06-15", "2.5", "100.0", "2"])
+        self.assertEqual(rows[-1][6], "True")
+
+    def test_short_row_names_its_line(self):
+        with open(self.input_path, "a", newline="") as f:
+            csv.writer(f).writerow(["SHORT", "2030-06-15", 2.5, 100.0])
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        with self.assertRaisesRegex(ValueError, "line 252 has 4 fields but the header has 5"):
+            pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        # chunks before the bad row are kept for a resumed run
+        self.assertEqual(len(self._read(output_path)), 201)
+
+    def test_starts_over_when_output_lost(self):
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        reference = self._read(output_path)
+        with open(output_path, "r+") as f:
+            f.truncate(100)
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        self.assertEqual(stats.resumed_rows, 0)
+        self.assertEqual(self._read(output_path), reference)
+        os.remove(output_path)
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        self.assertEqual(stats.resumed_rows, 0)
+        self.assertEqual(self._read(output_path), reference)
+        with open(output_path, "rb") as f:
+            self.assertNotIn(b"\0", f.read())
+
+    def test_starts_over_when_parameters_change(self):
+        output_path = os.path.join(self.tmpdir.name, "out.csv")
+        pipeline.value_positions_file(self.input_path, output_path, self.adate, chunk_size=100)
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, self.curve, chunk_size=100)
+        self.assertEqual((stats.rows, stats.resumed_rows), (250, 0))
+        rows = self._read(output_path)
+        self.assertEqual(rows[0][-1], "pv")
+        self.assertEqual({len(row) for row in rows}, {9})
+        stats = pipeline.value_positions_file(self.input_path, output_path, self.adate, self.curve, chunk_size=100)
+        self.assertEqual(stats.resumed_rows, 250)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import (
+    calc_accrued_interest,
+    calc_pv_of_vanilla_bond,
+    calc_ytm_of_bond,
+)
+from fi_utils.portfolio import BYTES_PER_BOND, BondPortfolio
+
+
+class TestBondPortfolio(unittest.TestCase):
+    def setUp(self):
+        self.adate = datetime.date(2025, 4, 17)
+        self.records = [
+            {"maturity": datetime.date(2027, 5, 21), "coupon": 5.41},
+            {"maturity": datetime.date(2048, 9, 25), "coupon": 4.0, "freq": 4},
+            {"maturity": datetime.date(2031, 1, 31), "coupon": 2.5, "principal_amount": 1000.0},
+        ]
+        self.portfolio = BondPortfolio.from_records(self.records)
+
+    def test_columns_are_typed(self):
+        self.assertEqual(self.portfolio.maturities.dtype, np.dtype("datetime64[D]"))
+        self.assertEqual(self.portfolio.freq.tolist(), [2, 4, 2])
+        self.assertEqual(self.portfolio.principal_amount.tolist(), [100.0, 100.0, 1000.0])
+        self.assertEqual(self.portfolio.nbytes, BYTES_PER_BOND * 3)
+
+    def test_from_columns(self):
+        portfolio = BondPortfolio.from_columns(
+            {"maturities": ["2027-05-21", "2048-09-25"], "coupons": [5.41, 4.0]}
+        )
+        self.assertEqual(len(portfolio), 2)
+        self.assertEqual(portfolio.days_per_year.tolist(), [365, 365])
+
+    def test_slicing_is_zero_copy(self):
+        head = self.portfolio[:2]
+        self.assertEqual(len(head), 2)
+        self.assertTrue(np.shares_memory(head.coupons, self.portfolio.coupons))
+        filtered = self.portfolio.filter(self.portfolio.coupons > 3.0)
+        self.assertEqual(filtered.coupons.tolist(), [5.41, 4.0])
+        self.assertEqual(len(self.portfolio[1]), 1)
+
+    def test_batch_apis_match_scalar(self):
+        prices = np.array([104.3, 89.0, 950.0])
+        ytms, converged = self.portfolio.ytm(prices, self.adate)
+        curve = {y: 4.0 + y / 100 for y in range(1, 31)}
+        pvs = self.portfolio.pv(self.adate, curve)
+        accrued = self.portfolio.accrued_interest(self.adate)
+        self.assertTrue(converged.all())
+        np.testing.assert_allclose(self.portfolio.pv_from_ytm(ytms, self.adate), prices)
+        for i, record in enumerate(self.records):
+            freq = record.get("freq", 2)
+            principal_amount = record.get("principal_amount", 100.0)
+            self.assertAlmostEqual(
+                ytms[i],
+                calc_ytm_of_bond(
+                    prices[i], record["coupon"], self.adate, record["maturity"],
+                    freq=freq, principal_amount=principal_amount,
+                ),
+                places=8,
+            )
+            self.assertAlmostEqual(
+                accrued[i],
+                calc_accrued_interest(self.adate, record["maturity"], record["coupon"], freq),
+            )
+            if principal_amount == 100.0:
+                self.assertAlmostEqual(
+                    pvs[i],
+                    calc_pv_of_vanilla_bond(self.adate, record["maturity"], record["coupon"], curve, freq),
+                    delta=1e-10,
+                )
+        risk = self.portfolio.yield_risk(ytms, self.adate)
+        np.testing.assert_allclose(risk.pv, prices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from fi_utils.bond_valuation import (
+    calc_pv_of_vanilla_bond,
+    calc_ytm_of_bond,
+    calculate_pv_from_ytm,
+)
+from fi_utils import pricing_service
+from fi_utils.pricing_service import PricingService
+
+
+class TestPricingService(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_requests_are_batched(self):
+        adate = datetime.date(2025, 4, 17)
+        maturities = [datetime.date(2026 + i % 20, 1 + i % 12, 15) for i in range(200)]
+        async with PricingService(batch_window=0.01, max_batch_size=64) as service:
+            ytms = await asyncio.gather(
+                *(
+                    service.submit(
+                        "ytm",
+                        {"price": 95.0 + i % 10, "coupon_rate": 4.0,
+                         "adate": adate.isoformat(), "maturity": maturity.isoformat()},
+                    )
+                    for i, maturity in enumerate(maturities)
+                )
+            )
+            pv = await service.submit(
+                "pv_from_ytm",
+                {"ytm": 4.5, "coupon_rate": 4.0, "adate": "2025-04-17",
+                 "maturity": "2048-09-25", "freq": 4},
+            )
+            metrics = service.metrics()
+        for i, (ytm, maturity) in enumerate(zip(ytms, maturities)):
+            self.assertAlmostEqual(ytm, calc_ytm_of_bond(95.0 + i % 10, 4.0, adate, maturity), places=8)
+        self.assertAlmostEqual(
+            pv, calculate_pv_from_ytm(4.5, 4.0, adate, datetime.date(2048, 9, 25), freq=4), places=10
+        )
+        self.assertEqual(metrics["requests"], 201)
+        self.assertLess(metrics["batches"], 20)
+        self.assertGreater(metrics["batch_fill_ratio"], 0.0)
+        self.assertGreaterEqual(metrics["latency_p99_ms"], metrics["latency_p50_ms"])
+
+    async def test_bad_request_fails_alone(self):
+        async with PricingService() as service:
+            good, bad = await asyncio.gather(
+                service.submit("pv_from_ytm", {"ytm": 4.0, "coupon_rate": 5.0,
+                                               "adate": "2025-04-17", "maturity": "2030-01-31"}),
+                service.submit("pv_from_ytm", {"ytm": 4.0, "coupon_rate": 5.0,
+                                               "adate": "2025-04-17", "maturity": "2020-01-31"}),
+                return_exceptions=True,
+            )
+            with self.assertRaises(ValueError):
+                await service.submit("duration", {})
+        self.assertGreater(good, 100.0)
+        self.assertIsInstance(bad, ValueError)
+
+    async def test_next_batch_is_collected_during_evaluation(self):
+        release = threading.Event()
+
+        def evaluate_slowly(params):
+            release.wait(5)
+            return [1.0] * len(params)
+
+        with mock.patch.dict(pricing_service.METHODS, {"slow": evaluate_slowly}):
+            async with PricingService(batch_window=0.001) as service:
+                first = asyncio.ensure_future(service.submit("slow", {}))
+                await asyncio.sleep(0.05)
+                second = asyncio.ensure_future(service.submit("slow", {}))
+                await asyncio.sleep(0.05)
+                # the second request left the queue while the first batch was still being evaluated
+                self.assertEqual(service.metrics()["queue_depth"], 0)
+                self.assertFalse(first.done())
+                release.set()
+                self.assertEqual(await asyncio.gather(first, second), [1.0, 1.0])
+                self.assertEqual(service.metrics()["batches"], 2)
+
+    async def test_close_fails_pending_requests(self):
+        release = threading.Event()
+
+        def evaluate_slowly(params):
+            release.wait(5)
+            return [1.0] * len(params)
+
+        with mock.patch.dict(pricing_service.METHODS, {"slow": evaluate_slowly}):
+            service = PricingService(batch_window=0.001)
+            await service.start()
+            in_flight = asyncio.ensure_future(service.submit("slow", {}))
+            await asyncio.sleep(0.05)
+            queued = asyncio.ensure_future(service.submit("slow", {}))
+            await asyncio.sleep(0.05)
+            await service.close()
+            release.set()
+            results = await asyncio.wait_for(asyncio.gather(in_flight, queued, return_exceptions=True), 1)
+            with self.assertRaises(RuntimeError):
+                await service.submit("slow", {})
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+            self.assertEqual(str(result), "service closed")
+
+    async def test_batch_failure_does_not_stop_the_service(self):
+        params = {"ytm": 4.0, "coupon_rate": 5.0, "adate": "2025-04-17", "maturity": "2030-01-31"}
+        evaluate = pricing_service._evaluate
+        failures = [MemoryError("out of memory")]
+
+        def fail_once(method, batch):
+            if failures:
+                raise failures.pop()
+            return evaluate(method, batch)
+
+        with mock.patch.object(pricing_service, "_evaluate", fail_once):
+            async with PricingService() as service:
+                with self.assertLogs(level="ERROR"), self.assertRaises(MemoryError):
+                    await service.submit("pv_from_ytm", params)
+                pv = await service.submit("pv_from_ytm", params)
+        self.assertGreater(pv, 100.0)
+
+    async def test_unix_socket(self):
+        curve = {str(y): 4.0 + y / 100 for y in range(1, 31)}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "pricing.sock")
+            async with PricingService() as service:
+                await service.serve_unix(path)
+                reader, writer = await asyncio.open_unix_connection(path)
+                for request_id in range(3):
+                    writer.write(json.dumps({
+                        "id": request_id, "method": "curve_pv",
+                        "params": {"adate": "2025-04-25", "maturity": "2048-09-25",
+                                   "coupon": 4.0 + request_id, "curve": curve},
+                    }).encode() + b"\n")
+                writer.write(json.dumps({"id": 3, "method": "nonsense"}).encode() + b"\n")
+                writer.write(b"[1]\n")
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in range(5)]
+                writer.close()
+                await writer.wait_closed()
+        responses = {response["id"]: response for response in responses}
+        for request_id in range(3):
+            self.assertAlmostEqual(
+                responses[request_id]["result"],
+                calc_pv_of_vanilla_bond(
+                    datetime.date(2025, 4, 25), datetime.date(2048, 9, 25), 4.0 + request_id,
+                    {float(t): r for t, r in curve.items()},
+                ),
+                delta=1e-10,
+            )
+        self.assertIn("error", responses[3])
+        self.assertIn("not an object", responses[None]["error"])
+
+    async def test_malformed_json_is_answered(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "pricing.sock")
+            async with PricingService() as service:
+                await service.serve_unix(path)
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b'{"id": 0, "method"\n')
+                await writer.drain()
+                error = json.loads(await reader.readline())
+                writer.write(json.dumps({"id": 1, "method": "metrics"}).encode() + b"\n")
+                await writer.drain()
+                metrics = json.loads(await reader.readline())
+                writer.close()
+                await writer.wait_closed()
+        self.assertIsNone(error["id"])
+        self.assertIn("not valid JSON", error["error"])
+        self.assertEqual(metrics["id"], 1)
+        self.assertIn("result", metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import calculate_pv_from_ytm
+from fi_utils.curve import Curve
+from fi_utils.curve_pricing import calc_pv_of_vanilla_bonds
+from fi_utils.risk import (
+    aggregate_curve_risk,
+    aggregate_yield_risk,
+    calc_curve_risk,
+    calc_yield_risk,
+)
+
+
+class TestRisk(unittest.TestCase):
+    def setUp(self):
+        self.adate = datetime.date(2025, 4, 17)
+        self.maturities = [
+            datetime.date(2026, 1, 15),
+            datetime.date(2032, 7, 31),
+            datetime.date(2048, 9, 25),
+        ]
+        self.coupons = np.array([1.5, 4.0, 5.25])
+        self.ytms = np.array([3.1, 3.8, 4.6])
+        self.curve = {0.5: 3.0, 1: 3.2, 2: 3.5, 5: 3.9, 10: 4.2, 30: 4.5}
+
+    def test_yield_risk_matches_bump_and_reprice(self):
+        risk = calc_yield_risk(self.ytms, self.coupons, self.adate, self.maturities)
+        bump = 1e-4
+        for i, maturity in enumerate(self.maturities):
+            pv = calculate_pv_from_ytm(self.ytms[i], self.coupons[i], self.adate, maturity)
+            up = calculate_pv_from_ytm(self.ytms[i] + bump, self.coupons[i], self.adate, maturity)
+            down = calculate_pv_from_ytm(self.ytms[i] - bump, self.coupons[i], self.adate, maturity)
+            self.assertAlmostEqual(risk.pv[i], pv, places=10)
+            self.assertAlmostEqual(risk.modified_duration[i], (down - up) / (2 * bump / 100) / pv, places=5)
+            self.assertAlmostEqual(
+                risk.convexity[i], (up + down - 2 * pv) / (bump / 100) ** 2 / pv, delta=1e-2
+            )
+            self.assertAlmostEqual(risk.dv01[i], (down - up) / 2 * 100, places=6)
+        self.assertTrue((risk.macaulay_duration > risk.modified_duration).all())
+
+    def test_key_rate_durations_match_bump_and_reprice(self):
+        risk = calc_curve_risk(self.adate, self.maturities, self.coupons, self.curve)
+        base = Curve.from_dict(self.curve)
+        np.testing.assert_allclose(
+            risk.pv, calc_pv_of_vanilla_bonds(self.adate, self.maturities, self.coupons, base)
+        )
+        bump = 1e-4
+        for j in range(len(base)):
+            shock = np.eye(len(base))[j] * bump
+            up = calc_pv_of_vanilla_bonds(
+                self.adate, self.maturities, self.coupons, Curve(base.tenors, base.rates + shock)
+            )
+            down = calc_pv_of_vanilla_bonds(
+                self.adate, self.maturities, self.coupons, Curve(base.tenors, base.rates - shock)
+            )
+            np.testing.assert_allclose(
+                risk.key_rate_durations[:, j],
+                (down - up) / (2 * bump / 100) / risk.pv,
+                atol=1e-5,
+            )
+        np.testing.assert_allclose(
+            risk.effective_duration, risk.key_rate_durations.sum(axis=1)
+        )
+
+    def test_portfolio_aggregates(self):
+        quantities = np.array([10.0, 0.0, 2.5])
+        risk = calc_yield_risk(self.ytms, self.coupons, self.adate, self.maturities)
+        portfolio = aggregate_yield_risk(risk, quantities)
+        self.assertAlmostEqual(portfolio.pv, (risk.pv * quantities).sum())
+        self.assertAlmostEqual(portfolio.dv01, (risk.dv01 * quantities).sum())
+        self.assertAlmostEqual(
+            portfolio.dv01, portfolio.pv * portfolio.modified_duration * 1e-4
+        )
+        curve_risk = aggregate_curve_risk(
+            calc_curve_risk(self.adate, self.maturities, self.coupons, self.curve)
+        )
+        self.assertEqual(curve_risk.key_rate_durations.shape, (len(self.curve),))
+        self.assertAlmostEqual(
+            curve_risk.effective_duration, curve_risk.key_rate_durations.sum()
+        )
+        self.assertAlmostEqual(curve_risk.dv01, curve_risk.key_rate_dv01.sum())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import calc_pv_of_vanilla_bond
+from fi_utils.curve import Curve
+from fi_utils.curve_pricing import calc_pv_from_cashflow_layout, get_cashflow_layout
+from fi_utils.scenarios import (
+    calc_scenario_pvs,
+    key_rate_scenarios,
+    parallel_shift_scenarios,
+    twist_scenarios,
+)
+
+
+class TestScenarios(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.adate = datetime.date(2025, 4, 25)
+        self.maturities = [
+            self.adate + datetime.timedelta(days=int(days))
+            for days in rng.integers(30, 30 * 365, 50)
+        ]
+        self.coupons = rng.uniform(0.0, 8.0, 50)
+        self.curve = {0.5: 3.0, 1: 3.2, 2: 3.5, 5: 3.9, 10: 4.2, 30: 4.5}
+        self.layout = get_cashflow_layout(self.adate, self.maturities, self.coupons)
+
+    def test_matches_repricing_shocked_curves(self):
+        scenarios = np.vstack(
+            [
+                parallel_shift_scenarios(self.curve, [-1.0, 0.0, 0.5]),
+                twist_scenarios(self.curve, [0.25, -0.25]),
+                key_rate_scenarios(self.curve),
+            ]
+        )
+        pvs = calc_scenario_pvs(self.layout, self.curve, scenarios)
+        self.assertEqual(pvs.shape, (scenarios.shape[0], 50))
+        base = Curve.from_dict(self.curve)
+        for scenario, scenario_pvs in zip(scenarios[[0, 3, 6]], pvs[[0, 3, 6]]):
+            shocked = Curve(base.tenors, base.rates + scenario)
+            for i in (0, 17, 49):
+                self.assertAlmostEqual(
+                    scenario_pvs[i],
+                    calc_pv_of_vanilla_bond(
+                        self.adate, self.maturities[i], self.coupons[i], shocked
+                    ),
+                    delta=1e-10,
+                )
+        np.testing.assert_allclose(
+            pvs[1], calc_pv_from_cashflow_layout(self.layout, self.curve), rtol=1e-14
+        )
+
+    def test_chunked_and_parallel_runs_agree(self):
+        scenarios = parallel_shift_scenarios(self.curve, np.linspace(-2.0, 2.0, 40))
+        pvs = calc_scenario_pvs(self.layout, self.curve, scenarios)
+        chunked = calc_scenario_pvs(
+            self.layout, self.curve, scenarios, max_memory_bytes=1
+        )
+        parallel = calc_scenario_pvs(
+            self.layout, self.curve, scenarios, max_memory_bytes=2 ** 16, n_jobs=2
+        )
+        np.testing.assert_array_equal(pvs, chunked)
+        np.testing.assert_array_equal(pvs, parallel)
+
+    def test_scenario_width_must_match_curve(self):
+        with self.assertRaises(ValueError):
+            calc_scenario_pvs(self.layout, self.curve, np.zeros((2, 3)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import datetime
+import numpy as np
+
+from fi_utils.bond_valuation import calc_pv_of_vanilla_bond
+from fi_utils.spread import calc_z_spreads
+from test.helpers import make_synthetic_portfolio
+
+
+class TestZSpreads(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        self.adate = datetime.date(2025, 4, 17)
+        size = 300
+        self.portfolio = make_synthetic_portfolio(rng, size, self.adate)
+        self.curve = {0.5: 3.9, 1: 4.0, 2: 3.8, 5: 3.8, 10: 4.05, 30: 4.5}
+        self.spreads = rng.uniform(-1.0, 6.0, size)
+
+    def _shifted_pv(self, i, spread):
+        bond = self.portfolio[[i]]
+        curve = {tenor: rate + spread for tenor, rate in self.curve.items()}
+        return calc_pv_of_vanilla_bond(
+            self.adate, bond.maturities[0].item(), bond.coupons[0], curve, int(bond.freq[0])
+        )
+
+    def test_reprices_with_shifted_curve(self):
+        # a parallel shift of a linearly interpolated curve is the same as a spread over it
+        prices = np.array([self._shifted_pv(i, s) for i, s in enumerate(self.spreads)])
+        spreads, converged = self.portfolio.z_spread(prices, self.adate, self.curve)
+        self.assertTrue(converged.all())
+        np.testing.assert_allclose(spreads, self.spreads, atol=1e-8)
+
+    def test_zero_spread_at_curve_pv(self):
+        prices = self.portfolio.pv(self.adate, self.curve)
+        spreads, converged = calc_z_spreads(
+            prices, self.adate, self.portfolio.maturities, self.portfolio.coupons, self.curve, self.portfolio.freq
+        )
+        self.assertTrue(converged.all())
+        np.testing.assert_allclose(spreads, 0.0, atol=1e-9)
+
+    def test_invalid_prices(self):
+        spreads, converged = self.portfolio[:2].z_spread([0.0, -1.0], self.adate, self.curve)
+        self.assertTrue(np.isnan(spreads).all())
+        self.assertFalse(converged.any())
+
+    def test_unconverged_spreads_are_nan(self):
+        prices = np.array([self._shifted_pv(i, s) for i, s in enumerate(self.spreads)])
+        spreads, converged = calc_z_spreads(
+            prices, self.adate, self.portfolio.maturities, self.portfolio.coupons, self.curve, self.portfolio.freq,
+            max_iter=2,
+        )
+        self.assertFalse(converged.all())
+        self.assertTrue(np.isnan(spreads[~converged]).all())
+        self.assertFalse(np.isnan(spreads[converged]).any())
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+
+from fi_utils.bond_valuation import calc_accrued_interest, calc_pv_of_vanilla_bond, calculate_pv_from_ytm
+from fi_utils.timeseries import calc_time_series
+from test.helpers import make_synthetic_portfolio
+
+
+class TestTimeSeries(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(23)
+        size = 40
+        self.adates = np.arange("2024-12-20", "2025-09-01", 7, dtype="datetime64[D]")
+        self.portfolio = make_synthetic_portfolio(rng, size, "2025-01-01", 0, 10 * 365)
+        # a bond maturing within the history and one maturing on a coupon date of the history
+        self.portfolio.maturities[:2] = np.array(["2025-03-15", "2025-06-27"], dtype="datetime64[D]")
+        self.ytms = rng.uniform(0.5, 6.0, (self.adates.size, size))
+
+    def test_matches_pricing_each_date(self):
+        valuation = self.portfolio.time_series(self.adates, ytms=self.ytms)
+        self.assertEqual(valuation.pv.shape, (self.adates.size, len(self.portfolio)))
+        for i, adate in enumerate(self.adates.tolist()):
+            for j in range(len(self.portfolio)):
+                maturity = self.portfolio.maturities[j].item()
+                if adate > maturity:
+                    self.assertTrue(np.isnan(valuation.pv[i, j]))
+                    continue
+                freq, coupon = int(self.portfolio.freq[j]), self.portfolio.coupons[j]
+                pv = calculate_pv_from_ytm(self.ytms[i, j], coupon, adate, maturity, freq=freq)
+                accrued = calc_accrued_interest(adate, maturity, coupon, freq)
+                self.assertAlmostEqual(valuation.pv[i, j], pv, places=9)
+                self.assertAlmostEqual(valuation.accrued_interest[i, j], accrued, places=12)
+                self.assertAlmostEqual(valuation.clean_price[i, j], pv - accrued, places=9)
+
+    def test_curve_history(self):
+        curves = [
+            {0.5: 3.9 + shift, 1: 4.0 + shift, 5: 3.8, 10: 4.05 + shift / 2, 30: 4.5}
+            for shift in np.linspace(-0.5, 0.5, self.adates.size)
+        ]
+        # a curve with other tenors in the history
+        curves[3] = {0.25: 3.5, 2: 3.7, 7: 4.1}
+        valuation = calc_time_series(
+            self.adates,
+            self.portfolio.maturities,
+            self.portfolio.coupons,
+            curves=curves,
+            freq=self.portfolio.freq,
+            max_memory_bytes=50_000,
+        )
+        for i, adate in enumerate(self.adates.tolist()):
+            for j in range(len(self.portfolio)):
+                maturity = self.portfolio.maturities[j].item()
+                if adate > maturity:
+                    self.assertTrue(np.isnan(valuation.pv[i, j]))
+                    continue
+                pv = calc_pv_of_vanilla_bond(
+                    adate, maturity, self.portfolio.coupons[j], curves[i], int(self.portfolio.freq[j])
+                )
+                self.assertAlmostEqual(valuation.pv[i, j], pv, places=9)
+
+    def test_single_bond_and_invalid_inputs(self):
+        bond = self.portfolio[5:6]
+        valuation = bond.time_series(self.adates, ytms=self.ytms[:, 5])
+        np.testing.assert_allclose(
+            valuation.pv, self.portfolio.time_series(self.adates, ytms=self.ytms).pv[:, 5:6]
+        )
+        with self.assertRaises(ValueError):
+            bond.time_series(self.adates)
+        with self.assertRaises(ValueError):
+            bond.time_series(self.adates, curves=[{1: 4.0}])
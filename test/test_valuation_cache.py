@@ -0,0 +1,97 @@
+import unittest
+import datetime
+import gc
+import numpy as np
+
+from fi_utils.bond_valuation import calc_accrued_interest, calc_pv_of_vanilla_bond, calc_ytm_of_bond
+from fi_utils.curve import Curve
+from fi_utils.instrumentation import collect
+from fi_utils.valuation_cache import ValuationCache
+from test.helpers import make_synthetic_portfolio
+
+
+class TestValuationCache(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(25)
+        self.adate = datetime.date(2025, 4, 17)
+        securities = make_synthetic_portfolio(rng, 50, self.adate, max_days=20 * 365)
+        # lots of the same securities at a few prices each
+        self.lot_securities = rng.integers(0, 50, 2000)
+        self.lots = securities[self.lot_securities]
+        self.prices = np.round(rng.uniform(95, 105, 50), 2)[self.lot_securities] + rng.choice([0.0, 0.5], 2000)
+        self.curve = {0.5: 3.9, 1: 4.0, 2: 3.8, 5: 3.8, 10: 4.05, 30: 4.5}
+
+    def test_batch_matches_scalar_and_dedups(self):
+        cache = ValuationCache(name="test_valuation")
+        self.addCleanup(cache.close)
+        ytms, converged = cache.ytm_batch(self.lots, self.prices, self.adate)
+        self.assertTrue(converged.all())
+        info = cache.cache_info()
+        self.assertEqual(info.hits, 0)
+        self.assertEqual(info.misses + info.deduplicated, len(self.lots))
+        self.assertLessEqual(info.misses, 100)
+        for i in range(0, len(self.lots), 97):
+            maturity, coupon, freq = self.lots.maturities[i].item(), self.lots.coupons[i], int(self.lots.freq[i])
+            ytm = calc_ytm_of_bond(self.prices[i], coupon, self.adate, maturity, freq=freq)
+            self.assertAlmostEqual(ytms[i], ytm, places=8)
+            # scalar calls hit the results of the batch
+            self.assertEqual(cache.ytm(self.prices[i], coupon, self.adate, maturity, freq=freq), ytms[i])
+        self.assertEqual(cache.cache_info().hits, len(range(0, len(self.lots), 97)))
+        maturity, coupon, freq = self.lots.maturities[0].item(), self.lots.coupons[0], int(self.lots.freq[0])
+        self.assertAlmostEqual(
+            cache.accrued_interest(self.adate, maturity, coupon, freq),
+            calc_accrued_interest(self.adate, maturity, coupon, freq),
+        )
+        np.testing.assert_allclose(
+            cache.accrued_interest_batch(self.lots, self.adate), self.lots.accrued_interest(self.adate)
+        )
+
+    def test_curve_fingerprint_and_hit_rate(self):
+        cache = ValuationCache(name="test_valuation")
+        self.addCleanup(cache.close)
+        with collect() as telemetry:
+            pvs = cache.curve_pv_batch(self.lots, self.adate, self.curve)
+            np.testing.assert_array_equal(cache.curve_pv_batch(self.lots, self.adate, Curve.from_dict(self.curve)), pvs)
+            bumped = cache.curve_pv_batch(self.lots, self.adate, {**self.curve, 30: 4.6})
+        np.testing.assert_allclose(pvs, self.lots.pv(self.adate, self.curve))
+        self.assertTrue((bumped <= pvs).all())
+        i = 7
+        pv = calc_pv_of_vanilla_bond(
+            self.adate, self.lots.maturities[i].item(), self.lots.coupons[i], self.curve, int(self.lots.freq[i])
+        )
+        self.assertAlmostEqual(pvs[i], pv, places=10)
+        unique = np.unique(self.lot_securities).size
+        self.assertEqual(telemetry.snapshot()["caches"]["test_valuation"]["hits"], unique)
+        self.assertAlmostEqual(cache.cache_info().hit_rate, 1 / 3)
+
+    def test_lru_eviction(self):
+        cache = ValuationCache(maxsize=3, name="test_valuation")
+        self.addCleanup(cache.close)
+        maturity = datetime.date(2030, 6, 15)
+        for coupon in (1.0, 2.0, 3.0):
+            cache.accrued_interest(self.adate, maturity, coupon)
+        cache.accrued_interest(self.adate, maturity, 1.0)
+        cache.accrued_interest(self.adate, maturity, 4.0)
+        self.assertEqual(len(cache), 3)
+        cache.accrued_interest(self.adate, maturity, 1.0)
+        cache.accrued_interest(self.adate, maturity, 2.0)
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 5, 3))
+        cache.clear()
+        self.assertEqual(cache.cache_info().misses, 0)
+
+    def test_registration_does_not_keep_caches_alive(self):
+        cache = ValuationCache()
+        with self.assertRaises(ValueError):
+            ValuationCache(name=cache.name)
+        other = ValuationCache()
+        self.assertNotEqual(other.name, cache.name)
+        with collect() as telemetry:
+            self.assertIn(cache.name, telemetry.snapshot()["caches"])
+            other.close()
+            self.assertNotIn(other.name, telemetry.snapshot()["caches"])
+            name = cache.name
+            del cache
+            gc.collect()
+            self.assertNotIn(name, telemetry.snapshot()["caches"])
+        ValuationCache(name=name).close()
@@ -0,0 +1,210 @@
+import unittest
+import datetime
+import math
+import sys
+from unittest import mock
+import numpy as np
+
+from fi_utils.bond_valuation import calculate_pv_from_ytm
+from fi_utils.coupon_schedule import get_coupon_schedule
+from fi_utils.ytm_scalar import solve_ytm
+from fi_utils.ytm_solver import (
+    calc_pv_from_ytms,
+    calc_ytm_of_bonds,
+    get_coupon_layout,
+)
+
+
+class TestCalcYtmOfBonds(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.adate = datetime.date(2025, 4, 17)
+        self.maturities = [
+            self.adate + datetime.timedelta(days=int(days))
+            for days in rng.integers(30, 30 * 365, 200)
+        ]
+        self.coupons = rng.uniform(0.0, 8.0, 200)
+        self.prices = rng.uniform(70.0, 120.0, 200)
+
+    def test_yields_reprice_bonds(self):
+        ytms, converged = calc_ytm_of_bonds(
+            self.prices, self.coupons, self.adate, self.maturities
+        )
+        self.assertTrue(converged.all())
+        for ytm, coupon, maturity, price in zip(
+                ytms, self.coupons, self.maturities, self.prices
+        ):
+            pv = calculate_pv_from_ytm(ytm, coupon, self.adate, maturity)
+            self.assertAlmostEqual(pv, price, places=8)
+
+    def test_short_dated_bond_does_not_go_complex(self):
+        ytms, converged = calc_ytm_of_bonds(
+            [104.3], [5.41], datetime.date(2027, 5, 20), datetime.date(2027, 5, 21)
+        )
+        self.assertTrue(converged[0])
+        self.assertGreater(ytms[0], -100.0)
+        self.assertLess(ytms[0], 0.0)
+
+    def test_non_positive_price_is_flagged(self):
+        ytms, converged = calc_ytm_of_bonds(
+            [0.0, 95.0], [4.0, 4.0], self.adate, [datetime.date(2030, 4, 17)] * 2
+        )
+        self.assertTrue(np.isnan(ytms[0]))
+        self.assertFalse(converged[0])
+        self.assertTrue(converged[1])
+
+    def test_unsolvable_rows_are_nan(self):
+        # a bond valued on its maturity date has no time left to discount its last cashflow over
+        maturity = datetime.date(2030, 4, 17)
+        maturities = [maturity] * 3 + [datetime.date(2035, 4, 17)]
+        ytms, converged = calc_ytm_of_bonds([101.0, 102.0, 99.0, 95.0], [4.0] * 4, maturity, maturities)
+        np.testing.assert_array_equal(converged, [False, False, False, True])
+        self.assertTrue(np.isnan(ytms[:3]).all())
+        self.assertTrue(np.isfinite(ytms[3]))
+
+    def test_converged_yields_reprice_deep_premium_bonds(self):
+        # yields of short bonds far above par sit near -100%, where a whole Newton step barely moves the yield
+        ytms, converged = calc_ytm_of_bonds([300.0, 594.96], 5.0, self.adate, np.datetime64(self.adate) + [1, 13])
+        self.assertFalse(converged.any())
+        self.assertTrue(np.isnan(ytms).all())
+        rng = np.random.default_rng(1)
+        maturities = np.datetime64(self.adate) + rng.integers(1, 400, 4000)
+        coupons = rng.uniform(0.0, 10.0, 4000)
+        prices = rng.uniform(100.0, 4000.0, 4000)
+        ytms, converged = calc_ytm_of_bonds(prices, coupons, self.adate, maturities)
+        self.assertGreater(converged.sum(), 2000)
+        pvs = calc_pv_from_ytms(ytms[converged], coupons[converged], self.adate, maturities[converged])
+        np.testing.assert_allclose(pvs, prices[converged], rtol=1e-6)
+
+    def test_get_coupon_layout_per_bond_freq(self):
+        maturity = datetime.date(2048, 9, 25)
+        time_to_next_cpn, no_of_periods = get_coupon_layout(
+            self.adate, [maturity, maturity], freq=np.array([2, 4])
+        )
+        self.assertGreater(no_of_periods[1], no_of_periods[0])
+        self.assertTrue((time_to_next_cpn >= 0).all())
+
+    def test_get_coupon_layout_counts_every_coupon(self):
+        rng = np.random.default_rng(17)
+        maturities = np.datetime64(self.adate) + rng.integers(1, 30 * 365, 500)
+        freq = rng.choice([1, 2, 4, 12], 500)
+        _, no_of_periods = get_coupon_layout(self.adate, maturities, freq)
+        for maturity, f, periods in zip(maturities.tolist(), freq, no_of_periods):
+            coupon_dates = get_coupon_schedule(maturity, int(f)).coupon_dates_between(self.adate, maturity)
+            self.assertEqual(periods + 1, len(coupon_dates))
+
+
+class TestCalcPvFromYtms(unittest.TestCase):
+    def test_price_yield_grid_matches_scalar(self):
+        adate = datetime.date(2025, 4, 17)
+        maturities = [datetime.date(2027, 5, 21), datetime.date(2048, 9, 25)]
+        coupons = np.array([5.41, 4.0])
+        ytms = np.linspace(-0.5, 12.0, 6)
+        grid = calc_pv_from_ytms(ytms[:, None], coupons, adate, maturities, freq=4)
+        self.assertEqual(grid.shape, (6, 2))
+        for i, ytm in enumerate(ytms):
+            for j, (coupon, maturity) in enumerate(zip(coupons, maturities)):
+                pv = calculate_pv_from_ytm(ytm, coupon, adate, maturity, freq=4)
+                self.assertAlmostEqual(grid[i, j], pv, places=10)
+
+    def test_inverts_calc_ytm_of_bonds(self):
+        adate = datetime.date(2025, 4, 17)
+        maturities = [datetime.date(2030, 1, 31), datetime.date(2041, 6, 15)]
+        prices = np.array([97.5, 103.25])
+        ytms, _ = calc_ytm_of_bonds(prices, [3.0, 5.0], adate, maturities)
+        pvs = calc_pv_from_ytms(ytms, [3.0, 5.0], adate, maturities)
+        np.testing.assert_allclose(pvs, prices, atol=1e-8)
+
+
+class TestSolveYtm(unittest.TestCase):
+    def test_matches_vectorized_solver(self):
+        adate = datetime.date(2025, 4, 17)
+        maturity = datetime.date(2048, 9, 25)
+        time_to_next_cpn, no_of_periods = get_coupon_layout(adate, maturity)
+        solution = solve_ytm(89.0, 4.0, time_to_next_cpn[0], no_of_periods[0])
+        ytms, _ = calc_ytm_of_bonds([89.0], [4.0], adate, maturity)
+        self.assertTrue(solution.converged)
+        self.assertAlmostEqual(solution.ytm, ytms[0], places=8)
+        self.assertLess(solution.pv_evaluations, 10)
+
+    def test_single_cashflow_closed_form(self):
+        solution = solve_ytm(99.0, 4.0, 0.25, 0)
+        self.assertTrue(solution.converged)
+        self.assertEqual(solution.pv_evaluations, 0)
+        self.assertAlmostEqual(
+            solution.ytm, ((102.0 / 99.0) ** (1 / 0.25) - 1) * 100, places=10
+        )
+
+    def test_single_cashflow_extreme_prices(self):
+        for price in (1e-300, 1e300):
+            solution = solve_ytm(price, 4.0, 0.001, 0)
+            self.assertFalse(solution.converged)
+            self.assertTrue(math.isnan(solution.ytm))
+
+    def test_two_cashflows_on_coupon_date(self):
+        solution = solve_ytm(101.0, 5.0, 0.0, 1)
+        self.assertTrue(solution.converged)
+        self.assertEqual(solution.pv_evaluations, 0)
+        discount = (1 + solution.ytm / 100) ** -0.5
+        self.assertAlmostEqual(2.5 + 102.5 * discount, 101.0, places=10)
+
+    def test_huge_price_does_not_converge_to_minus_100(self):
+        for no_of_periods in (1, 5):
+            solution = solve_ytm(1e50, 4.0, 0.3, no_of_periods, max_iter=2)
+            self.assertFalse(solution.converged)
+
+    def test_bisection_fallback(self):
+        # Newton stops after 24 of the 50 PV evaluations, bisection finishes without SciPy, an optional dependency
+        with mock.patch.dict(sys.modules, {"scipy": None, "scipy.optimize": None}):
+            solution = solve_ytm(3e4, 4.0, 0.3, 46, tol=1e-6, max_iter=48)
+        self.assertTrue(solution.converged)
+        self.assertEqual(solution.pv_evaluations, 48)
+        self.assertAlmostEqual(solution.ytm, solve_ytm(3e4, 4.0, 0.3, 46, tol=1e-6).ytm, places=6)
+
+    def test_max_iter_caps_pv_evaluations(self):
+        for price in (1e-50, 1e-6, 89.0, 1e4, 1e50):
+            for max_iter in (1, 2, 5, 20, 100):
+                solution = solve_ytm(price, 4.0, 0.3, 46, max_iter=max_iter)
+                self.assertLessEqual(solution.pv_evaluations, max_iter)
+
+    def test_unbracketed_root_reports_pv_evaluations(self):
+        # 5 Newton iterations and 5 probes widening the bracket up to 16 do not reach the root
+        solution = solve_ytm(1e-50, 4.0, 0.3, 46, max_iter=10)
+        self.assertFalse(solution.converged)
+        self.assertEqual(solution.pv_evaluations, 10)
+
+    def test_unconverged_huge_yield_does_not_overflow(self):
+        # Newton steps of at most 1 in log yield walk past the log yield of 709 where expm1 overflows
+        solution = solve_ytm(1e-300, 4.0, 0.001, 1, max_iter=1500)
+        self.assertFalse(solution.converged)
+        self.assertTrue(math.isnan(solution.ytm))
+
+    def test_solved_yields_reprice_deep_premium_bonds(self):
+        # close to -100% a whole Newton step or a wide bracket barely moves the yield in percentages
+        adate = datetime.date(2025, 4, 17)
+        rng = np.random.default_rng(2)
+        maturities = np.datetime64(adate) + rng.integers(1, 400, 1000)
+        coupons = rng.uniform(0.0, 10.0, 1000)
+        prices = rng.uniform(100.0, 4000.0, 1000)
+        time_to_next_cpn, no_of_periods = get_coupon_layout(adate, maturities)
+        solutions = [solve_ytm(*inputs) for inputs in zip(prices, coupons, time_to_next_cpn, no_of_periods)]
+        converged = np.array([solution.converged for solution in solutions])
+        self.assertGreater(converged.sum(), 500)
+        ytms = np.array([solution.ytm for solution in solutions])
+        self.assertTrue(np.isnan(ytms[~converged]).all())
+        pvs = calc_pv_from_ytms(ytms[converged], coupons[converged], adate, maturities[converged])
+        np.testing.assert_allclose(pvs, prices[converged], rtol=1e-6)
+
+    def test_non_positive_price(self):
+        self.assertFalse(solve_ytm(0.0, 4.0, 0.3, 46).converged)
+
+    def test_newton_step_rounding_to_zero_converges(self):
+        # every iterate stays below the root, so the last step rounds away against an open upper bound
+        solution = solve_ytm(2239.813740410816, 9.10258967897711, 0.08767123287671233, 2)
+        self.assertTrue(solution.converged)
+        self.assertLess(solution.pv_evaluations, 10)
+        self.assertAlmostEqual(solution.ytm, -93.950996151562, places=8)
+
+
+if __name__ == "__main__":
+    unittest.main()